@@ -1,16 +1,28 @@
 import os
 from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nexus_core.settings')
+
+from restaurant import warmup  # before Django is set up: startup time is measured from here
+
+# Set up Django before importing anything that touches models (the consumers do)
+django_asgi_app = get_asgi_application()
+
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 import restaurant.routing
+from restaurant.notifications import bind_server_loop
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nexus_core.settings')
+# Preload caches etc. before the first request; /ready/ reports when it's done
+warmup.startup.start()
 
-application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+# bind_server_loop: kitchen notifications are dispatched from the server's event loop
+# with_warmup: answers the lifespan protocol (uvicorn/hypercorn) once the warmup is done
+application = warmup.with_warmup(bind_server_loop(ProtocolTypeRouter({
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
         URLRouter(
             restaurant.routing.websocket_urlpatterns
         )
     ),
-})
\ No newline at end of file
+})))
@@ -50,7 +50,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'restaurant.middleware.AsyncWhiteNoiseMiddleware',  # WhiteNoise without the thread hop under daphne
+    'restaurant.middleware.ProfilingMiddleware',  # Off unless asked for, see PROFILING_* below
+    'restaurant.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -88,12 +90,56 @@ DATABASES = {
     }
 }
 
+# SQLite production mode (small sites without DATABASE_URL): SQLITE_PRODUCTION=1
+# - WAL so kitchen polling (readers) and order creation (writers) don't block each other
+# - writes take the lock up front (BEGIN IMMEDIATE) and wait for it instead of
+#   failing with "database is locked" halfway through a transaction
+# - read-only endpoints use the "read" alias (same file, query_only connection)
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA busy_timeout=20000;'
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA mmap_size=268435456;'
+    'PRAGMA cache_size=-32000;'
+    'PRAGMA temp_store=MEMORY;'
+)
+
+def sqlite_production_databases(name):
+    return {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': name,
+            'OPTIONS': {
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': SQLITE_PRAGMAS,
+            },
+        },
+        'read': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': name,
+            'OPTIONS': {
+                'timeout': 20,
+                'init_command': SQLITE_PRAGMAS + 'PRAGMA query_only=ON;',
+            },
+            'TEST': {'MIRROR': 'default'},
+        },
+    }
+
+if os.environ.get('SQLITE_PRODUCTION') == '1':
+    DATABASES = sqlite_production_databases(DATABASES['default']['NAME'])
+
 # Override with PostgreSQL if DATABASE_URL exists (Cloud Mode)
 if 'DATABASE_URL' in os.environ:
-    DATABASES['default'] = dj_database_url.config(
-        default=os.environ['DATABASE_URL'],
-        conn_max_age=600
-    )
+    DATABASES = {
+        'default': dj_database_url.config(
+            default=os.environ['DATABASE_URL'],
+            conn_max_age=600
+        )
+    }
+
+# Sends @use_read_database views to the "read" alias when it is configured
+DATABASE_ROUTERS = ['restaurant.db_router.ReadWriteRouter']
 
 
 # Password validation
@@ -139,6 +185,69 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media is served by restaurant.media.serve_media in every mode. Behind nginx,
+# point this at an `internal` location aliasing MEDIA_ROOT (e.g. /protected-media/)
+# and nginx will stream the files itself via X-Accel-Redirect.
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT')
+
+# Django REST Framework
+# JSON stays the default; tablets can negotiate MessagePack or CBOR instead.
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'restaurant.renderers.MessagePackRenderer',
+        'restaurant.renderers.CBORRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'restaurant.renderers.MessagePackParser',
+        'restaurant.renderers.CBORParser',
+    ],
+}
+
+# Responses smaller than this go out uncompressed (br/gzip costs more than it saves)
+COMPRESSION_MIN_SIZE = 1024
+
+# In-process background jobs (restaurant/jobs.py). JOBS_EAGER runs them inline
+# right after the commit instead (tests).
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_QUEUE_SIZE = 1000
+JOBS_EAGER = False
+
+# Threads building the chain dashboard's per-restaurant summaries (1 = inline)
+CHAIN_WORKERS = int(os.environ.get('CHAIN_WORKERS', 8))
+
+# Customer profiles (restaurant/customers.py): phone numbers typed without
+# +<country code> / 00<country code> are taken to be from this country
+PHONE_COUNTRY_CODE = os.environ.get('PHONE_COUNTRY_CODE', '91')
+
+# Request profiling (restaurant/profiling.py): requests with a signed
+# X-Profile header (manage.py profile_token) plus this share of all requests
+# are profiled into PROFILING_DIR, keeping the newest PROFILING_KEEP files
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_MODE = os.environ.get('PROFILING_MODE', 'sample')  # or 'cprofile'
+PROFILING_SAMPLE_INTERVAL = 0.005  # seconds, sample mode
+PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILING_KEEP = int(os.environ.get('PROFILING_KEEP', 200))
+
+# Startup warmup (restaurant/warmup.py): menu snapshots and pricing plans are
+# preloaded for restaurants with orders in the last WARMUP_ACTIVE_DAYS days,
+# most recently busy first, at most WARMUP_MAX_RESTAURANTS of them
+WARMUP_ACTIVE_DAYS = 14
+WARMUP_MAX_RESTAURANTS = int(os.environ.get('WARMUP_MAX_RESTAURANTS', 50))
+
+# Same local-memory cache as Django's default, with room for the analytics
+# day buckets (restaurant/analytics.py keeps one per restaurant per day)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
 # ASGI Configuration for Real-Time
 ASGI_APPLICATION = 'nexus_core.asgi.application'
 
@@ -1,8 +1,9 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from restaurant import views  # Ensure views are imported
+from restaurant.media import serve_media
+from restaurant.warmup import readiness
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -17,7 +18,13 @@ urlpatterns = [
     
     # --- ADD THIS LINE ---
     path('analytics/', views.analytics_dashboard),
+
+    # Load balancer readiness probe: 503 until this worker has warmed up
+    path('ready/', readiness),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Menu images: served with ETag/Last-Modified, long-lived caching and Range
+# support in production too (not just when DEBUG is on)
+urlpatterns += [
+    re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media),
+]
\ No newline at end of file
@@ -1,5 +1,56 @@
 from django.contrib import admin
-from .models import Restaurant, Category, MenuItem, Table, Order, OrderItem, VariantGroup, VariantOption, Waiter, Ingredient, Recipe
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .models import Restaurant, Category, MenuItem, Table, Order, OrderItem, VariantGroup, VariantOption, Waiter, Ingredient, Recipe, Customer
+
+
+# --- Big tables: estimated counts instead of COUNT(*) ---
+
+ESTIMATE_ABOVE = 10000  # below this an exact count is cheap anyway
+DEFERRED_JOIN_AFTER = 1000  # rows skipped before the pager looks up ids first
+
+
+def estimated_row_count(model, using='default'):
+    """Row count from the database's own bookkeeping (no table scan), None if unsupported."""
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None  # -1: never analyzed
+        if connection.vendor == 'sqlite':
+            # One B-tree seek; matches the count as long as rows are rarely deleted
+            cursor.execute(f"SELECT MAX(rowid) FROM {table}")
+            return cursor.fetchone()[0] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Unfiltered changelists of big tables are paginated on an estimate."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > ESTIMATE_ABOVE:
+                return estimate
+        return super().count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        if bottom < DEFERRED_JOIN_AFTER:
+            return super().page(number)
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        # Deep pages: OFFSET over the bare pk index, then join only this page's rows
+        ids = list(self.object_list.values_list('pk', flat=True)[bottom:top])
+        return self._get_page(self.object_list.filter(pk__in=ids), number, self)
 
 # 1. Inline for Recipes (Works for both MenuItems and Variants)
 class RecipeInline(admin.TabularInline):
@@ -22,6 +73,8 @@ class VariantGroupInline(admin.StackedInline):
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
     list_display = ['name', 'category', 'price']
+    list_select_related = ['category']
+    search_fields = ['name']  # for the autocomplete on order items
     inlines = [VariantGroupInline, RecipeInline] 
 
 @admin.register(VariantGroup)
@@ -44,9 +97,73 @@ class VariantOptionAdmin(admin.ModelAdmin):
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ['name', 'current_stock', 'unit']
 
+# --- Orders: built for hundreds of thousands of rows ---
+# Related objects come in with the page (Table.__str__ would hit restaurant
+# per row), FKs use raw-id / autocomplete widgets instead of loading every
+# table or dish into a <select>, and the pager never runs COUNT(*) on the
+# whole table. Date filtering is plain created_at ranges (indexed).
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = ['menu_item', 'selected_options']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('menu_item')
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ['id', 'restaurant', 'table_name', 'waiter', 'status', 'total_amount', 'created_at']
+    list_select_related = ['restaurant', 'table', 'waiter']
+    # Not date_hierarchy: its year/month links need a DISTINCT over every row
+    list_filter = ['status', ('created_at', admin.DateFieldListFilter)]
+    search_fields = ['=id', '=customer_phone']
+    raw_id_fields = ['restaurant', 'table', 'waiter', 'customer']
+    # Newest first along order_created_idx (ids follow created_at): a date
+    # filter then reads its range in order instead of sorting it by -id
+    ordering = ['-created_at', '-id']
+    inlines = [OrderItemInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description='Table', ordering='table__name')
+    def table_name(self, obj):
+        return obj.table.name if obj.table else '-'
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(admin.ModelAdmin):
+    list_display = ['id', 'order_id', 'menu_item', 'quantity', 'price_at_time_of_order']
+    list_select_related = ['menu_item']
+    search_fields = ['=order__id']
+    raw_id_fields = ['order', 'selected_options']
+    autocomplete_fields = ['menu_item']
+    ordering = ['-id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Customer)
+class CustomerAdmin(admin.ModelAdmin):
+    list_display = ['phone', 'name', 'restaurant', 'order_count', 'visit_count', 'lifetime_spend', 'last_visit']
+    list_select_related = ['restaurant']
+    search_fields = ['=phone', 'name']
+    raw_id_fields = ['restaurant']
+    # Maintained by place_order / make_reservation (restaurant/customers.py)
+    readonly_fields = ['order_count', 'visit_count', 'lifetime_spend', 'reservation_count', 'item_counts',
+                       'first_seen', 'last_visit']
+    ordering = ['-id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Table)
+class TableAdmin(admin.ModelAdmin):
+    list_display = ['name', 'restaurant', 'is_occupied']
+    list_select_related = ['restaurant']
+
+
 admin.site.register(Restaurant)
 admin.site.register(Category)
-admin.site.register(Table)
-admin.site.register(Order)
-admin.site.register(OrderItem)
 admin.site.register(Waiter)
\ No newline at end of file
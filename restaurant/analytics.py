@@ -0,0 +1,168 @@
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from .models import Order, OrderItem
+
+# =========================================
+#  SALES ANALYTICS OVER DATE RANGES
+# =========================================
+# Everything is built from per-day buckets: order count and revenue per
+# hour, per waiter and per table. Each run of missing days is computed with
+# two GROUP BY queries that use plain created_at ranges (indexed). The
+# grouping is done by the database with TruncDate/ExtractHour in the current
+# time zone. A day is "closed" once CLOSE_AFTER has passed since its
+# midnight, which leaves time for late settlements. Closed days are cached
+# with no timeout (so the cache needs room for a year of days per
+# restaurant, see CACHES) until an order of that day changes after all: a
+# tab settled the next afternoon, a corrected status. Saving or deleting an
+# order (signals.py) and settle_table drop its day's bucket after the
+# commit. Today and the grace period are always read fresh.
+
+PAID_STATUSES = ['PAID', 'COMPLETED']   # what counts as revenue (same as the dashboard)
+CLOSE_AFTER = datetime.timedelta(hours=6)
+MAX_DAYS = 366
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def parse_days(start, end):
+    """'YYYY-MM-DD' strings -> (first, last) dates, both inclusive."""
+    try:
+        first = datetime.date.fromisoformat(start)
+        last = datetime.date.fromisoformat(end)
+    except (TypeError, ValueError):
+        raise ValueError("'from' and 'to' must be dates (YYYY-MM-DD)")
+    if last < first:
+        raise ValueError("'to' is before 'from'")
+    return first, last
+
+
+def day_bounds(first, last):
+    """[midnight of `first`, midnight after `last`) as aware datetimes."""
+    midnight = lambda day: timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return midnight(first), midnight(last + datetime.timedelta(days=1))
+
+
+def _bucket_key(restaurant_id, day):
+    return f"analytics:day:{restaurant_id}:{day.isoformat()}"
+
+
+def forget_days(restaurant_id, moments):
+    """Drops the cached buckets of the days these created_at values fall on."""
+    cache.delete_many({_bucket_key(restaurant_id, timezone.localdate(moment)) for moment in moments})
+
+
+def _empty_bucket():
+    return {'orders': 0, 'revenue': Decimal('0.00'), 'hours': {}, 'waiters': {}, 'tables': {}}
+
+
+def compute_days(restaurant_id, first, last):
+    """{day: bucket} for every day from `first` to `last` (inclusive), straight from the database."""
+    start, end = day_bounds(first, last)
+    # Days are local: the same zone day_bounds() builds the midnights in
+    zone = timezone.get_current_timezone()
+    orders = (
+        Order.objects
+        .filter(restaurant_id=restaurant_id, status__in=PAID_STATUSES, created_at__gte=start, created_at__lt=end)
+        .annotate(day=TruncDate('created_at', tzinfo=zone))
+        .order_by()
+    )
+    totals = {'orders': Count('id'), 'revenue': Sum('total_amount')}
+    buckets = {first + datetime.timedelta(days=i): _empty_bucket() for i in range((last - first).days + 1)}
+
+    for row in orders.annotate(hour=ExtractHour('created_at', tzinfo=zone)).values('day', 'hour').annotate(**totals):
+        bucket = buckets[row['day']]
+        bucket['hours'][row['hour']] = (row['orders'], row['revenue'])
+        bucket['orders'] += row['orders']
+        bucket['revenue'] += row['revenue']
+    # Waiters and tables from one pass (each date/hour extraction is a full scan on SQLite)
+    for row in orders.values('day', 'waiter_id', 'waiter__name', 'table_id', 'table__name').annotate(**totals):
+        bucket = buckets[row['day']]
+        for group, key, name in (('waiters', row['waiter_id'], row['waiter__name']),
+                                 ('tables', row['table_id'], row['table__name'])):
+            _, count, amount = bucket[group].get(key, (name, 0, Decimal('0.00')))
+            bucket[group][key] = (name, count + row['orders'], amount + row['revenue'])
+    return buckets
+
+
+def _runs(days):
+    """Consecutive days grouped: [d1, d2, d3, d7] -> [(d1, d3), (d7, d7)]."""
+    runs = []
+    for day in days:
+        if runs and runs[-1][1] + datetime.timedelta(days=1) == day:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+
+def daily_buckets(restaurant_id, first, last):
+    """[(day, bucket)] for the range; closed days come from the cache when they can."""
+    days = [first + datetime.timedelta(days=i) for i in range((last - first).days + 1)]
+    closed_before = timezone.now() - CLOSE_AFTER
+    keys = {day: _bucket_key(restaurant_id, day) for day in days if day_bounds(day, day)[1] <= closed_before}
+    cached = cache.get_many(keys.values())
+    buckets = {day: cached[key] for day, key in keys.items() if key in cached}
+
+    for run_first, run_last in _runs([day for day in days if day not in buckets]):
+        fresh = compute_days(restaurant_id, run_first, run_last)
+        cache.set_many({keys[day]: bucket for day, bucket in fresh.items() if day in keys}, None)
+        buckets.update(fresh)
+    return [(day, buckets[day]) for day in days]
+
+
+def units_sold(restaurant_id, day):
+    """{'orders': count, 'items': {dish name: units}} for the orders placed on `day` (two indexed queries)."""
+    start, end = day_bounds(day, day)
+    orders = Order.objects.filter(restaurant_id=restaurant_id, created_at__gte=start, created_at__lt=end)
+    items = (OrderItem.objects.filter(order__in=orders).order_by()
+             .values_list('menu_item__name').annotate(units=Sum('quantity')))
+    return {'orders': orders.count(), 'items': dict(items)}
+
+
+def average_ticket(revenue, orders):
+    return (revenue / orders).quantize(Decimal('0.01')) if orders else Decimal('0.00')
+
+
+def _breakdown(totals):
+    rows = [
+        {"id": key, "name": name, "orders": orders, "revenue": revenue, "average_ticket": average_ticket(revenue, orders)}
+        for key, (name, orders, revenue) in totals.items()
+    ]
+    return sorted(rows, key=lambda row: row['revenue'], reverse=True)
+
+
+def sales_report(restaurant_id, first, last):
+    """Totals, hour x weekday heatmaps and per-waiter / per-table breakdowns for the range."""
+    orders, revenue = 0, Decimal('0.00')
+    heat_orders = [[0] * 24 for _ in WEEKDAYS]
+    heat_revenue = [[Decimal('0.00')] * 24 for _ in WEEKDAYS]
+    waiters, tables, daily = {}, {}, []
+
+    for day, bucket in daily_buckets(restaurant_id, first, last):
+        orders += bucket['orders']
+        revenue += bucket['revenue']
+        daily.append({"date": day, "orders": bucket['orders'], "revenue": bucket['revenue']})
+        for hour, (count, amount) in bucket['hours'].items():
+            heat_orders[day.weekday()][hour] += count
+            heat_revenue[day.weekday()][hour] += amount
+        for totals, rows in ((waiters, bucket['waiters']), (tables, bucket['tables'])):
+            for key, (name, count, amount) in rows.items():
+                _, seen, earned = totals.get(key, (name, 0, Decimal('0.00')))
+                totals[key] = (name, seen + count, earned + amount)
+
+    return {
+        "from": first,
+        "to": last,
+        "revenue": revenue,
+        "orders": orders,
+        "average_ticket": average_ticket(revenue, orders),
+        "heatmap": {"weekdays": WEEKDAYS, "orders": heat_orders, "revenue": heat_revenue},
+        "daily": daily,
+        "waiters": _breakdown(waiters),
+        "tables": _breakdown(tables),
+    }
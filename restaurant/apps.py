@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class RestaurantConfig(AppConfig):
     name = 'restaurant'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registers receivers)
+        from . import images, tasks  # noqa: F401  (registers jobs, so durable ones can be recovered)
@@ -0,0 +1,175 @@
+import logging
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import NotAcceptable, ParseError
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.request import Request
+
+from .changes import changes, wait_seconds
+from .compression import etag_matches
+from .db_router import use_read_database
+from .models import Order, Table
+from .renderers import CBORParser, CBORRenderer, MessagePackParser, MessagePackRenderer, UJSONRenderer
+from . import fastpath, menu_snapshot
+from .views import ACTIVE_ORDERS_ORDERING, KITCHEN_ORDERING, listing_body, listing_params, place_order
+
+logger = logging.getLogger(__name__)
+
+# =========================================
+#  ASYNC HOT PATHS (daphne / ASGI)
+# =========================================
+# Plain Django async views for the endpoints the tablets and kitchen screens
+# hammer. They use the async ORM and never park a worker thread while waiting.
+# DRF's @api_view is sync-only, so the bits of DRF we rely on -- content
+# negotiation, renderers, parsers -- are used directly and the responses are
+# the same as the sync views in views.py.
+
+RENDERERS = [UJSONRenderer(), MessagePackRenderer(), CBORRenderer()]
+PARSERS = [JSONParser(), FormParser(), MultiPartParser(), MessagePackParser(), CBORParser()]
+_negotiation = DefaultContentNegotiation()
+
+
+def _renderer_for(request):
+    try:
+        renderer, media_type = _negotiation.select_renderer(Request(request), RENDERERS)
+    except NotAcceptable:
+        renderer, media_type = RENDERERS[0], RENDERERS[0].media_type
+    return renderer, media_type
+
+
+def _respond(request, data, status=200, headers=None):
+    renderer, media_type = _renderer_for(request)
+    return HttpResponse(renderer.render(data), status=status, content_type=media_type, headers=headers)
+
+
+async def _versioned(request, restaurant_id, build):
+    """
+    Conditional GET on the restaurant's change and menu versions. With
+    ?wait=N a poll whose If-None-Match is current is held (no DB work) until
+    something changes or N seconds pass, then answered 200 or 304 as usual.
+    """
+    renderer, media_type = _renderer_for(request)
+    version = changes.current(restaurant_id)
+    menu_version = await menu_snapshot.acurrent_version(restaurant_id)
+    etag = changes.etag(restaurant_id, version, menu_version, renderer.format)
+    if etag_matches(request, etag):
+        wait = wait_seconds(request)
+        if wait:
+            version = await changes.wait(restaurant_id, version, wait)
+            menu_version = await menu_snapshot.acurrent_version(restaurant_id)
+            etag = changes.etag(restaurant_id, version, menu_version, renderer.format)
+        if not wait or etag_matches(request, etag):
+            return HttpResponse(status=304, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+
+    # Version is read before the data, so a write racing with this request
+    # can only make the ETag older than the payload (next poll refetches)
+    data = await build()
+    return HttpResponse(renderer.render(data), content_type=media_type,
+                        headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+
+
+# --- APP APIs (Android) ---
+
+@use_read_database
+@require_GET
+async def get_restaurant_menu(request, restaurant_id):
+    snapshot = await menu_snapshot.aget_snapshot(restaurant_id)
+    if snapshot is None:
+        return _respond(request, {"error": "Restaurant not found"}, status=404)
+
+    headers = {'ETag': snapshot.etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request, snapshot.etag):
+        return HttpResponse(status=304, headers=headers)
+
+    renderer, media_type = _renderer_for(request)
+    if renderer.format != 'json':
+        return HttpResponse(renderer.render(snapshot.data), content_type=media_type, headers=headers)
+    response = HttpResponse(snapshot.json, content_type='application/json', headers=headers)
+    response.precompressed = snapshot.encoded
+    return response
+
+
+@use_read_database
+@require_GET
+async def get_tables(request, restaurant_id):
+    tables = Table.objects.filter(restaurant__id=restaurant_id)
+    return await _versioned(request, restaurant_id, lambda: fastpath.atable_rows(tables))
+
+
+@use_read_database
+@require_GET
+async def get_active_orders(request, restaurant_id):
+    try:
+        fields, cursor, limit, paged = listing_params(request.GET, ACTIVE_ORDERS_ORDERING, fastpath.ORDER_FIELDS)
+    except ValueError as e:
+        return _respond(request, {"error": str(e)}, status=400)
+    orders = Order.objects.filter(
+        restaurant__id=restaurant_id,
+        status__in=['PENDING', 'READY']
+    )
+
+    async def build():
+        return listing_body(*await fastpath.aorder_page(orders, ACTIVE_ORDERS_ORDERING, cursor, limit, fields), paged)
+    return await _versioned(request, restaurant_id, build)
+
+
+@csrf_exempt
+@require_POST
+async def create_order(request):
+    try:
+        data = Request(request, parsers=PARSERS).data
+    except ParseError as e:
+        return _respond(request, {"error": str(e.detail)}, status=400)
+
+    try:
+        # The ORM transaction is sync-only; run it in the DB thread
+        order = await sync_to_async(place_order)(data)
+    except Exception as e:
+        logger.exception("Order failed")
+        return _respond(request, {"error": str(e)}, status=400)
+    return _respond(request, {"message": "success", "order_id": order.id}, status=201)
+
+
+# --- KITCHEN / CASHIER ---
+
+@use_read_database
+@require_GET
+async def get_kitchen_orders(request):
+    try:
+        fields, cursor, limit, paged = listing_params(request.GET, KITCHEN_ORDERING, fastpath.KITCHEN_ORDER_FIELDS)
+    except ValueError as e:
+        return _respond(request, {"error": str(e)}, status=400)
+    orders = Order.objects.filter(status='PENDING')
+    return _respond(request, listing_body(
+        *await fastpath.akitchen_order_page(orders, KITCHEN_ORDERING, cursor, limit, fields), paged))
+
+
+@use_read_database
+@require_GET
+async def get_table_bill(request, table_id):
+    orders = Order.objects.filter(table__id=table_id, status__in=['PENDING', 'READY'])
+    rows = await fastpath.aorder_rows(orders)
+    if not rows:
+        return _respond(request, {"error": "No active orders"}, status=404)
+
+    total_subtotal = Decimal('0.00')
+    all_items = []
+    for order in rows:
+        total_subtotal += Decimal(order['total_amount'])
+        all_items.extend(order['items'])
+
+    tax = total_subtotal * Decimal('0.05')
+    grand_total = total_subtotal + tax
+
+    return _respond(request, {
+        "table_id": table_id,
+        "subtotal": total_subtotal,
+        "tax": tax,
+        "grand_total": grand_total,
+        "items": all_items
+    })
@@ -0,0 +1,129 @@
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F
+
+from . import analytics, tasks
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+# =========================================
+#  CHAIN DASHBOARD (all of an owner's restaurants)
+# =========================================
+# Each restaurant's summary (sales, kitchen prep time, low stock) is built
+# independently on one process-wide pool of CHAIN_WORKERS threads, so the
+# page takes about as long as the slowest restaurant rather than the sum of
+# all of them. Every task runs in a copy of the request's context
+# (use_read_database still applies). The pool threads keep their database
+# connections between dashboards and recycle them like a request would
+# (CONN_MAX_AGE, health checks). Summaries are cached
+# per restaurant for SUMMARY_TTL seconds. Sales come from the analytics day
+# buckets, so closed days cost nothing even on a miss. A restaurant that
+# fails is reported with its error and leaves the others alone.
+#
+# CHAIN_WORKERS = 1 builds them one after the other in the calling thread
+# (tests: other threads can't see a TestCase's uncommitted rows).
+
+SUMMARY_TTL = 30
+
+_executor = ThreadPoolExecutor(max_workers=max(settings.CHAIN_WORKERS, 1), thread_name_prefix='chain')
+
+
+def _summary_key(restaurant_id, first, last):
+    return f"chain:summary:{restaurant_id}:{first.isoformat()}:{last.isoformat()}"
+
+
+def restaurant_summary(restaurant_id, first, last):
+    orders, revenue = 0, Decimal('0.00')
+    for _, bucket in analytics.daily_buckets(restaurant_id, first, last):
+        orders += bucket['orders']
+        revenue += bucket['revenue']
+
+    start, end = analytics.day_bounds(first, last)
+    ready = Order.objects.filter(
+        restaurant_id=restaurant_id, created_at__gte=start, created_at__lt=end, ready_at__isnull=False
+    )
+    kitchen = ready.aggregate(
+        prepared=Count('id'),
+        prep_time=Avg(ExpressionWrapper(F('ready_at') - F('created_at'), output_field=DurationField())),
+    )
+    prep_time = kitchen['prep_time']
+    prep_minutes = round(prep_time.total_seconds() / 60, 1) if prep_time is not None else None
+
+    return {
+        "orders": orders,
+        "revenue": revenue,
+        "average_ticket": analytics.average_ticket(revenue, orders),
+        "prepared": kitchen['prepared'],
+        "avg_prep_minutes": prep_minutes,
+        "low_stock": tasks.low_stock_rows(restaurant_id),
+    }
+
+
+def cached_summary(restaurant_id, first, last):
+    key = _summary_key(restaurant_id, first, last)
+    summary = cache.get(key)
+    if summary is None:
+        summary = restaurant_summary(restaurant_id, first, last)
+        cache.set(key, summary, SUMMARY_TTL)
+    return summary
+
+
+def _pooled(restaurant_id, first, last):
+    # What request_started / request_finished do for a request thread
+    close_old_connections()
+    try:
+        return cached_summary(restaurant_id, first, last)
+    finally:
+        close_old_connections()
+
+
+def chain_dashboard(restaurants, first, last, workers=None):
+    """restaurants: (id, name) pairs. Per-restaurant summaries plus chain-wide totals."""
+    restaurants = list(restaurants)
+    workers = workers or settings.CHAIN_WORKERS
+    if workers <= 1 or len(restaurants) <= 1:
+        results = [_collect(partial(cached_summary, rid, first, last)) for rid, _ in restaurants]
+    else:
+        futures = [_executor.submit(contextvars.copy_context().run, _pooled, rid, first, last) for rid, _ in restaurants]
+        results = [_collect(future.result) for future in futures]
+
+    rows, orders, revenue, prepared, prep_total = [], 0, Decimal('0.00'), 0, 0.0
+    for (rid, name), (summary, error) in zip(restaurants, results):
+        if error is not None:
+            rows.append({"id": rid, "name": name, "error": error})
+            continue
+        rows.append({"id": rid, "name": name, **summary})
+        orders += summary['orders']
+        revenue += summary['revenue']
+        if summary['avg_prep_minutes'] is not None:
+            prepared += summary['prepared']
+            prep_total += summary['avg_prep_minutes'] * summary['prepared']
+
+    return {
+        "from": first,
+        "to": last,
+        "totals": {
+            "orders": orders,
+            "revenue": revenue,
+            "average_ticket": analytics.average_ticket(revenue, orders),
+            "avg_prep_minutes": round(prep_total / prepared, 1) if prepared else None,
+            "low_stock": sum(len(row.get('low_stock', ())) for row in rows),
+        },
+        "restaurants": rows,
+    }
+
+
+def _collect(get):
+    try:
+        return get(), None
+    except Exception as e:
+        logger.exception("Chain dashboard: restaurant summary failed")
+        return None, str(e)
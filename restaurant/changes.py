@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import uuid
+
+from django.db import transaction
+
+# =========================================
+#  CHANGE FEED (conditional GET + long-polling for tables / active orders)
+# =========================================
+# Every restaurant has an in-memory change version, bumped after the commit
+# of any Order or Table write (signals.py). The polling endpoints hand it out
+# as their ETag, so an unchanged poll is a 304 without touching the database,
+# and with ?wait=N the request is parked on a future until the next bump.
+#
+# Versions live in this process only (like the in-memory channel layer), so
+# ETags carry a per-boot id: after a restart every client simply refetches.
+# They also carry the restaurant's menu_version: order payloads show dish
+# names, so a rename must revalidate them too (menu edits also wake pollers).
+
+MAX_WAIT = 55   # seconds; stay under typical proxy/client read timeouts
+
+_BOOT = uuid.uuid4().hex[:8]
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ChangeFeed:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._waiters = {}
+
+    def current(self, restaurant_id):
+        return self._versions.get(str(restaurant_id), 0)
+
+    def etag(self, restaurant_id, version, menu_version, variant=''):
+        """ETag for a representation of the restaurant's state at `version` / `menu_version`."""
+        return f'"{_BOOT}.{restaurant_id}.{version}.{menu_version}.{variant}"'
+
+    def bump(self, restaurant_id):
+        key = str(restaurant_id)
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            waiters = self._waiters.pop(key, ())
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    async def wait(self, restaurant_id, version, timeout):
+        """Returns the current version once it differs from `version`, or after `timeout` seconds."""
+        key = str(restaurant_id)
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self._lock:
+            if self._versions.get(key, 0) != version:
+                return self._versions[key]
+            self._waiters.setdefault(key, set()).add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiting = self._waiters.get(key)
+                if waiting is not None:
+                    waiting.discard(waiter)
+                    if not waiting:
+                        del self._waiters[key]
+        return self.current(restaurant_id)
+
+
+changes = ChangeFeed()
+
+
+def notify_change(restaurant_id):
+    """Bump the restaurant's change version once the current transaction commits."""
+    if restaurant_id:
+        transaction.on_commit(lambda: changes.bump(restaurant_id))
+
+
+def wait_seconds(request):
+    """?wait=N from the query string, clamped to MAX_WAIT (0 = plain conditional GET)."""
+    try:
+        return max(0.0, min(float(request.GET.get('wait', 0)), MAX_WAIT))
+    except ValueError:
+        return 0.0
@@ -0,0 +1,104 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:  # gzip-only if the Brotli package isn't installed
+    brotli = None
+
+# =========================================
+#  RESPONSE COMPRESSION HELPERS
+# =========================================
+# Shared by CompressionMiddleware (on-the-fly, fast settings) and the menu
+# snapshot cache (compressed once at build time, best settings).
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5           # on-the-fly: ~gzip -6 speed, noticeably smaller
+GZIP_LEVEL_STORED = 9
+BROTLI_QUALITY_STORED = 11   # precompressed snapshots: compressed once, served many times
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding):
+    """Best encoding from an Accept-Encoding header (br preferred on ties), or None."""
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in supported_encodings():
+        q = qualities.get(coding, qualities.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def etag_matches(request, etag):
+    """If-None-Match check with weak comparison (we turn ETags weak when compressing)."""
+    header = request.headers.get('If-None-Match', '')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    bare = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == bare for tag in header.split(','))
+
+
+def compress(data, encoding, stored=False):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY_STORED if stored else BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL_STORED if stored else GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def precompress(data):
+    """{encoding: bytes} for every supported encoding, at the stored (max) settings."""
+    return {encoding: compress(data, encoding, stored=True) for encoding in supported_encodings()}
+
+
+class StreamCompressor:
+    """Incremental compressor; each chunk is flushed so streamed rows arrive promptly."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+    def wrap(self, iterator):
+        for data in iterator:
+            out = self.chunk(data)
+            if out:
+                yield out
+        yield self.finish()
+
+    async def awrap(self, iterator):
+        async for data in iterator:
+            out = self.chunk(data)
+            if out:
+                yield out
+        yield self.finish()
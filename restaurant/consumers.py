@@ -1,15 +1,117 @@
 import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from . import fastpath
+from .models import Order
+from .notifications import KITCHEN_GROUP, feed, restaurant_group
+from .views import set_orders_ready
+
+MAX_BULK_BUMP = 200
+
+
 class KitchenConsumer(AsyncWebsocketConsumer):
+    """
+    ws/kitchen/ (every restaurant) or ws/kitchen/<restaurant uuid>/.
+
+    On connect the screen gets either
+      {"type": "snapshot", "epoch", "seq", "orders": [...]}   all pending orders, or
+      {"type": "replay", "epoch", "seq", "events": [...]}     when it reconnects with
+                                                               ?epoch=<epoch>&since=<last seq>
+    and after that one {"type": "order", "seq", "order"} per new order and
+    {"type": "status", "seq", "status", "order_ids"[, "orders"]} per bump / un-bump.
+
+    Screens bump over the same socket:
+      {"action": "bump" | "unbump", "order_id": 12, "ref": "any tag"}
+      {"action": "bump_many", "order_ids": [12, 13], "ref": "..."}
+    answered with {"type": "ack", "ref", "action", "order_ids", "skipped"} (or
+    {"type": "error", "ref", "error"}); every screen, the sender included, then
+    gets the status event.
+    """
+
     async def connect(self):
-        self.group_name = "kitchen_group"
+        self.restaurant_id = self.scope['url_route']['kwargs'].get('restaurant_id')
+        self.group_name = restaurant_group(self.restaurant_id) if self.restaurant_id else KITCHEN_GROUP
+        # Join first: anything stamped after the snapshot's seq is already queued for us
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
+        self.seq = feed.seq
+
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        since = query.get('since', [''])[0]
+        missed = None
+        if query.get('epoch', [''])[0] == feed.epoch and since.isdigit():
+            missed = feed.since(int(since), self.restaurant_id)
+            missed = [event for event in missed if event['seq'] <= self.seq] if missed is not None else None
+
+        if missed is not None:
+            await self._send_json({"type": "replay", "epoch": feed.epoch, "seq": self.seq,
+                                   "events": [self._client_event(event) for event in missed]})
+        else:
+            await self._send_json({"type": "snapshot", "epoch": feed.epoch, "seq": self.seq,
+                                   "orders": await self._pending_orders()})
 
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
+    async def _pending_orders(self):
+        orders = Order.objects.filter(status='PENDING').order_by('created_at')
+        if self.restaurant_id:
+            orders = orders.filter(restaurant_id=self.restaurant_id)
+        return await fastpath.akitchen_order_rows(orders)
+
+    async def _send_json(self, data):
+        await self.send(text_data=json.dumps(data))
+
+    def _client_event(self, event):
+        if event['type'] == 'order_status':
+            data = {"type": "status", "seq": event['seq'], "status": event['status'], "order_ids": event['order_ids']}
+            if 'orders' in event:
+                data['orders'] = event['orders']
+            return data
+        return {"type": "order", "seq": event['seq'], "order": event['order']}
+
+    # --- Commands from the screen ---
+
+    async def receive(self, text_data=None, bytes_data=None):
+        ref = None
+        try:
+            command = json.loads(text_data or bytes_data)
+            ref = command.get('ref')
+            action = command.get('action')
+            if action in ('bump', 'unbump'):
+                order_ids = [int(command['order_id'])]
+            elif action == 'bump_many':
+                order_ids = [int(order_id) for order_id in command['order_ids']][:MAX_BULK_BUMP]
+            else:
+                raise ValueError(f"Unknown action: {action!r}")
+            changed = await sync_to_async(set_orders_ready)(
+                order_ids, ready=action != 'unbump', restaurant_id=self.restaurant_id)
+        except Exception as e:
+            await self._send_json({"type": "error", "ref": ref, "error": str(e)})
+            return
+        await self._send_json({"type": "ack", "ref": ref, "action": action, "order_ids": changed,
+                               "skipped": [order_id for order_id in order_ids if order_id not in changed]})
+
+    # --- Events from the dispatcher ---
+
+    async def _forward(self, event):
+        # Already covered by the snapshot / replay this screen got on connect
+        if event['seq'] <= self.seq:
+            return
+        self.seq = event['seq']
+        await self._send_json(self._client_event(event))
+
     # Receive order data from Views and send to HTML
     async def order_notification(self, event):
-        await self.send(text_data=json.dumps(event['order']))
\ No newline at end of file
+        await self._forward(event)
+
+    async def order_status(self, event):
+        await self._forward(event)
+
+    # Several events that were committed close together arrive as one message
+    async def order_batch(self, event):
+        for item in event['events']:
+            await self._forward(item)
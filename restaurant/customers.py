@@ -0,0 +1,216 @@
+import re
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Customer, MenuItem, Order, OrderItem, Reservation
+
+# =========================================
+#  CUSTOMER PROFILES (returning guests, keyed by phone)
+# =========================================
+# Order.customer_phone / Reservation.customer_phone are whatever the waiter
+# typed, so they're canonicalized ("+<country code><number>") and every
+# restaurant keeps one Customer row per number. place_order and
+# make_reservation update that row in their own transaction (the row is
+# locked, so concurrent orders add up), with running totals: orders, visits
+# (days with an order), lifetime spend, reservations and units per dish.
+# A guest lookup reads that one row plus a page of their history through
+# the (customer, created_at) index -- nothing scans the order table.
+#
+# `manage.py rebuild_customers` recomputes the profiles from the history
+# (existing data, or anything written around place_order, e.g. the admin).
+
+FAVOURITES = 5
+MIN_DIGITS, MAX_DIGITS = 5, 15  # E.164 allows at most 15
+GUEST_NAMES = {'', 'guest'}     # place_order's placeholder
+
+
+def canonical_phone(raw):
+    """
+    '+91 98765-43210', '0091 98765 43210' and '098765 43210' all become
+    '+919876543210'. Numbers without + / 00 are taken as national ones
+    (settings.PHONE_COUNTRY_CODE). None if it isn't a phone number.
+    """
+    if raw is None:
+        return None
+    raw = str(raw).strip()
+    digits = re.sub(r'\D', '', raw)
+    if raw.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    else:
+        digits = settings.PHONE_COUNTRY_CODE + digits.lstrip('0')
+    if not MIN_DIGITS <= len(digits) <= MAX_DIGITS:
+        return None
+    return '+' + digits
+
+
+def _locked_profile(restaurant_id, phone):
+    return Customer.objects.select_for_update().get_or_create(restaurant_id=restaurant_id, phone=phone)[0]
+
+
+def _set_name(customer, name):
+    name = (name or '').strip()[:100]
+    if name.lower() not in GUEST_NAMES:
+        customer.name = name
+
+
+@transaction.atomic(savepoint=False)  # part of place_order's transaction
+def record_order(restaurant_id, name, phone, total, lines):
+    """The guest's profile with this order added (lines: pricing.PricedLine). None without a usable phone."""
+    phone = canonical_phone(phone)
+    if phone is None:
+        return None
+    customer = _locked_profile(restaurant_id, phone)
+    now = timezone.now()
+    if customer.last_visit is None or timezone.localdate(customer.last_visit) != timezone.localdate(now):
+        customer.visit_count += 1
+    customer.order_count += 1
+    customer.lifetime_spend += total
+    for line in lines:
+        key = str(line.item.id)
+        customer.item_counts[key] = customer.item_counts.get(key, 0) + int(Decimal(line.quantity))
+    customer.last_visit = now
+    _set_name(customer, name)
+    customer.save(update_fields=['name', 'order_count', 'visit_count', 'lifetime_spend', 'item_counts', 'last_visit'])
+    return customer
+
+
+@transaction.atomic(savepoint=False)
+def record_reservation(restaurant_id, name, phone):
+    """The guest's profile with one more reservation. None without a usable phone."""
+    phone = canonical_phone(phone)
+    if phone is None:
+        return None
+    customer = _locked_profile(restaurant_id, phone)
+    customer.reservation_count += 1
+    _set_name(customer, name)
+    customer.save(update_fields=['name', 'reservation_count'])
+    return customer
+
+
+def lookup(restaurant_id, phone):
+    """The restaurant's Customer for this number (raw or canonical), or None."""
+    phone = canonical_phone(phone)
+    if phone is None:
+        return None
+    return Customer.objects.filter(restaurant_id=restaurant_id, phone=phone).first()
+
+
+def favourites(customer, count=FAVOURITES):
+    """[{menu_item, name, quantity}] of the dishes they order most (dishes since deleted are left out)."""
+    top = sorted(customer.item_counts.items(), key=lambda pair: (-pair[1], int(pair[0])))[:count]
+    names = dict(MenuItem.objects.filter(id__in=[int(key) for key, _ in top]).values_list('id', 'name'))
+    return [
+        {"menu_item": int(key), "name": names[int(key)], "quantity": quantity}
+        for key, quantity in top if int(key) in names
+    ]
+
+
+def profile(customer):
+    spend = customer.lifetime_spend
+    return {
+        "id": customer.id,
+        "phone": customer.phone,
+        "name": customer.name,
+        "orders": customer.order_count,
+        "visits": customer.visit_count,
+        "lifetime_spend": spend,
+        "average_ticket": (spend / customer.order_count).quantize(Decimal('0.01')) if customer.order_count else Decimal('0.00'),
+        "reservations": customer.reservation_count,
+        "first_seen": customer.first_seen,
+        "last_visit": customer.last_visit,
+        "favourites": favourites(customer),
+    }
+
+
+# --- Backfill ---
+
+def _rebuild_restaurant(restaurant_id, chunk_size):
+    stats = defaultdict(lambda: {
+        'name': '', 'orders': 0, 'days': set(), 'spend': Decimal('0.00'), 'reservations': 0,
+        'items': defaultdict(int), 'first': None, 'last': None,
+    })
+
+    def seen(entry, when):
+        entry['first'] = when if entry['first'] is None else min(entry['first'], when)
+
+    orders = (Order.objects.filter(restaurant_id=restaurant_id).exclude(customer_phone__isnull=True)
+              .exclude(customer_phone='').order_by('id')
+              .values_list('customer_phone', 'customer_name', 'total_amount', 'created_at'))
+    for raw, name, total, created in orders.iterator(chunk_size):
+        phone = canonical_phone(raw)
+        if phone is None:
+            continue
+        entry = stats[phone]
+        entry['orders'] += 1
+        entry['days'].add(timezone.localdate(created))
+        entry['spend'] += total
+        entry['last'] = created if entry['last'] is None else max(entry['last'], created)
+        seen(entry, created)
+        if (name or '').strip().lower() not in GUEST_NAMES:
+            entry['name'] = name.strip()[:100]
+
+    lines = (OrderItem.objects.filter(order__restaurant_id=restaurant_id).exclude(order__customer_phone__isnull=True)
+             .exclude(order__customer_phone='').values_list('order__customer_phone', 'menu_item_id', 'quantity'))
+    for raw, menu_item_id, quantity in lines.iterator(chunk_size):
+        phone = canonical_phone(raw)
+        if phone in stats:
+            stats[phone]['items'][str(menu_item_id)] += quantity
+
+    reservations = (Reservation.objects.filter(restaurant_id=restaurant_id).order_by('id')
+                    .values_list('customer_phone', 'customer_name', 'created_at'))
+    for raw, name, created in reservations.iterator(chunk_size):
+        phone = canonical_phone(raw)
+        if phone is None:
+            continue
+        entry = stats[phone]
+        entry['reservations'] += 1
+        seen(entry, created)
+        if not entry['name'] and (name or '').strip().lower() not in GUEST_NAMES:
+            entry['name'] = name.strip()[:100]
+
+    Customer.objects.bulk_create(
+        [
+            Customer(restaurant_id=restaurant_id, phone=phone, name=entry['name'], order_count=entry['orders'],
+                     visit_count=len(entry['days']), lifetime_spend=entry['spend'],
+                     reservation_count=entry['reservations'], item_counts=dict(entry['items']),
+                     first_seen=entry['first'] or timezone.now(), last_visit=entry['last'])
+            for phone, entry in stats.items()
+        ],
+        batch_size=500, update_conflicts=True, unique_fields=['restaurant', 'phone'],
+        update_fields=['name', 'order_count', 'visit_count', 'lifetime_spend', 'reservation_count',
+                       'item_counts', 'first_seen', 'last_visit'],
+    )
+    ids = dict(Customer.objects.filter(restaurant_id=restaurant_id).values_list('phone', 'id'))
+    for model in (Order, Reservation):
+        _link(model, restaurant_id, ids, chunk_size)
+    return len(stats)
+
+
+def _link(model, restaurant_id, ids, chunk_size):
+    """Points every row's customer FK at the profile of its (canonical) phone."""
+    rows = model.objects.filter(restaurant_id=restaurant_id).order_by('id').values_list('id', 'customer_phone', 'customer_id')
+    changed = []
+    for row_id, raw, current in rows.iterator(chunk_size):
+        customer_id = ids.get(canonical_phone(raw))
+        if customer_id != current:
+            changed.append(model(id=row_id, customer_id=customer_id))
+        if len(changed) >= chunk_size:
+            model.objects.bulk_update(changed, ['customer'], batch_size=500)
+            changed = []
+    if changed:
+        model.objects.bulk_update(changed, ['customer'], batch_size=500)
+
+
+def rebuild(restaurant_ids, chunk_size=2000):
+    """Recomputes the profiles of these restaurants from their orders and reservations. Returns {restaurant id: profiles}."""
+    done = {}
+    for restaurant_id in restaurant_ids:
+        with transaction.atomic():
+            done[restaurant_id] = _rebuild_restaurant(restaurant_id, chunk_size)
+    return done
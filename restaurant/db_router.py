@@ -0,0 +1,68 @@
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.db import connections
+
+READ_ALIAS = 'read'
+
+# Set while a read-only view runs; a ContextVar so it works for threads and async views
+_read_only = ContextVar('nexus_read_only_db', default=False)
+
+
+def use_read_database(view):
+    """Marks a view as read-only: its queries go to the "read" alias if there is one."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            token = _read_only.set(True)
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                _read_only.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _read_only.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+    return wrapper
+
+
+class ReadWriteRouter:
+    """
+    No-op unless settings define a "read" alias (SQLite production mode).
+    Writes, and reads inside a transaction, always go to "default", which
+    serializes writers with BEGIN IMMEDIATE.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _read_only.get() or READ_ALIAS not in connections.settings:
+            return None
+        # A second connection to an in-memory database (the test runner's) can't
+        # see the writer's open transaction, so there's nothing to split there
+        default = connections['default']
+        if default.vendor == 'sqlite' and default.is_in_memory_db():
+            return None
+        # Inside a transaction the view reads back what it wrote (the read
+        # connection wouldn't see it before the commit)
+        if default.in_atomic_block:
+            return None
+        return READ_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases point at the same database file
+        if {obj1._state.db, obj2._state.db} <= {'default', READ_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == READ_ALIAS:
+            return False
+        return None
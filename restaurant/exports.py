@@ -0,0 +1,143 @@
+import csv
+import datetime
+import io
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+
+from .analytics import day_bounds, parse_days
+from .models import OrderItem
+
+# =========================================
+#  SALES EXPORT (accounting)
+# =========================================
+# One row per order line, with the order's columns repeated, for a
+# restaurant and a date range. Nothing is materialised: lines are read with
+# QuerySet.iterator(chunk_size) (a server-side cursor on Postgres, chunked
+# fetchmany on SQLite), each chunk gets its selected options in one extra
+# query and is encoded and sent before the next one is read. Memory stays
+# at one chunk whatever the range.
+#
+# Under ASGI the chunks are pulled through an async iterator -- Django
+# would otherwise buffer a sync iterator completely before sending it.
+
+CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+COLUMNS = [
+    'order_id', 'created_at', 'status', 'table', 'waiter', 'customer_name', 'customer_phone',
+    'order_total', 'item_id', 'menu_item', 'quantity', 'unit_price', 'options',
+]
+
+_SelectedOption = OrderItem.selected_options.through
+
+
+def parse_range(start, end):
+    """'YYYY-MM-DD' dates, both inclusive -> [start, end) aware datetimes."""
+    return day_bounds(*parse_days(start, end))
+
+
+def export_lines(restaurant_id, start, end, chunk_size=CHUNK_SIZE):
+    """Yields lists of up to `chunk_size` row tuples (COLUMNS order)."""
+    lines = (
+        OrderItem.objects
+        # Plain range on the indexed created_at (no __date)
+        .filter(order__restaurant_id=restaurant_id, order__created_at__gte=start, order__created_at__lt=end)
+        .order_by('order_id', 'id')
+        .values_list(
+            'order_id', 'order__created_at', 'order__status', 'order__table__name', 'order__waiter__name',
+            'order__customer_name', 'order__customer_phone', 'order__total_amount',
+            'id', 'menu_item__name', 'quantity', 'price_at_time_of_order',
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        options = {}
+        links = (
+            _SelectedOption.objects
+            .filter(orderitem_id__in=[line[8] for line in chunk])
+            .order_by('variantoption_id')
+            .values_list('orderitem_id', 'variantoption__name')
+        )
+        for item_id, name in links:
+            options.setdefault(item_id, []).append(name)
+        yield [line + (", ".join(options.get(line[8], ())),) for line in chunk]
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for chunk in chunks:
+        # csv writes None as '' and Decimals exactly; only the timestamp needs help
+        writer.writerows(row[:1] + (row[1].isoformat(),) + row[2:] for row in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_ndjson(chunks):
+    # Amounts and timestamps as strings (exact decimals), like DRF's default
+    for chunk in chunks:
+        yield "".join(json.dumps(dict(zip(COLUMNS, row)), default=_text) + "\n" for row in chunk)
+
+
+ENCODERS = {'csv': encode_csv, 'ndjson': encode_ndjson}
+
+
+def export_sales_chunks(restaurant_id, start, end, fmt='csv', chunk_size=CHUNK_SIZE):
+    """Encoded text, one piece per chunk of lines."""
+    return ENCODERS[fmt](export_lines(restaurant_id, start, end, chunk_size))
+
+
+async def _async_chunks(chunks):
+    # sync_to_async is thread-sensitive: every next() runs on the same thread,
+    # so the cursor stays on one connection
+    step = sync_to_async(next)
+    while True:
+        chunk = await step(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+@staff_member_required
+@require_http_methods(['GET'])
+def export_sales(request, restaurant_id):
+    """GET ?from=YYYY-MM-DD&to=YYYY-MM-DD[&format=csv|ndjson] (staff only)."""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in ENCODERS:
+        return JsonResponse({"error": f"format must be one of {', '.join(ENCODERS)}"}, status=400)
+    try:
+        start, end = parse_range(request.GET.get('from'), request.GET.get('to'))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    chunks = export_sales_chunks(restaurant_id, start, end, fmt)
+    if isinstance(request, ASGIRequest):
+        chunks = _async_chunks(chunks)
+    filename = f"sales-{request.GET['from']}-{request.GET['to']}.{fmt}"
+    return StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+    })
@@ -0,0 +1,255 @@
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from rest_framework import serializers
+
+from .models import Order, OrderItem, Recipe
+from .pagination import encode_cursor, keyset_page
+
+# =========================================
+#  SERIALIZER-FREE READ PATH (hot polling endpoints)
+# =========================================
+# Builds the exact same dicts as TableSerializer / OrderSerializer /
+# KitchenOrderSerializer straight from .values() rows: one query per level
+# instead of one per row, and no per-request serializer/field construction.
+# Scalar formatting reuses single, pre-built DRF field instances so decimals
+# and datetimes come out byte-for-byte the same as the serializers.
+# restaurant/tests.py holds the parity tests; keep both sides in sync.
+#
+# Each builder is written once as a "plan": a generator that yields the
+# querysets it needs and receives their rows back. _run() feeds it with the
+# sync ORM, _arun() with the async ORM (for the async views).
+#
+# Order listings can be projected (?fields=id,status,... -- without "items"
+# the item/option queries are skipped altogether) and keyset-paginated: the
+# page's sort keys are read first, then the rows are built for just those
+# orders, so a banquet table or a stuck backlog never loads more than a page.
+
+_money = serializers.DecimalField(max_digits=10, decimal_places=2).to_representation
+_price_adjustment = serializers.DecimalField(max_digits=6, decimal_places=2).to_representation
+_quantity_required = serializers.DecimalField(max_digits=10, decimal_places=3).to_representation
+_datetime = serializers.DateTimeField().to_representation
+
+_SelectedOption = OrderItem.selected_options.through
+
+ORDER_FIELDS = ('id', 'restaurant', 'table', 'status', 'total_amount', 'items', 'customer_name', 'customer_phone')
+KITCHEN_ORDER_FIELDS = ('id', 'table_name', 'waiter_name', 'created_at', 'items')
+
+
+def _decimal(fmt, value):
+    return None if value is None else fmt(value)
+
+
+def parse_fields(raw, allowed):
+    """?fields=a,b -> those of `allowed` in its order (all of them if absent). ValueError for unknown names."""
+    if not raw:
+        return allowed
+    wanted = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = wanted - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return tuple(name for name in allowed if name in wanted)
+
+
+def _project(rows, fields, allowed):
+    if fields == allowed:
+        return rows
+    return [{name: row[name] for name in fields} for row in rows]
+
+
+def _run(plan):
+    try:
+        queryset = next(plan)
+        while True:
+            queryset = plan.send(list(queryset))
+    except StopIteration as done:
+        return done.value
+
+
+async def _arun(plan):
+    # One hop to the DB thread per builder rather than one per query (which is
+    # what the async ORM's aiterator would do): same thread, fewer switches
+    return await sync_to_async(_run)(plan)
+
+
+def _table_rows_plan(tables):
+    rows = yield tables.values('id', 'name', 'is_occupied')
+    return rows
+
+
+def _selected_options_plan(item_ids):
+    """orderitem id -> [(option id, name, price_adjustment), ...]"""
+    selected = defaultdict(list)
+    links = yield (
+        _SelectedOption.objects.filter(orderitem_id__in=item_ids)
+        .order_by('variantoption_id')
+        .values_list('orderitem_id', 'variantoption_id', 'variantoption__name', 'variantoption__price_adjustment')
+    )
+    for item_id, option_id, name, adjustment in links:
+        selected[item_id].append((option_id, name, adjustment))
+    return selected
+
+
+def _option_recipes_plan(option_ids):
+    """variant option id -> RecipeSerializer rows"""
+    recipes = defaultdict(list)
+    rows = yield (
+        Recipe.objects.filter(variant_option_id__in=option_ids)
+        .order_by('id')
+        .values_list('id', 'variant_option_id', 'ingredient_id', 'ingredient__name',
+                     'ingredient__unit', 'quantity_required')
+    )
+    for recipe_id, option_id, ingredient_id, ingredient_name, unit, qty in rows:
+        recipes[option_id].append({
+            'id': recipe_id,
+            'ingredient': ingredient_id,
+            'ingredient_name': ingredient_name,
+            'ingredient_unit': unit,
+            'quantity_required': _decimal(_quantity_required, qty),
+        })
+    return recipes
+
+
+def _order_rows_plan(orders, fields=ORDER_FIELDS):
+    rows = yield orders.values(
+        'id', 'restaurant_id', 'table_id', 'status', 'total_amount', 'customer_name', 'customer_phone'
+    )
+    if not rows:
+        return []
+
+    items_by_order = defaultdict(list)
+    items = [] if 'items' not in fields else (yield (
+        OrderItem.objects.filter(order_id__in=[row['id'] for row in rows])
+        .order_by('id')
+        .values_list('id', 'order_id', 'menu_item_id', 'menu_item__name', 'quantity', 'price_at_time_of_order')
+    ))
+    selected = yield from _selected_options_plan([item[0] for item in items])
+    recipes = yield from _option_recipes_plan({opt[0] for opts in selected.values() for opt in opts})
+
+    for item_id, order_id, menu_item_id, menu_item_name, quantity, price in items:
+        items_by_order[order_id].append({
+            'menu_item': menu_item_id,
+            'menu_item_name': menu_item_name,
+            'quantity': quantity,
+            'price_at_time_of_order': _decimal(_money, price),
+            'selected_options': [
+                {
+                    'id': option_id,
+                    'name': name,
+                    'price_adjustment': _decimal(_price_adjustment, adjustment),
+                    'recipes': recipes.get(option_id, []),
+                }
+                for option_id, name, adjustment in selected.get(item_id, [])
+            ],
+        })
+
+    return _project([
+        {
+            'id': row['id'],
+            'restaurant': row['restaurant_id'],
+            'table': row['table_id'],
+            'status': row['status'],
+            'total_amount': _decimal(_money, row['total_amount']),
+            'items': items_by_order.get(row['id'], []),
+            'customer_name': row['customer_name'],
+            'customer_phone': row['customer_phone'],
+        }
+        for row in rows
+    ], fields, ORDER_FIELDS)
+
+
+def _kitchen_order_rows_plan(orders, fields=KITCHEN_ORDER_FIELDS):
+    rows = yield orders.values('id', 'table__name', 'waiter__name', 'created_at')
+    if not rows:
+        return []
+
+    items_by_order = defaultdict(list)
+    items = [] if 'items' not in fields else (yield (
+        OrderItem.objects.filter(order_id__in=[row['id'] for row in rows])
+        .order_by('id')
+        .values_list('id', 'order_id', 'quantity', 'menu_item__name')
+    ))
+    selected = yield from _selected_options_plan([item[0] for item in items])
+
+    for item_id, order_id, quantity, menu_item_name in items:
+        items_by_order[order_id].append({
+            'quantity': quantity,
+            'menu_item_name': menu_item_name,
+            'variants': ", ".join(name for _, name, _ in selected.get(item_id, [])),
+        })
+
+    return _project([
+        {
+            'id': row['id'],
+            'table_name': row['table__name'],
+            'waiter_name': row['waiter__name'] if row['waiter__name'] is not None else "Unknown",
+            'created_at': _datetime(row['created_at']),
+            'items': items_by_order.get(row['id'], []),
+        }
+        for row in rows
+    ], fields, KITCHEN_ORDER_FIELDS)
+
+
+def _page_plan(build, orders, ordering, cursor, limit, fields):
+    """
+    One keyset page of `orders` (ordering must end with 'id' / '-id'): (rows,
+    next cursor). limit=None is the whole listing in one go (no cursor).
+    """
+    if limit is None:
+        rows = yield from build(orders.order_by(*ordering), fields)
+        return rows, None
+    keys = yield keyset_page(orders, ordering, cursor, limit)
+    next_cursor = None
+    if len(keys) > limit:
+        keys = keys[:limit]
+        next_cursor = encode_cursor(list(keys[-1]))
+    if not keys:
+        return [], None
+    rows = yield from build(Order.objects.filter(id__in=[key[-1] for key in keys]).order_by(*ordering), fields)
+    return rows, next_cursor
+
+
+# --- Public builders: sync for the DRF views, a* for the async views ---
+
+def table_rows(tables):
+    """TableSerializer(tables, many=True).data"""
+    return _run(_table_rows_plan(tables))
+
+
+def order_rows(orders, fields=ORDER_FIELDS):
+    """OrderSerializer(orders, many=True).data"""
+    return _run(_order_rows_plan(orders, fields))
+
+
+def kitchen_order_rows(orders, fields=KITCHEN_ORDER_FIELDS):
+    """KitchenOrderSerializer(orders, many=True).data"""
+    return _run(_kitchen_order_rows_plan(orders, fields))
+
+
+def order_page(orders, ordering, cursor, limit, fields=ORDER_FIELDS):
+    """(order_rows of one keyset page, next cursor or None)"""
+    return _run(_page_plan(_order_rows_plan, orders, ordering, cursor, limit, fields))
+
+
+def kitchen_order_page(orders, ordering, cursor, limit, fields=KITCHEN_ORDER_FIELDS):
+    return _run(_page_plan(_kitchen_order_rows_plan, orders, ordering, cursor, limit, fields))
+
+
+async def atable_rows(tables):
+    return await _arun(_table_rows_plan(tables))
+
+
+async def aorder_rows(orders, fields=ORDER_FIELDS):
+    return await _arun(_order_rows_plan(orders, fields))
+
+
+async def akitchen_order_rows(orders, fields=KITCHEN_ORDER_FIELDS):
+    return await _arun(_kitchen_order_rows_plan(orders, fields))
+
+
+async def aorder_page(orders, ordering, cursor, limit, fields=ORDER_FIELDS):
+    return await _arun(_page_plan(_order_rows_plan, orders, ordering, cursor, limit, fields))
+
+
+async def akitchen_order_page(orders, ordering, cursor, limit, fields=KITCHEN_ORDER_FIELDS):
+    return await _arun(_page_plan(_kitchen_order_rows_plan, orders, ordering, cursor, limit, fields))
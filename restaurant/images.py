@@ -0,0 +1,102 @@
+import hashlib
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .jobs import job, LOW
+from .models import MenuItem, Restaurant
+
+# =========================================
+#  MENU IMAGE VARIANTS (thumbnails for the tablets)
+# =========================================
+# When a MenuItem image is saved we produce WebP copies at a few widths so
+# the menu grid downloads ~10 KB thumbnails instead of full-size photos.
+# File names are the hash of the encoded bytes, so a URL never changes
+# content and can be cached forever.
+# The variants remember the name and size of the upload they were made from;
+# saves that don't touch the image (price, availability, ...) queue nothing.
+# The work runs on the restaurant/jobs.py runner.
+
+VARIANT_WIDTHS = (160, 320, 640)
+VARIANT_DIR = 'menu_images/variants'
+WEBP_QUALITY = 80
+
+
+def _source(item):
+    """{"name", "size"} of the item's current upload (None if the file is gone)."""
+    try:
+        return {'name': item.image.name, 'size': item.image.size}
+    except OSError:
+        return None
+
+
+def variants_stale(item):
+    """True if the item's variants weren't made from its current image (or it has none to clear)."""
+    if not item.image:
+        return bool(item.image_variants)
+    source = _source(item)
+    return source is not None and (item.image_variants or {}).get('source') != source
+
+
+def render_variants(source):
+    """Returns {width: webp bytes} for every configured width (never upscales)."""
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            # LA / PA / P with a transparent index all keep their alpha
+            original = original.convert('RGBA' if original.has_transparency_data else 'RGB')
+
+        variants = {}
+        for width in VARIANT_WIDTHS:
+            copy = original.copy()
+            copy.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            copy.save(buffer, format='WEBP', quality=WEBP_QUALITY, method=4)
+            variants[width] = buffer.getvalue()
+        return variants
+
+
+@job(priority=LOW, durable=True)
+def build_variants(menu_item_id, force=False):
+    """Generates + stores the variants for one item. Safe to call repeatedly."""
+    item = MenuItem.objects.filter(id=menu_item_id).only('id', 'restaurant_id', 'image', 'image_variants').first()
+    if item is None:
+        return None
+    if not item.image:
+        if item.image_variants:
+            MenuItem.objects.filter(id=item.id).update(image_variants={})
+            Restaurant.bump_menu_version(item.restaurant_id)
+        return {}
+
+    if not force and not variants_stale(item):
+        return item.image_variants
+    source = _source(item)
+
+    item.image.open('rb')
+    try:
+        rendered = render_variants(item.image)
+    finally:
+        item.image.close()
+
+    variants = {'source': source}
+    for width, data in rendered.items():
+        name = f"{VARIANT_DIR}/{hashlib.sha256(data).hexdigest()[:20]}.webp"
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(data))
+        variants[str(width)] = name
+
+    # .update() so we don't fire post_save (and schedule ourselves) again
+    MenuItem.objects.filter(id=item.id).update(image_variants=variants)
+    Restaurant.bump_menu_version(item.restaurant_id)
+    return variants
+
+
+def variant_urls(item):
+    """{"160": url, "320": url, ...} for the serializers (empty until generated)."""
+    return {
+        width: default_storage.url(name)
+        for width, name in (item.image_variants or {}).items()
+        if width != 'source'
+    }
@@ -0,0 +1,220 @@
+import itertools
+import json
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# =========================================
+#  BACKGROUND JOBS (in-process, no Redis/Celery)
+# =========================================
+# Side effects that don't have to happen before the response (low-stock
+# checks, cost recalculation, ...) are deferred here:
+#
+#     @job(priority=HIGH)
+#     def check_low_stock(restaurant_id): ...
+#
+#     check_low_stock.defer(str(restaurant.id))
+#
+# - Jobs go into a bounded priority queue served by a few worker threads.
+# - Deferring inside a transaction waits for the commit (nothing runs for a
+#   rolled-back order).
+# - A job already waiting with the same arguments isn't queued twice.
+# - durable=True jobs are also written to BackgroundJob in the caller's
+#   transaction and deleted once done, so they survive a restart: whatever is
+#   left is picked up when the runner starts (or by `manage.py run_jobs`).
+#   Recovery assumes one app process (daphne) owns the queue.
+# Arguments must be JSON-serializable (they may end up in the database).
+
+HIGH, NORMAL, LOW = 0, 5, 9
+RETRY_DELAY = 2  # seconds, doubled after every failed attempt
+
+_registry = {}
+
+
+def job(priority=NORMAL, durable=False, coalesce=True, max_retries=3):
+    def decorator(func):
+        func.job_name = f"{func.__module__}.{func.__name__}"
+        func.job_options = {'priority': priority, 'durable': durable, 'coalesce': coalesce, 'max_retries': max_retries}
+        func.defer = lambda *args, **kwargs: runner.defer(func, *args, **kwargs)
+        _registry[func.job_name] = func
+        return func
+    return decorator
+
+
+class JobRunner:
+
+    def __init__(self):
+        self._queue = None
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiting = set()   # coalescing keys of queued jobs
+        self._rows = set()      # BackgroundJob ids queued or running in this process
+        self._timers = set()    # retries waiting out their backoff
+
+    # --- Starting ---
+
+    def start(self):
+        with self._lock:
+            if self._queue is not None:
+                return
+            self._queue = queue.PriorityQueue(maxsize=getattr(settings, 'JOB_QUEUE_SIZE', 1000))
+            for n in range(getattr(settings, 'JOB_WORKERS', 2)):
+                threading.Thread(target=self._work, name=f'jobs-{n}', daemon=True).start()
+        self.recover()
+
+    def recover(self):
+        """Queue durable jobs left over from a previous run."""
+        from .models import BackgroundJob
+        pending = BackgroundJob.objects.filter(status='PENDING').order_by('priority', 'id')
+        count = 0
+        for row in pending.values('id', 'name', 'args', 'priority', 'attempts'):
+            if self._submit(row['name'], row['args'], row['priority'], row['id'], row['attempts']):
+                count += 1
+        if count:
+            logger.info("Recovered %d durable job(s)", count)
+        return count
+
+    # --- Producing ---
+
+    def defer(self, func, *args, priority=None):
+        options = func.job_options
+        priority = options['priority'] if priority is None else priority
+        args = list(args)
+        row_id = None
+        if options['durable']:
+            from .models import BackgroundJob
+            row_id = BackgroundJob.objects.create(name=func.job_name, args=args, priority=priority).id
+
+        if getattr(settings, 'JOBS_EAGER', False):
+            transaction.on_commit(lambda: self._execute(func.job_name, args, priority, row_id, 0))
+        else:
+            transaction.on_commit(lambda: self._submit(func.job_name, args, priority, row_id))
+
+    def _key(self, name, args):
+        func = _registry.get(name)
+        if func is None or not func.job_options['coalesce']:
+            return None
+        return name, json.dumps(args, sort_keys=True, default=str)
+
+    def _submit(self, name, args, priority, row_id=None, attempts=0):
+        self.start()
+        key = self._key(name, args)
+        with self._lock:
+            if row_id is not None and row_id in self._rows:
+                return False
+            if key is not None and key in self._waiting:
+                duplicate = True
+            else:
+                duplicate = False
+                if key is not None:
+                    self._waiting.add(key)
+                if row_id is not None:
+                    self._rows.add(row_id)
+        if duplicate:
+            if row_id is not None:
+                from .models import BackgroundJob
+                BackgroundJob.objects.filter(id=row_id).delete()
+            return False
+
+        try:
+            self._queue.put_nowait((priority, next(self._seq), name, args, key, row_id, attempts))
+        except queue.Full:
+            with self._lock:
+                self._waiting.discard(key)
+                self._rows.discard(row_id)
+            if row_id is None:
+                logger.warning("Job queue full, dropping %s%s", name, tuple(args))
+            else:
+                logger.warning("Job queue full, %s stays in the database until the next recovery", name)
+            return False
+        return True
+
+    def drain(self, timeout=None):
+        """Wait until the queue is empty, no job is running and no retry is pending. False on timeout."""
+        if self._queue is None:
+            return True
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(
+                lambda: not self._queue.unfinished_tasks and not self._timers, timeout)
+
+    def cancel_retries(self):
+        """
+        Drops the retries still waiting out their backoff (at shutdown). Durable
+        ones stay PENDING in the database for the next recovery. Returns how many.
+        """
+        with self._lock:
+            timers, self._timers = self._timers, set()
+        for timer in timers:
+            timer.cancel()
+        self._notify_drain()
+        return len(timers)
+
+    def _notify_drain(self):
+        if self._queue is not None:
+            with self._queue.all_tasks_done:
+                self._queue.all_tasks_done.notify_all()
+
+    # --- Consuming ---
+
+    def _work(self):
+        while True:
+            priority, _, name, args, key, row_id, attempts = self._queue.get()
+            with self._lock:
+                # From here on a new defer() with the same arguments queues a fresh run
+                self._waiting.discard(key)
+            try:
+                self._execute(name, args, priority, row_id, attempts)
+            finally:
+                with self._lock:
+                    self._rows.discard(row_id)
+                close_old_connections()
+                self._queue.task_done()
+
+    def _execute(self, name, args, priority, row_id, attempts):
+        from .models import BackgroundJob
+        func = _registry.get(name)
+        try:
+            if func is None:
+                raise LookupError(f"Unknown job {name}")
+            func(*args)
+        except Exception as e:
+            attempts += 1
+            retry = func is not None and attempts < func.job_options['max_retries']
+            if row_id is not None:
+                BackgroundJob.objects.filter(id=row_id).update(
+                    attempts=attempts, last_error=str(e), status='PENDING' if retry else 'FAILED')
+            if not retry:
+                logger.exception("Job %s%s failed after %d attempt(s)", name, tuple(args), attempts)
+                return
+            logger.warning("Job %s%s failed (attempt %d), retrying: %s", name, tuple(args), attempts, e)
+            if self._queue is not None:
+                job = (name, args, priority, row_id, attempts)
+                timer = threading.Timer(RETRY_DELAY * 2 ** (attempts - 1), lambda: self._retry(timer, *job))
+                timer.daemon = True
+                with self._lock:
+                    self._timers.add(timer)  # before this run's task_done(), so drain() never sees a gap
+                timer.start()
+        else:
+            if row_id is not None:
+                BackgroundJob.objects.filter(id=row_id).delete()
+
+    def _retry(self, timer, *job):
+        try:
+            with self._lock:
+                if timer not in self._timers:
+                    return  # cancelled
+            self._submit(*job)
+        finally:
+            # Queued (or dropped) by now: no longer pending as a retry
+            with self._lock:
+                self._timers.discard(timer)
+            self._notify_drain()
+            close_old_connections()
+
+
+runner = JobRunner()
@@ -0,0 +1,149 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.utils import timezone
+
+from restaurant.admin import OrderAdmin, OrderItemAdmin
+from restaurant.models import Category, MenuItem, Order, OrderItem, Table
+
+from .bench_sqlite import _seed, _use_database
+
+
+# Like-for-like baseline: the same columns, filters, search and ordering as
+# restaurant/admin.py, with none of the tuning (stock paginator and widgets,
+# Django's own select_related)
+class StockOrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+
+
+class StockOrderAdmin(admin.ModelAdmin):
+    list_display = OrderAdmin.list_display
+    list_filter = OrderAdmin.list_filter
+    search_fields = OrderAdmin.search_fields
+    ordering = OrderAdmin.ordering
+    inlines = [StockOrderItemInline]
+    table_name = OrderAdmin.table_name
+
+
+class StockOrderItemAdmin(admin.ModelAdmin):
+    list_display = OrderItemAdmin.list_display
+    search_fields = OrderItemAdmin.search_fields
+    ordering = OrderItemAdmin.ordering
+
+
+baseline = admin.AdminSite(name='baseline')
+baseline.register(Order, StockOrderAdmin)
+baseline.register(OrderItem, StockOrderItemAdmin)
+
+urlpatterns = [
+    path('baseline/', baseline.urls),
+    path('admin/', admin.site.urls),
+]
+
+
+class Command(BaseCommand):
+    help = "Admin changelist/change form timings on a large synthetic order table: stock vs optimized ModelAdmins."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200000)
+        parser.add_argument('--menu-items', type=int, default=2000)
+        parser.add_argument('--tables', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        original = connections.settings
+        with tempfile.TemporaryDirectory() as tmp, override_settings(ROOT_URLCONF=__name__, DEBUG=False):
+            _use_database(os.path.join(tmp, 'admin.sqlite3'), tuned=False)
+            call_command('migrate', verbosity=0)
+            self.stdout.write(f"Building {options['orders']} orders...")
+            order_id = self._build(options)
+
+            client = Client()
+            client.force_login(get_user_model().objects.create_superuser('bench', 'bench@example.com', 'bench'))
+            # The params DateFieldListFilter's "This month" link sends
+            month_start = timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            next_month = (month_start + timedelta(days=32)).replace(day=1)
+            this_month = urlencode({'created_at__gte': month_start, 'created_at__lt': next_month})
+            pages = [
+                ("orders, page 1", "order/"),
+                ("orders, page 500", "order/?p=500"),
+                ("orders, status filter", "order/?status__exact=PENDING"),
+                ("order change form", f"order/{order_id}/change/"),
+                ("items, page 1", "orderitem/"),
+                ("item change form", f"orderitem/{OrderItem.objects.order_by('id').values_list('id', flat=True).first()}/change/"),
+                ("orders, this month", f"order/?{this_month}"),
+            ]
+
+            self.stdout.write(f"\n{'page':<26}{'stock ms':>10}{'queries':>9}{'optimized ms':>14}{'queries':>9}")
+            for label, url in pages:
+                row = []
+                for site in ('baseline', 'admin'):
+                    row.append(self._time(client, f'/{site}/restaurant/{url}', options['repeat']))
+                (stock_ms, stock_q), (fast_ms, fast_q) = row
+                self.stdout.write(f"{label:<26}{stock_ms:>10.1f}{stock_q:>9}{fast_ms:>14.1f}{fast_q:>9}")
+        connections.close_all()
+        connections.settings = original
+
+    def _time(self, client, url, repeat):
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url}: HTTP {response.status_code}")
+            queries = len(captured)
+        return statistics.median(timings), queries
+
+    def _build(self, options):
+        restaurant, items, tables, waiter = _seed()
+        category = Category.objects.create(restaurant=restaurant, name="Bulk")
+        MenuItem.objects.bulk_create(
+            MenuItem(restaurant=restaurant, category=category, name=f"Bulk dish {i}", price=Decimal('99.00'))
+            for i in range(options['menu_items'])
+        )
+        tables += Table.objects.bulk_create(
+            Table(restaurant=restaurant, name=f"B{i}") for i in range(options['tables'])
+        )
+        items = list(MenuItem.objects.filter(restaurant=restaurant))
+
+        # Spread orders over the last year (auto_now_add would stamp them all "now")
+        created_at = Order._meta.get_field('created_at')
+        created_at.auto_now_add = False
+        try:
+            rng = random.Random(42)
+            now = timezone.now()
+            batch = 5000
+            for start in range(0, options['orders'], batch):
+                orders = Order.objects.bulk_create(
+                    Order(restaurant=restaurant, table=rng.choice(tables), waiter=waiter,
+                          status=rng.choice(['PENDING', 'READY', 'COMPLETED', 'COMPLETED']),
+                          total_amount=Decimal('250.00'), created_at=now - timedelta(minutes=rng.randrange(525600)))
+                    for _ in range(min(batch, options['orders'] - start))
+                )
+                OrderItem.objects.bulk_create(
+                    OrderItem(order=order, menu_item=rng.choice(items), quantity=1, price_at_time_of_order=Decimal('125.00'))
+                    for order in orders for _ in range(2)
+                )
+        finally:
+            created_at.auto_now_add = True
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        return Order.objects.order_by('id').values_list('id', flat=True).first()
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, override_settings
+from django.urls import include, path
+
+from restaurant import async_views, views
+from restaurant.models import Order, Table
+
+from .bench_sqlite import _seed, _use_database
+
+# Both implementations side by side, so one process can hit either of them
+_endpoints = [
+    ('menu/<uuid:restaurant_id>/', 'get_restaurant_menu'),
+    ('tables/<uuid:restaurant_id>/', 'get_tables'),
+    ('orders/create/', 'create_order'),
+    ('orders/active/<uuid:restaurant_id>/', 'get_active_orders'),
+    ('kitchen/orders/', 'get_kitchen_orders'),
+    ('bill/<int:table_id>/', 'get_table_bill'),
+]
+urlpatterns = [
+    path('sync/', include([path(route, getattr(views, name)) for route, name in _endpoints])),
+    path('async/', include([path(route, getattr(async_views, name)) for route, name in _endpoints])),
+]
+
+
+class Command(BaseCommand):
+    help = "Hot endpoints under ASGI: sync DRF views vs native async views (req/s, threads, memory)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50, help="concurrent clients")
+        parser.add_argument('--requests', type=int, default=20, help="requests per client")
+        parser.add_argument('--tuned', action='store_true', help="use the SQLITE_PRODUCTION database settings")
+
+    def handle(self, *args, **options):
+        original = connections.settings
+        with tempfile.TemporaryDirectory() as tmp, override_settings(ROOT_URLCONF=__name__):
+            _use_database(os.path.join(tmp, 'bench.sqlite3'), tuned=options['tuned'])
+            call_command('migrate', verbosity=0)
+            seed = _seed()
+            results = {}
+            for prefix in ('sync', 'async'):
+                # Same starting point for both: no orders left over from the previous run
+                Order.objects.all().delete()
+                Table.objects.update(is_occupied=False)
+                results[prefix] = asyncio.run(self._run(prefix, seed, options))
+        connections.close_all()
+        connections.settings = original
+
+        self.stdout.write(f"{options['clients']} clients x {options['requests']} requests (1 in 5 is an order)\n")
+        self.stdout.write(f"{'views':<8}{'req/s':>10}{'errors':>8}{'peak threads':>14}{'peak MiB':>10}")
+        for prefix, (done, errors, elapsed, threads, peak) in results.items():
+            self.stdout.write(f"{prefix:<8}{done / elapsed:>10.0f}{errors:>8}{threads:>14}{peak / 2**20:>10.1f}")
+
+    async def _run(self, prefix, seed, options):
+        restaurant, items, tables, waiter = seed
+        client = AsyncClient()
+        base = f'/{prefix}'
+        reads = [
+            f'{base}/menu/{restaurant.id}/',
+            f'{base}/tables/{restaurant.id}/',
+            f'{base}/orders/active/{restaurant.id}/',
+            f'{base}/kitchen/orders/',
+        ]
+        done = errors = 0
+        peak_threads = threading.active_count()
+        running = True
+
+        async def sample_threads():
+            nonlocal peak_threads
+            while running:
+                peak_threads = max(peak_threads, threading.active_count())
+                await asyncio.sleep(0.005)
+
+        async def worker(n):
+            nonlocal done, errors
+            for i in range(options['requests']):
+                if i % 5 == 4:
+                    payload = {
+                        'restaurant_id': str(restaurant.id),
+                        'table_id': tables[(n + i) % len(tables)].id,
+                        'waiter_id': waiter.id,
+                        'items': [{'id': items[(n + i) % len(items)].id, 'qty': 1}],
+                    }
+                    response = await client.post(f'{base}/orders/create/', payload, content_type='application/json')
+                elif i % 5 == 3:
+                    response = await client.get(f'{base}/bill/{tables[n % len(tables)].id}/')
+                else:
+                    response = await client.get(reads[(n + i) % len(reads)])
+                done += 1
+                if response.status_code >= 500 or response.status_code == 400:
+                    errors += 1
+
+        sampler = asyncio.create_task(sample_threads())
+        tracemalloc.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(options['clients'])))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        running = False
+        await sampler
+        return done, errors, elapsed, peak_threads, peak
@@ -0,0 +1,111 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from restaurant import chain
+from restaurant.models import Order
+
+from .bench_sqlite import _seed, _use_database
+
+
+class Command(BaseCommand):
+    help = "Chain dashboard latency (cold cache): restaurants one after another vs on the thread pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=20000, help="orders for the biggest restaurant")
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--latency', type=float, default=0,
+                            help="ms added to every query, like the round trip to a remote database")
+
+    def handle(self, *args, **options):
+        original = connections.settings
+        with tempfile.TemporaryDirectory() as tmp:
+            # Production SQLite mode: WAL lets the pool threads read side by side
+            _use_database(os.path.join(tmp, 'chain.sqlite3'), tuned=True)
+            call_command('migrate', verbosity=0)
+            restaurants = self._build(options)
+            if options['latency']:
+                self._add_latency(options['latency'] / 1000)
+            first = timezone.localdate() - timedelta(days=options['days'] - 1)
+            last = timezone.localdate()
+
+            single = []
+            for rid, _ in restaurants:
+                cache.clear()
+                began = time.perf_counter()
+                chain.restaurant_summary(rid, first, last)
+                single.append((time.perf_counter() - began) * 1000)
+            self.stdout.write(f"\n{len(restaurants)} restaurants, {options['days']} days, cold cache, "
+                              f"+{options['latency']:g} ms per query, {os.cpu_count()} CPU(s)")
+            self.stdout.write(f"  slowest single restaurant  {max(single):8.1f} ms")
+            self.stdout.write(f"  sum of all restaurants     {sum(single):8.1f} ms")
+
+            for label, workers in (("sequential", 1), (f"pool ({settings.CHAIN_WORKERS} threads)", None)):
+                timings = []
+                for _ in range(options['repeat']):
+                    cache.clear()
+                    began = time.perf_counter()
+                    chain.chain_dashboard(restaurants, first, last, workers=workers)
+                    timings.append((time.perf_counter() - began) * 1000)
+                self.stdout.write(f"  {label:<26} {statistics.median(timings):8.1f} ms")
+
+            began = time.perf_counter()
+            chain.chain_dashboard(restaurants, first, last)
+            self.stdout.write(f"  warm (cached summaries)    {(time.perf_counter() - began) * 1000:8.1f} ms")
+            connection_created.disconnect(self._slow_connection)
+        connections.close_all()
+        connections.settings = original
+
+    def _add_latency(self, seconds):
+        def wrapper(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+        self._wrapper = wrapper
+        connection_created.connect(self._slow_connection)  # the pool threads' connections
+        connection.ensure_connection()
+        connection.execute_wrappers.append(wrapper)
+
+    def _slow_connection(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self._wrapper)
+
+    def _build(self, options):
+        rng = random.Random(7)
+        now = timezone.now()
+        restaurants = []
+        for i in range(options['restaurants']):
+            restaurant, items, tables, waiter = _seed()
+            restaurant.name = f"Branch {i}"
+            restaurant.save(update_fields=['name'])
+            # Branches of different sizes: the first is the biggest
+            count = max(options['orders'] // (i + 1), 1)
+            orders = []
+            for _ in range(count):
+                created = now - timedelta(minutes=rng.randrange(options['days'] * 1440))
+                orders.append(Order(restaurant=restaurant, table=rng.choice(tables), waiter=waiter,
+                                    status=rng.choice(['PAID', 'COMPLETED', 'READY']), total_amount=Decimal('320.00'),
+                                    created_at=created, ready_at=created + timedelta(minutes=rng.randrange(5, 40))))
+            created_at = Order._meta.get_field('created_at')
+            created_at.auto_now_add = False  # keep the spread-out timestamps
+            try:
+                Order.objects.bulk_create(orders, batch_size=5000)
+            finally:
+                created_at.auto_now_add = True
+            restaurants.append((restaurant.id, restaurant.name))
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.stdout.write(f"Built {len(restaurants)} restaurants")
+        return restaurants
@@ -0,0 +1,101 @@
+import csv
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.utils import timezone
+
+from restaurant.exports import COLUMNS, export_sales_chunks
+from restaurant.models import Order
+
+from .bench_admin import Command as AdminBench
+from .bench_sqlite import _use_database
+
+
+def _materialized_csv(restaurant_id, start, end):
+    """The obvious way: load every order with its lines, then write the file."""
+    orders = (
+        Order.objects.filter(restaurant_id=restaurant_id, created_at__gte=start, created_at__lt=end)
+        .select_related('table', 'waiter')
+        .prefetch_related('items__menu_item', 'items__selected_options')
+        .order_by('id')
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for order in list(orders):
+        for item in order.items.all():
+            writer.writerow([
+                order.id, order.created_at.isoformat(), order.status, order.table.name if order.table else '',
+                order.waiter.name if order.waiter else '', order.customer_name or '', order.customer_phone or '',
+                order.total_amount, item.id, item.menu_item.name, item.quantity, item.price_at_time_of_order,
+                ", ".join(option.name for option in item.selected_options.all()),
+            ])
+    return [buffer.getvalue()]
+
+
+class Command(BaseCommand):
+    help = "Sales export throughput and peak memory: streamed chunks vs loading the range first."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        original = connections.settings
+        with tempfile.TemporaryDirectory() as tmp:
+            _use_database(os.path.join(tmp, 'export.sqlite3'), tuned=False)
+            call_command('migrate', verbosity=0)
+            self.stdout.write(f"Building {options['orders']} orders...")
+            AdminBench()._build({'orders': options['orders'], 'menu_items': 200, 'tables': 50})
+            restaurant_id = Order.objects.values_list('restaurant_id', flat=True).first()
+
+            now = timezone.now()
+            ranges = [("1 month", now - timedelta(days=30)), ("12 months", now - timedelta(days=366))]
+            variants = [
+                ("materialized", lambda start, end: _materialized_csv(restaurant_id, start, end)),
+                ("streamed csv", lambda start, end: export_sales_chunks(restaurant_id, start, end, 'csv', options['chunk_size'])),
+                ("streamed ndjson", lambda start, end: export_sales_chunks(restaurant_id, start, end, 'ndjson', options['chunk_size'])),
+            ]
+
+            self.stdout.write(f"\n{'range':<11}{'variant':<17}{'rows':>9}{'MB':>8}{'seconds':>9}{'rows/s':>10}{'peak MB':>9}")
+            for label, start in ranges:
+                end = now
+                for name, produce in variants:
+                    began = time.perf_counter()
+                    size = rows = 0
+                    for chunk in produce(start, end):
+                        size += len(chunk)
+                        rows += chunk.count("\n")
+                    elapsed = time.perf_counter() - began
+                    rows -= name != "streamed ndjson"  # header line
+
+                    # Separate pass: tracemalloc slows everything down
+                    tracemalloc.start()
+                    for chunk in produce(start, end):
+                        pass
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    self.stdout.write(f"{label:<11}{name:<17}{rows:>9}{size / 1e6:>8.1f}{elapsed:>9.2f}"
+                                      f"{rows / elapsed:>10.0f}{peak / 1e6:>9.1f}")
+
+            # End to end through the view (staff session, StreamingHttpResponse)
+            client = Client()
+            client.force_login(get_user_model().objects.create_superuser('bench', 'bench@example.com', 'bench'))
+            began = time.perf_counter()
+            response = client.get(f'/api/export/sales/{restaurant_id}/',
+                                  {'from': f"{ranges[1][1]:%Y-%m-%d}", 'to': f"{now:%Y-%m-%d}"})
+            size = sum(len(chunk) for chunk in response.streaming_content)
+            elapsed = time.perf_counter() - began
+            self.stdout.write(f"\nHTTP GET (12 months, csv): {size / 1e6:.1f} MB in {elapsed:.2f}s "
+                              f"({size / 1e6 / elapsed:.1f} MB/s), streaming={response.streaming}")
+        connections.close_all()
+        connections.settings = original
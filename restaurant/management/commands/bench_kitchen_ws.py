@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import json
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+
+from channels.exceptions import ChannelFull
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from restaurant.models import Restaurant
+from restaurant.notifications import dispatcher
+from restaurant.routing import websocket_urlpatterns
+
+from .bench_sqlite import _use_database
+
+# A ticket the size of a real one (views.place_order)
+ITEMS = [{"name": f"Dish {i}", "qty": 2, "options": ["Large", "Extra cheese"]} for i in range(4)]
+
+
+class Screen:
+    """One simulated kitchen screen: a socket on ws/kitchen/[<restaurant>/] and when each order arrived."""
+
+    def __init__(self, application, restaurant_id=None):
+        path = f'/ws/kitchen/{restaurant_id}/' if restaurant_id else '/ws/kitchen/'
+        self.restaurant_id = restaurant_id
+        self.socket = WebsocketCommunicator(application, path)
+        self.arrived = {}  # order id -> perf_counter()
+
+    async def connect(self, timeout):
+        connected, _ = await self.socket.connect(timeout)
+        if not connected:
+            raise RuntimeError("connection refused")
+        await self.socket.receive_from(timeout)  # the snapshot
+
+    async def read(self):
+        # Straight off the output queue: receive_from's timeout machinery costs more than the consumer
+        while True:
+            message = await self.socket.output_queue.get()
+            arrived = time.perf_counter()
+            if message['type'] != 'websocket.send':
+                return
+            data = json.loads(message['text'])
+            if data['type'] == 'order':
+                self.arrived[data['order']['id']] = arrived
+
+
+class Command(BaseCommand):
+    help = ("Kitchen socket fan-out: thousands of simulated screens on one process, bursts of orders, "
+            "send -> receive latency, memory per connection and dropped messages.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=2000, help="screens on per-restaurant sockets")
+        parser.add_argument('--all-screens', type=int, default=20, help="extra screens on ws/kitchen/ (every restaurant)")
+        parser.add_argument('--restaurants', type=int, default=20)
+        parser.add_argument('--bursts', type=int, default=5)
+        parser.add_argument('--burst-size', type=int, default=100, help="orders fired back to back")
+        parser.add_argument('--pause', type=float, default=1.0, help="seconds between bursts")
+        parser.add_argument('--connect-batch', type=int, default=200)
+        parser.add_argument('--timeout', type=float, default=10,
+                            help="give up once nothing has arrived for this many seconds")
+
+    def handle(self, *args, **options):
+        original = connections.settings
+        with tempfile.TemporaryDirectory() as tmp:
+            _use_database(os.path.join(tmp, 'kitchen.sqlite3'), tuned=True)
+            call_command('migrate', verbosity=0)
+            restaurants = [str(Restaurant.objects.create(name=f"Branch {i}").id) for i in range(options['restaurants'])]
+            asyncio.run(self._run(restaurants, options))
+        connections.close_all()
+        connections.settings = original
+
+    async def _run(self, restaurants, options):
+        dispatcher.bind(asyncio.get_running_loop())
+        layer = get_channel_layer()
+        full = self._count_full(layer)
+        application = URLRouter(websocket_urlpatterns)
+        cycle = itertools.cycle(restaurants)
+        screens = [Screen(application, next(cycle)) for _ in range(options['clients'])]
+        screens += [Screen(application) for _ in range(options['all_screens'])]
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        began = time.perf_counter()
+        for start in range(0, len(screens), options['connect_batch']):
+            batch = screens[start:start + options['connect_batch']]
+            await asyncio.gather(*(screen.connect(options['timeout']) for screen in batch))
+        connect_s = time.perf_counter() - began
+        per_socket = (tracemalloc.get_traced_memory()[0] - baseline) / len(screens)
+        tracemalloc.stop()
+        readers = [asyncio.create_task(screen.read()) for screen in screens]
+
+        sent, ids = {}, itertools.count(1)
+        for burst in range(options['bursts']):
+            if burst:
+                await asyncio.sleep(options['pause'])
+            for _ in range(options['burst_size']):
+                order_id = next(ids)
+                restaurant_id = next(cycle)
+                sent[order_id] = (restaurant_id, time.perf_counter())
+                dispatcher.send({"type": "order_notification", "restaurant": restaurant_id,
+                                 "order": {"id": order_id, "table": "T1", "items": ITEMS, "total": "640.00"}})
+
+        expected = sum(self._expected(screen, sent) for screen in screens)
+        received, progress = 0, time.perf_counter()
+        while time.perf_counter() - progress < options['timeout']:
+            await asyncio.sleep(0.05)
+            now = sum(len(screen.arrived) for screen in screens)
+            if now >= expected:
+                received = now
+                break
+            if now > received:
+                received, progress = now, time.perf_counter()
+
+        latencies = sorted(
+            (arrived - sent[order_id][1]) * 1000
+            for screen in screens for order_id, arrived in screen.arrived.items()
+        )
+        last = max((max(screen.arrived.values()) for screen in screens if screen.arrived), default=time.perf_counter())
+        first = min(at for _, at in sent.values())
+
+        for reader in readers:
+            reader.cancel()
+        for start in range(0, len(screens), options['connect_batch']):
+            await asyncio.gather(*(screen.socket.disconnect() for screen in screens[start:start + options['connect_batch']]),
+                                 return_exceptions=True)
+
+        self.stdout.write(f"\n{len(screens)} screens ({options['clients']} on {len(restaurants)} restaurants, "
+                          f"{options['all_screens']} on every restaurant), {type(layer).__name__}, "
+                          f"capacity {getattr(layer, 'capacity', '?')} per channel")
+        self.stdout.write(f"  connect          {connect_s:8.2f} s  ({len(screens) / connect_s:.0f} sockets/s)")
+        self.stdout.write(f"  memory           {per_socket / 1024:8.1f} KiB per socket (Python heap), "
+                          f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+        self.stdout.write(f"  orders           {len(sent):8d}  in {options['bursts']} bursts of {options['burst_size']}")
+        self.stdout.write(f"  deliveries       {received:8d} / {expected}  "
+                          f"({received / max(last - first, 1e-9):.0f}/s)")
+        self.stdout.write(f"  undelivered      {expected - received:8d}  "
+                          f"({full[0]} refused by the layer: ChannelFull, dropped silently by group_send)")
+        if latencies:
+            self.stdout.write("  latency ms       " + "  ".join(
+                f"p{p} {latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)]:.1f}"
+                for p in (50, 90, 99)) + f"  max {latencies[-1]:.1f}")
+
+    def _expected(self, screen, sent):
+        if screen.restaurant_id is None:
+            return len(sent)
+        return sum(1 for restaurant_id, _ in sent.values() if restaurant_id == screen.restaurant_id)
+
+    def _count_full(self, layer):
+        """Counts the order events the layer drops: group_send swallows ChannelFull."""
+        full = [0]
+        send = layer.send
+
+        async def counting_send(channel, message):
+            try:
+                await send(channel, message)
+            except ChannelFull:
+                full[0] += len(message['events']) if message['type'] == 'order_batch' else 1
+                raise
+        layer.send = counting_send
+        return full
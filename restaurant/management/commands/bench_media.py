@@ -0,0 +1,72 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.views.static import serve
+
+from restaurant.media import serve_media
+
+
+def _drain(response):
+    # Consume the body the way a server would, so both paths do the file I/O
+    body = getattr(response, 'streaming_content', None)
+    size = sum(len(chunk) for chunk in body) if body is not None else len(response.content)
+    if hasattr(response, 'close'):
+        response.close()
+    return size
+
+
+class Command(BaseCommand):
+    help = "Measures media serving throughput: django.views.static.serve (old DEBUG-only path) vs serve_media."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="File under MEDIA_ROOT (default: largest file in menu_images/)")
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        path = options['path'] or self._largest_image()
+        factory = RequestFactory()
+        url = settings.MEDIA_URL + path
+        n = options['requests']
+
+        first = serve_media(factory.get(url), path)
+        etag, last_modified = first['ETag'], first['Last-Modified']
+        _drain(first)
+
+        scenarios = [
+            ("full GET", {}),
+            ("revalidate (If-None-Match)", {'HTTP_IF_NONE_MATCH': etag}),
+            ("revalidate (If-Modified-Since)", {'HTTP_IF_MODIFIED_SINCE': last_modified}),
+            ("range 64 KiB", {'HTTP_RANGE': 'bytes=0-65535'}),
+        ]
+        views = [
+            ("static.serve", lambda request: serve(request, path, document_root=settings.MEDIA_ROOT)),
+            ("serve_media", lambda request: serve_media(request, path)),
+        ]
+
+        self.stdout.write(f"{path} ({os.path.getsize(os.path.join(settings.MEDIA_ROOT, path))} bytes), {n} requests each\n")
+        self.stdout.write(f"{'scenario':<32}{'view':<14}{'req/s':>10}{'MB/s':>10}{'status':>8}")
+        for label, headers in scenarios:
+            for name, view in views:
+                total_bytes, status = 0, None
+                start = time.perf_counter()
+                for _ in range(n):
+                    response = view(factory.get(url, **headers))
+                    status = response.status_code
+                    total_bytes += _drain(response)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{label:<32}{name:<14}{n / elapsed:>10.0f}{total_bytes / elapsed / 1e6:>10.1f}{status:>8}"
+                )
+
+    def _largest_image(self):
+        folder = os.path.join(settings.MEDIA_ROOT, 'menu_images')
+        try:
+            files = [f for f in os.listdir(folder) if os.path.isfile(os.path.join(folder, f))]
+        except FileNotFoundError:
+            files = []
+        if not files:
+            raise CommandError("No files in MEDIA_ROOT/menu_images/, pass a path explicitly")
+        return 'menu_images/' + max(files, key=lambda f: os.path.getsize(os.path.join(folder, f)))
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from restaurant import menu_tree
+from restaurant.models import MenuItem, Recipe, Restaurant, VariantOption
+
+from .bench_pricing import Command as PricingBench
+from .bench_sqlite import _use_database
+
+
+class _Timed:
+    """Wall time and query count (CaptureQueriesContext keeps at most 9000)."""
+
+    def __init__(self, rows, label):
+        self.rows, self.label, self.queries = rows, label, 0
+
+    def _count(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connections['default'].execute_wrapper(self._count)
+        self._wrapper.__enter__()
+        self.began = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.rows.append((self.label, time.perf_counter() - self.began, self.queries))
+        self._wrapper.__exit__(*exc)
+
+
+class Command(BaseCommand):
+    help = "Whole-menu import/export: one save per object (what the admin does) vs menu_tree's bulk import."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=300, help="dishes on the menu")
+
+    def handle(self, *args, **options):
+        original = connections.settings
+        with tempfile.TemporaryDirectory() as tmp:
+            _use_database(os.path.join(tmp, 'menu_tree.sqlite3'), tuned=True)
+            call_command('migrate', verbosity=0)
+
+            rows = []
+            with _Timed(rows, "one save per object"):
+                source, _ = PricingBench()._build(options['items'])
+            with _Timed(rows, "export"):
+                document = json.loads(json.dumps(menu_tree.export_tree(source.id)))
+            branch = Restaurant.objects.create(name="New branch")
+            for label in ("import (new branch)", "re-import (no changes)"):
+                with _Timed(rows, label):
+                    menu_tree.import_tree(branch.id, document)
+
+            size = len(json.dumps(document))
+            self.stdout.write(
+                f"Menu: {MenuItem.objects.filter(restaurant=branch).count()} dishes, "
+                f"{VariantOption.objects.filter(group__menu_item__restaurant=branch).count()} options, "
+                f"{Recipe.objects.filter(menu_item__restaurant=branch).count() + Recipe.objects.filter(variant_option__group__menu_item__restaurant=branch).count()} recipe lines, "
+                f"{size / 1024:.0f} KiB of JSON")
+            self.stdout.write(f"\n{'':<26}{'ms':>10}{'queries':>10}")
+            for label, seconds, count in rows:
+                self.stdout.write(f"{label:<26}{seconds * 1000:>10.0f}{count:>10}")
+        connections.close_all()
+        connections.settings = original
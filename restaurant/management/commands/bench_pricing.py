@@ -0,0 +1,120 @@
+import os
+import random
+import tempfile
+import time
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+from restaurant import pricing
+from restaurant.models import Restaurant, Category, MenuItem, VariantGroup, VariantOption, Ingredient, Recipe
+
+from .bench_sqlite import _use_database
+
+
+def _legacy_price_line(item):
+    """What place_order did per line before pricing.py (minus the stock writes)."""
+    menu_item = MenuItem.objects.get(id=item['id'])
+    qty = Decimal(item['qty'])
+    input_option_ids = set(item.get('selected_options', []))
+    recipes = list(menu_item.recipes.all())
+    if input_option_ids:
+        for variant in VariantOption.objects.filter(id__in=input_option_ids).prefetch_related('recipes'):
+            recipes.extend(variant.recipes.all())
+    for recipe in recipes:
+        recipe.ingredient  # noqa: B018 -- the stock check read it
+    for group in menu_item.variant_groups.prefetch_related('options').all():
+        selected_in_group = input_option_ids.intersection({opt.id for opt in group.options.all()})
+        if group.is_required and not selected_in_group:
+            raise Exception(f"Selection required for '{group.name}'")
+        if not group.allow_multiple and len(selected_in_group) > 1:
+            raise Exception(f"Only one selection allowed for '{group.name}'")
+    price = menu_item.price
+    if input_option_ids:
+        for opt in VariantOption.objects.filter(id__in=input_option_ids):
+            price += opt.price_adjustment
+    return price * qty
+
+
+class Command(BaseCommand):
+    help = "Order validation + pricing throughput: compiled menu plans vs the per-line ORM checks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=200, help="dishes on the menu")
+        parser.add_argument('--orders', type=int, default=20000)
+        parser.add_argument('--lines', type=int, default=4, help="lines per order")
+        parser.add_argument('--legacy-orders', type=int, default=300)
+
+    def handle(self, *args, **options):
+        original = connections.settings
+        with tempfile.TemporaryDirectory() as tmp:
+            _use_database(os.path.join(tmp, 'pricing.sqlite3'), tuned=True)
+            call_command('migrate', verbosity=0)
+            restaurant, menu = self._build(options['items'])
+            rng = random.Random(3)
+            orders = [[self._line(rng, menu) for _ in range(options['lines'])] for _ in range(options['orders'])]
+
+            began = time.perf_counter()
+            with CaptureQueriesContext(connection) as compiled:
+                plan = pricing.compile_menu(restaurant.id, restaurant.menu_version)
+            compile_ms = (time.perf_counter() - began) * 1000
+            self.stdout.write(f"Compiled {len(plan.items)} dishes in {compile_ms:.1f} ms ({len(compiled)} queries)")
+
+            began = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                for lines in orders:
+                    pricing.stock_needed(pricing.price_order(plan, lines))
+            plan_s = time.perf_counter() - began
+
+            legacy = orders[:options['legacy_orders']]
+            began = time.perf_counter()
+            with CaptureQueriesContext(connection) as legacy_queries:
+                for lines in legacy:
+                    sum(_legacy_price_line(line) for line in lines)
+            legacy_s = time.perf_counter() - began
+
+            self.stdout.write(f"\n{'':<14}{'orders':>8}{'orders/s':>12}{'us/order':>10}{'queries/order':>15}")
+            for label, count, seconds, captured in (
+                ("ORM per line", len(legacy), legacy_s, legacy_queries),
+                ("compiled plan", len(orders), plan_s, queries),
+            ):
+                self.stdout.write(f"{label:<14}{count:>8}{count / seconds:>12.0f}{seconds / count * 1e6:>10.1f}"
+                                  f"{len(captured) / count:>15.1f}")
+        connections.close_all()
+        connections.settings = original
+
+    def _line(self, rng, menu):
+        item_id, groups = rng.choice(menu)
+        selected = []
+        for required, multiple, option_ids in groups:
+            if multiple:
+                selected += rng.sample(option_ids, rng.randrange(len(option_ids) + 1))
+            elif required or rng.random() < 0.5:
+                selected.append(rng.choice(option_ids))
+        return {"id": item_id, "qty": rng.randrange(1, 4), "selected_options": selected}
+
+    def _build(self, count):
+        restaurant = Restaurant.objects.create(name="Pricing Bench")
+        category = Category.objects.create(restaurant=restaurant, name="Mains")
+        ingredients = [Ingredient.objects.create(restaurant=restaurant, name=f"Ingredient {i}", unit="g")
+                       for i in range(20)]
+        menu = []
+        for i in range(count):
+            item = MenuItem.objects.create(restaurant=restaurant, category=category, name=f"Dish {i}",
+                                           price=Decimal('180.00'))
+            Recipe.objects.create(menu_item=item, ingredient=ingredients[i % 20], quantity_required=Decimal('0.2'))
+            groups = []
+            for name, required, multiple in (("Size", True, False), ("Crust", False, False), ("Extras", False, True)):
+                group = VariantGroup.objects.create(menu_item=item, name=name, is_required=required, allow_multiple=multiple)
+                option_ids = []
+                for n in range(4):
+                    option = VariantOption.objects.create(group=group, name=f"{name} {n}", price_adjustment=Decimal(n * 10))
+                    Recipe.objects.create(variant_option=option, ingredient=ingredients[(i + n) % 20],
+                                          quantity_required=Decimal('0.05'))
+                    option_ids.append(option.id)
+                groups.append((required, multiple, option_ids))
+            menu.append((item.id, groups))
+        return Restaurant.objects.get(id=restaurant.id), menu
@@ -0,0 +1,92 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from restaurant.models import Category
+from restaurant.renderers import CBORParser, CBORRenderer, MessagePackParser, MessagePackRenderer
+from restaurant.serializers import CategorySerializer
+
+
+def synthetic_menu(categories=12, items_per_category=20):
+    """Same shape as CategorySerializer output for a mid-size restaurant menu."""
+    menu, next_id = [], 1
+    for c in range(categories):
+        items = []
+        for i in range(items_per_category):
+            groups = []
+            for g, (group_name, options) in enumerate([("Size", ["Regular", "Medium", "Large"]),
+                                                       ("Extras", ["Cheese", "Olives", "Jalapeno", "Mushroom"])]):
+                groups.append({
+                    "id": next_id + g,
+                    "name": group_name,
+                    "is_required": g == 0,
+                    "allow_multiple": g == 1,
+                    "options": [{
+                        "id": next_id * 10 + o,
+                        "name": opt,
+                        "price_adjustment": f"{o * 15}.00",
+                        "recipes": [{"id": next_id * 10 + o, "ingredient": o + 1, "ingredient_name": "Mozzarella",
+                                     "ingredient_unit": "grams", "quantity_required": "25.000"}],
+                    } for o, opt in enumerate(options)],
+                })
+            items.append({
+                "id": next_id,
+                "category": c + 1,
+                "name": f"Paneer Tikka Pizza {c}-{i}",
+                "description": "Wood-fired base, smoky paneer tikka, onions, capsicum and house sauce.",
+                "price": f"{199 + i * 10}.00",
+                "is_available": True,
+                "image": f"/media/menu_images/item_{next_id}.png",
+                "image_variants": {str(w): f"/media/menu_images/variants/{next_id:020x}.webp" for w in (160, 320, 640)},
+                "variant_groups": groups,
+                "recipes": [{"id": next_id, "ingredient": 1, "ingredient_name": "Dough",
+                             "ingredient_unit": "grams", "quantity_required": "180.000"}],
+            })
+            next_id += 2
+        menu.append({"id": c + 1, "name": f"Category {c}", "menu_items": items})
+    return menu
+
+
+class Command(BaseCommand):
+    help = "Compares JSON, MessagePack and CBOR payload size and encode/decode time for the menu payload."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', help="Use this restaurant's real menu instead of a synthetic one")
+        parser.add_argument('--rounds', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if options['restaurant']:
+            categories = Category.objects.filter(restaurant__id=options['restaurant'])
+            payload = CategorySerializer(categories, many=True).data
+        else:
+            payload = synthetic_menu()
+
+        rounds = options['rounds']
+        formats = [
+            ("json", JSONRenderer(), JSONParser()),
+            ("msgpack", MessagePackRenderer(), MessagePackParser()),
+            ("cbor", CBORRenderer(), CBORParser()),
+        ]
+
+        self.stdout.write(f"{'format':<10}{'bytes':>10}{'vs json':>10}{'encode ms':>12}{'decode ms':>12}")
+        json_size = None
+        for name, renderer, parser in formats:
+            body = renderer.render(payload)
+            json_size = json_size or len(body)
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                renderer.render(payload)
+            encode_ms = (time.perf_counter() - start) * 1000 / rounds
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                parser.parse(io.BytesIO(body))
+            decode_ms = (time.perf_counter() - start) * 1000 / rounds
+
+            self.stdout.write(
+                f"{name:<10}{len(body):>10}{len(body) / json_size:>9.0%} {encode_ms:>11.3f}{decode_ms:>12.3f}"
+            )
@@ -0,0 +1,145 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from rest_framework.test import APIRequestFactory
+
+from restaurant import views
+from restaurant.models import Restaurant, Category, MenuItem, Table, Waiter, Ingredient, Recipe
+
+
+def _use_database(path, tuned):
+    """Point every thread's connections at `path`, in stock or production SQLite mode."""
+    from nexus_core.settings import sqlite_production_databases
+
+    connections.close_all()
+    for alias in list(connections.settings):
+        try:
+            del connections[alias]
+        except AttributeError:
+            pass
+    if tuned:
+        databases = sqlite_production_databases(path)
+    else:
+        databases = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}}
+    connections.settings = connections.configure_settings(databases)
+
+
+def _seed():
+    restaurant = Restaurant.objects.create(name="Bench Bistro")
+    category = Category.objects.create(restaurant=restaurant, name="Mains")
+    ingredients = [
+        Ingredient.objects.create(restaurant=restaurant, name=f"Ingredient {i}", unit="g", current_stock=Decimal('1000000'))
+        for i in range(5)
+    ]
+    items = []
+    for i in range(10):
+        item = MenuItem.objects.create(restaurant=restaurant, category=category, name=f"Dish {i}", price=Decimal('150.00'))
+        Recipe.objects.create(menu_item=item, ingredient=ingredients[i % 5], quantity_required=Decimal('0.010'))
+        items.append(item)
+    tables = [Table.objects.create(restaurant=restaurant, name=f"T{i}") for i in range(20)]
+    waiter = Waiter.objects.create(restaurant=restaurant, name="Bench", pin_code="0000")
+    return restaurant, items, tables, waiter
+
+
+class Command(BaseCommand):
+    help = "Concurrent readers (kitchen/waiter polling) + writers (create_order): stock SQLite vs SQLITE_PRODUCTION mode."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=10)
+
+    def handle(self, *args, **options):
+        original = connections.settings
+        results = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            for mode in ('stock', 'production'):
+                path = os.path.join(tmp, f'{mode}.sqlite3')
+                _use_database(path, tuned=mode == 'production')
+                call_command('migrate', verbosity=0)
+                seed = _seed()
+                connections.close_all()
+                results[mode] = self._run(seed, options)
+        connections.close_all()
+        connections.settings = original
+
+        self.stdout.write(f"{options['readers']} readers, {options['writers']} writers, {options['seconds']}s per mode\n")
+        self.stdout.write(f"{'mode':<12}{'reads/s':>10}{'orders/s':>10}{'read errors':>14}{'write errors':>14}")
+        for mode, (counts, elapsed) in results.items():
+            self.stdout.write(
+                f"{mode:<12}{counts['read_ok'] / elapsed:>10.0f}{counts['write_ok'] / elapsed:>10.1f}"
+                f"{counts['read_error']:>14}{counts['write_error']:>14}"
+            )
+        for mode, (counts, _) in results.items():
+            for key, value in counts.items():
+                if key.startswith('error:'):
+                    self.stdout.write(f"  {mode}: {value} x {key[6:]}")
+
+    def _run(self, seed, options):
+        restaurant, items, tables, waiter = seed
+        factory = APIRequestFactory()
+        counts = Counter()
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['seconds']
+
+        def record(key, error=None):
+            with lock:
+                counts[key] += 1
+                if error:
+                    counts[f"error:{error}"] += 1
+
+        def reader(n):
+            try:
+                while time.perf_counter() < deadline:
+                    if n % 2:
+                        response = views.get_kitchen_orders(factory.get('/api/kitchen/orders/'))
+                    else:
+                        response = views.get_active_orders(factory.get('/'), restaurant_id=restaurant.id)
+                    record('read_ok' if response.status_code == 200 else 'read_error')
+            except Exception as e:
+                record('read_error', str(e)[:60])
+            finally:
+                connections.close_all()
+
+        def writer(n):
+            try:
+                i = 0
+                while time.perf_counter() < deadline:
+                    i += 1
+                    payload = {
+                        'restaurant_id': str(restaurant.id),
+                        'table_id': tables[(n * 7 + i) % len(tables)].id,
+                        'waiter_id': waiter.id,
+                        'items': [{'id': items[(n + i) % len(items)].id, 'qty': 1},
+                                  {'id': items[(n + i + 3) % len(items)].id, 'qty': 2}],
+                    }
+                    try:
+                        response = views.create_order(factory.post('/api/orders/create/', json.dumps(payload),
+                                                                   content_type='application/json'))
+                    except Exception as e:
+                        record('write_error', str(e)[:60])
+                        continue
+                    if response.status_code == 201:
+                        record('write_ok')
+                    else:
+                        record('write_error', str(response.data.get('error'))[:60])
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=reader, args=(n,)) for n in range(options['readers'])]
+        threads += [threading.Thread(target=writer, args=(n,)) for n in range(options['writers'])]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return counts, time.perf_counter() - start
@@ -0,0 +1,68 @@
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+
+from restaurant import pricing, warmup
+from restaurant.models import Order, Restaurant
+
+from .bench_pricing import Command as PricingBench
+from .bench_sqlite import _use_database
+
+
+class Command(BaseCommand):
+    help = "First menu load + order pricing per restaurant in a fresh process: cold vs after the startup warmup."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=10)
+        parser.add_argument('--items', type=int, default=80, help="dishes per restaurant")
+
+    def handle(self, *args, **options):
+        original = connections.settings
+        with tempfile.TemporaryDirectory() as tmp:
+            _use_database(os.path.join(tmp, 'warmup.sqlite3'), tuned=True)
+            call_command('migrate', verbosity=0)
+            builder = PricingBench()
+            restaurants = []
+            for _ in range(options['restaurants']):
+                restaurant, _ = builder._build(options['items'])
+                Order.objects.create(restaurant=restaurant, total_amount=100)
+                restaurants.append(restaurant.id)
+            self.stdout.write(f"Built {len(restaurants)} restaurants x {options['items']} dishes")
+
+            # Run first: nothing has loaded the URLconf or the views yet
+            self.client = Client()
+            cold = self._first_hits(restaurants)
+            cache.clear()
+            pricing._plans.clear()
+
+            started = warmup.Warmup()
+            started.run()
+            report = started.report()
+            warm = self._first_hits(restaurants)
+
+            self.stdout.write(f"\nWarmup {report['warmup_seconds'] * 1000:.0f} ms, {report['restaurants']} restaurants: "
+                              + ", ".join(f"{step} {seconds * 1000:.0f} ms" for step, seconds in report['steps'].items()))
+            self.stdout.write(f"\n{'first hit per restaurant':<26}{'very first':>12}{'median':>10}{'max':>10}")
+            for label, timings in (("cold", cold), ("after warmup", warm)):
+                self.stdout.write(f"{label:<26}{timings[0]:>10.1f}ms{statistics.median(timings):>8.1f}ms"
+                                  f"{max(timings):>8.1f}ms")
+        connections.close_all()
+        connections.settings = original
+
+    def _first_hits(self, restaurant_ids):
+        """ms for each restaurant's first menu GET plus pricing plan lookup."""
+        timings = []
+        for restaurant_id in restaurant_ids:
+            began = time.perf_counter()
+            response = self.client.get(f'/api/menu/{restaurant_id}/')
+            assert response.status_code == 200, response.status_code
+            pricing.menu_plan(Restaurant.objects.only('id', 'menu_version').get(id=restaurant_id))
+            timings.append((time.perf_counter() - began) * 1000)
+        return timings
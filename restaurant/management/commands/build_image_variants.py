@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from restaurant.images import build_variants
+from restaurant.models import MenuItem
+
+
+class Command(BaseCommand):
+    help = "Builds the resized WebP variants for menu item images (backfill for existing uploads)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', help="Only this restaurant's menu items")
+        parser.add_argument('--force', action='store_true', help="Rebuild even if the source image is unchanged")
+
+    def handle(self, *args, **options):
+        items = MenuItem.objects.exclude(image='').exclude(image__isnull=True)
+        if options['restaurant']:
+            items = items.filter(restaurant__id=options['restaurant'])
+
+        for item_id, name in items.values_list('id', 'name'):
+            try:
+                variants = build_variants(item_id, force=options['force'])
+            except Exception as e:
+                self.stderr.write(f"❌ {name}: {e}")
+                continue
+            self.stdout.write(f"✅ {name}: {', '.join(k for k in variants if k != 'source')}")
@@ -0,0 +1,28 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant import menu_tree
+from restaurant.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = "Copies a restaurant's whole menu (categories, items, variants, recipes, ingredients) into another one."
+
+    def add_arguments(self, parser):
+        parser.add_argument('source')
+        parser.add_argument('target')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        try:
+            found = Restaurant.objects.filter(id__in=[options['source'], options['target']]).count()
+        except ValidationError:
+            found = 0
+        if found != 2:
+            raise CommandError("Source and target must be two existing restaurants")
+        try:
+            stats = menu_tree.clone_menu(options['source'], options['target'], dry_run=options['dry_run'])
+        except menu_tree.MenuTreeError as e:
+            raise CommandError("\n".join([str(e), *e.errors]))
+        for table, counts in stats.items():
+            self.stdout.write(f"{table:<16}" + ", ".join(f"{action} {n}" for action, n in counts.items()))
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant.exports import CHUNK_SIZE, ENCODERS, export_sales_chunks, parse_range
+
+
+class Command(BaseCommand):
+    help = "Streams a restaurant's order lines for a date range as CSV or NDJSON (constant memory)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('restaurant_id')
+        parser.add_argument('--from', dest='start', required=True, help="first day, YYYY-MM-DD")
+        parser.add_argument('--to', dest='end', required=True, help="last day (inclusive), YYYY-MM-DD")
+        parser.add_argument('--format', choices=list(ENCODERS), default='csv')
+        parser.add_argument('--output', '-o', help="file to write (default: stdout)")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            start, end = parse_range(options['start'], options['end'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        chunks = export_sales_chunks(options['restaurant_id'], start, end, options['format'], options['chunk_size'])
+        out = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
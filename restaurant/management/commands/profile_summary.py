@@ -0,0 +1,99 @@
+import re
+import statistics
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from restaurant import profiling
+
+# Statements that differ only in the length of an IN (...) list or of a
+# multi-row VALUES are the same query
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_ROWS = re.compile(r'VALUES (\([^()]*\))(?:, \([^()]*\))+')
+_SPACES = re.compile(r'\s+')
+
+
+def _normalize(sql):
+    sql = _SPACES.sub(' ', sql).strip()
+    return _ROWS.sub(r'VALUES \1, ...', _IN_LIST.sub('IN (...)', sql))
+
+
+class Command(BaseCommand):
+    help = "Hot spots across the collected request profiles (PROFILING_DIR): endpoints, functions and SQL."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None, help="default: settings.PROFILING_DIR")
+        parser.add_argument('--endpoint', default='', help="only endpoints containing this")
+        parser.add_argument('--top', type=int, default=15)
+
+    def handle(self, *args, **options):
+        profiles = [
+            profile for profile in profiling.load_profiles(options['dir'] or settings.PROFILING_DIR)
+            if options['endpoint'] in profile['endpoint']
+        ]
+        if not profiles:
+            self.stdout.write("No profiles collected.")
+            return
+        top = options['top']
+        self._endpoints(profiles)
+        self._functions(profiles, top)
+        self._queries(profiles, top)
+
+    def _endpoints(self, profiles):
+        by_endpoint = defaultdict(list)
+        for profile in profiles:
+            by_endpoint[profile['endpoint']].append(profile)
+        self.stdout.write(f"{len(profiles)} profiles\n\n{'endpoint':<48}{'n':>5}{'p50 ms':>10}{'max ms':>10}"
+                          f"{'queries':>9}{'SQL ms':>9}")
+        for endpoint, group in sorted(by_endpoint.items(), key=lambda pair: -sum(p['ms'] for p in pair[1])):
+            self.stdout.write(
+                f"{endpoint[:47]:<48}{len(group):>5}{statistics.median(p['ms'] for p in group):>10.1f}"
+                f"{max(p['ms'] for p in group):>10.1f}{statistics.mean(p['queries']['count'] for p in group):>9.1f}"
+                f"{statistics.mean(p['queries']['ms'] for p in group):>9.1f}")
+
+    def _functions(self, profiles, top):
+        """Self and total (inclusive) ms per function: cProfile's tottime/cumtime, or samples x interval."""
+        own, total, seen = defaultdict(float), defaultdict(float), defaultdict(int)
+        for profile in profiles:
+            for label, _, self_ms, total_ms in profile.get('functions', []):
+                own[label] += self_ms
+                total[label] += total_ms
+                seen[label] += 1
+            samples = profile.get('samples')
+            if samples:
+                interval = samples['interval_ms']
+                in_profile = set()
+                for stack, count in samples['stacks'].items():
+                    frames = stack.split(';')
+                    own[frames[-1]] += count * interval
+                    for label in set(frames):  # recursion counts once
+                        total[label] += count * interval
+                    in_profile.update(frames)
+                for label in in_profile:
+                    seen[label] += 1
+
+        profiled_ms = sum(profile['ms'] for profile in profiles)
+        self.stdout.write(f"\nHot spots by self time ({profiled_ms:.0f} ms profiled)\n"
+                          f"{'self ms':>10}{'%':>6}{'total ms':>10}{'profiles':>9}  function")
+        for label in sorted(own, key=lambda label: -own[label])[:top]:
+            self.stdout.write(f"{own[label]:>10.1f}{own[label] * 100 / profiled_ms:>6.1f}{total[label]:>10.1f}"
+                              f"{seen[label]:>9}  {label}")
+
+    def _queries(self, profiles, top):
+        stats = defaultdict(lambda: [0, 0.0, 0])  # count, ms, profiles
+        for profile in profiles:
+            in_profile = set()
+            for entry in profile['queries']['log']:
+                sql = _normalize(entry['sql'])
+                stats[sql][0] += 1
+                stats[sql][1] += entry['ms']
+                in_profile.add(sql)
+            for sql in in_profile:
+                stats[sql][2] += 1
+        if not stats:
+            return
+        # Many runs per profile of the same statement = a query in a loop (N+1)
+        self.stdout.write(f"\nSQL by total time\n{'ms':>10}{'count':>8}{'/profile':>10}  statement")
+        for sql, (count, ms, seen) in sorted(stats.items(), key=lambda pair: -pair[1][1])[:top]:
+            self.stdout.write(f"{ms:>10.1f}{count:>8}{count / seen:>10.1f}  {sql[:160]}")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from restaurant import profiling
+
+
+class Command(BaseCommand):
+    help = "Prints a signed X-Profile header value: requests sending it are profiled until it expires."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=profiling.MODES, default='sample')
+        parser.add_argument('--minutes', type=int, default=60)
+
+    def handle(self, *args, **options):
+        token = profiling.make_token(options['mode'], options['minutes'])
+        self.stdout.write(f"{profiling.PROFILE_HEADER}: {token}")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from restaurant import customers
+from restaurant.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = "Recomputes the customer profiles (and links orders / reservations to them) from the order history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('restaurant_ids', nargs='*', help="default: every restaurant")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        restaurants = Restaurant.objects.order_by('name')
+        if options['restaurant_ids']:
+            restaurants = restaurants.filter(id__in=options['restaurant_ids'])
+        for restaurant_id, name in restaurants.values_list('id', 'name'):
+            count = customers.rebuild([restaurant_id], options['chunk_size'])[restaurant_id]
+            self.stdout.write(f"{name}: {count} customer(s)")
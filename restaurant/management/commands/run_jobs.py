@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from restaurant.jobs import runner
+from restaurant.models import BackgroundJob
+
+
+class Command(BaseCommand):
+    help = "Runs the durable background jobs left in the database (e.g. after a restart), then exits."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help="give FAILED jobs another go first")
+        parser.add_argument('--timeout', type=float, default=300)
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            reset = BackgroundJob.objects.filter(status='FAILED').update(status='PENDING', attempts=0)
+            self.stdout.write(f"Re-queued {reset} failed job(s)")
+
+        runner.start()  # recovers everything PENDING
+        if not runner.drain(options['timeout']):
+            self.stderr.write("Timed out waiting for jobs to finish")
+            cancelled = runner.cancel_retries()
+            if cancelled:
+                self.stderr.write(f"Dropped {cancelled} pending retry(ies); durable ones stay PENDING")
+
+        pending = BackgroundJob.objects.filter(status='PENDING').count()
+        failed = BackgroundJob.objects.filter(status='FAILED').count()
+        self.stdout.write(f"Done. {pending} pending, {failed} failed job(s) left")
@@ -0,0 +1,149 @@
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_http_methods
+
+# =========================================
+#  MEDIA SERVING (menu images in production)
+# =========================================
+# django.views.static.serve only runs with DEBUG on and sends no caching
+# headers, so every tablet re-downloads every photo. This view:
+#   * sends ETag + Last-Modified and answers conditional GETs with 304
+#   * marks content-hashed files (the WebP variants) as immutable for a year
+#   * honours single byte-range requests (206 / 416)
+#   * hands full files to the server as a FileResponse, so WSGI servers can
+#     use sendfile via wsgi.file_wrapper
+#   * or, with MEDIA_ACCEL_REDIRECT set, lets nginx stream the file itself
+#     (X-Accel-Redirect), which is the zero-copy path under daphne
+
+HASHED_NAME = re.compile(r'(^|/)variants/[0-9a-f]{16,}\.\w+$')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE = 'public, max-age=86400'
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def _etag(stat):
+    return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag in parse_etags(if_none_match) or if_none_match.strip() == '*'
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and int(mtime) <= since
+
+
+def _byte_range(request, etag, mtime, size):
+    """(start, end) inclusive for a satisfiable single range, None to send it all, or 'unsatisfiable'."""
+    header = request.headers.get('Range')
+    if not header:
+        return None
+
+    # If-Range: only honour the range if the client's copy is still current
+    if_range = request.headers.get('If-Range')
+    if if_range:
+        if if_range.startswith(('"', 'W/')):
+            if if_range != etag:
+                return None
+        elif parse_http_date_safe(if_range) != int(mtime):
+            return None
+
+    match = RANGE_HEADER.match(header.strip())
+    if not match:
+        return None  # multiple / malformed ranges: RFC 9110 allows ignoring them
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return 'unsatisfiable'
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_http_methods(['GET', 'HEAD'])
+def serve_media(request, path):
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+        stat = fullpath.stat()
+    except (OSError, ValueError, SuspiciousFileOperation):  # the last: ../ out of MEDIA_ROOT
+        raise Http404("Media file not found")
+    if fullpath.is_dir():
+        raise Http404("Media file not found")
+
+    etag = _etag(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': IMMUTABLE_CACHE if HASHED_NAME.search(path) else DEFAULT_CACHE,
+        'Accept-Ranges': 'bytes',
+    }
+
+    if _not_modified(request, etag, stat.st_mtime):
+        return HttpResponseNotModified(headers=headers)
+
+    content_type, _ = mimetypes.guess_type(str(fullpath))
+    content_type = content_type or 'application/octet-stream'
+
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT', None)
+    if accel_prefix:
+        # nginx takes over from here (including Range handling)
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + path
+        return response
+
+    byte_range = _byte_range(request, etag, stat.st_mtime, stat.st_size)
+    if byte_range == 'unsatisfiable':
+        return HttpResponse(status=416, headers={**headers, 'Content-Range': f'bytes */{stat.st_size}'})
+
+    if request.method == 'HEAD':
+        # Headers only; opening the file just to throw the body away is wasted I/O
+        response = HttpResponse(content_type=content_type, headers=headers)
+        if byte_range is None:
+            response['Content-Length'] = str(stat.st_size)
+        else:
+            start, end = byte_range
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(end - start + 1)
+        return response
+
+    if byte_range is None:
+        response = FileResponse(fullpath.open('rb'), content_type=content_type, headers=headers)
+        response.block_size = CHUNK_SIZE
+        return response
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        _read_range(fullpath, start, length), status=206, content_type=content_type, headers=headers
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Content-Length'] = str(length)
+    return response
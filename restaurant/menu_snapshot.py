@@ -0,0 +1,107 @@
+import hashlib
+import json
+from functools import cached_property
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .compression import etag_matches, precompress
+from .models import Category, Restaurant
+from .serializers import CategorySerializer
+
+# =========================================
+#  MENU SNAPSHOTS
+# =========================================
+# The nested menu is the biggest payload we serve and it changes rarely, so
+# it's rendered once per Restaurant.menu_version and kept in the cache
+# together with its br/gzip bodies. Signals bump menu_version on any menu
+# edit, which simply moves readers to a new cache key.
+#
+# Only bytes are cached (unpickling them is a copy, not an object graph
+# per request); the parsed tree is made on demand for the renderers that
+# need it (msgpack, CBOR, browsable API).
+
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+def _cache_key(restaurant_id, version):
+    return f"menu_snapshot:{restaurant_id}:{version}"
+
+
+def current_version(restaurant_id):
+    """menu_version of the restaurant, None if it doesn't exist."""
+    return Restaurant.objects.filter(id=restaurant_id).values_list('menu_version', flat=True).first()
+
+
+async def acurrent_version(restaurant_id):
+    return await Restaurant.objects.filter(id=restaurant_id).values_list('menu_version', flat=True).afirst()
+
+
+class Snapshot:
+    def __init__(self, version, json, encoded, etag):
+        self.version = version
+        self.json = json         # the CategorySerializer JSON body
+        self.encoded = encoded   # {coding: body}, see compression.precompress
+        self.etag = etag
+
+    @cached_property
+    def data(self):
+        """The menu as plain dicts and lists."""
+        return json.loads(self.json)
+
+
+def build_snapshot(restaurant_id, version):
+    categories = Category.objects.filter(restaurant__id=restaurant_id).prefetch_related(
+        'menuitem_set__recipes__ingredient',
+        'menuitem_set__variant_groups__options__recipes__ingredient',
+    )
+    body = JSONRenderer().render(CategorySerializer(categories, many=True).data)
+    return {
+        'version': version,
+        'json': body,
+        'encoded': precompress(body),
+        'etag': '"%s"' % hashlib.md5(body).hexdigest(),
+    }
+
+
+def get_snapshot(restaurant_id):
+    version = current_version(restaurant_id)
+    if version is None:
+        return None
+    key = _cache_key(restaurant_id, version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(restaurant_id, version)
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    return Snapshot(**snapshot)
+
+
+async def aget_snapshot(restaurant_id):
+    version = await acurrent_version(restaurant_id)
+    if version is None:
+        return None
+    key = _cache_key(restaurant_id, version)
+    snapshot = await cache.aget(key)
+    if snapshot is None:
+        # Rare (once per menu edit): the serializer tree is sync-only
+        snapshot = await sync_to_async(build_snapshot)(restaurant_id, version)
+        await cache.aset(key, snapshot, SNAPSHOT_TIMEOUT)
+    return Snapshot(**snapshot)
+
+
+def snapshot_response(request, snapshot):
+    headers = {'ETag': snapshot.etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request, snapshot.etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # Binary / browsable renderers still go through DRF
+    if getattr(request, 'accepted_renderer', None) is None or request.accepted_renderer.format != 'json':
+        return Response(snapshot.data, headers=headers)
+
+    response = HttpResponse(snapshot.json, content_type='application/json', headers=headers)
+    response.precompressed = snapshot.encoded  # picked up by CompressionMiddleware
+    return response
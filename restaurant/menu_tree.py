@@ -0,0 +1,366 @@
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Category, Ingredient, MenuItem, Recipe, Restaurant, VariantGroup, VariantOption
+
+# =========================================
+#  MENU TREES (bulk import / export, cloning a menu to a new branch)
+# =========================================
+# A whole menu as one JSON document, everything referenced by name so it
+# can be loaded into any restaurant:
+#
+#   {"format": 1,
+#    "ingredients": [{"name", "unit", "cost_per_unit"}],
+#    "categories": [{"name", "items": [
+#        {"name", "price", "description", "is_available", "image",
+#         "recipe": [{"ingredient", "quantity"}],
+#         "variant_groups": [{"name", "is_required", "allow_multiple", "options": [
+#             {"name", "price_adjustment", "recipe": [...]}]}]}]}]}
+#
+# Import merges: categories by name, items by (category, name), groups and
+# options by name under their parent, all case-insensitive; missing ones
+# are created, fields present in the document are updated, absent fields
+# and anything the document doesn't mention are left alone (nothing is
+# deleted -- order history points at items and options). A "recipe" list,
+# when given, is the item's / option's whole recipe. Ingredients are
+# matched by name and only created if missing (stock and cost belong to
+# the stock-take, stocktake.py).
+#
+# The document is validated and matched against the current menu (one
+# query per table) before anything is written; then each table is one
+# bulk_create + one bulk_update, parents first, in a single transaction.
+# bulk_* skip the signals, so the menu version is bumped once at the end.
+
+FORMAT = 1
+BATCH_SIZE = 500
+
+_FIELDS = {
+    MenuItem: ('price', 'description', 'is_available', 'image'),
+    VariantGroup: ('is_required', 'allow_multiple'),
+    VariantOption: ('price_adjustment',),
+}
+_REQUIRED = {MenuItem: ('price',)}  # for new rows; the rest have model defaults
+_STATS = {Category: 'categories', MenuItem: 'items', VariantGroup: 'variant_groups', VariantOption: 'options'}
+
+
+class MenuTreeError(ValueError):
+    """The document doesn't validate; `errors` lists every problem as "path: message"."""
+
+    def __init__(self, errors):
+        super().__init__(f"Invalid menu: {len(errors)} problem(s)")
+        self.errors = errors
+
+
+def _key(name):
+    return name.strip().casefold()
+
+
+def _plain(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    return str(value)  # Decimals (and the image FieldFile's name) as strings
+
+
+# --- Export ---
+
+def export_tree(restaurant_id):
+    """The restaurant's menu as a tree document (six queries)."""
+    recipes = defaultdict(list)
+    for row in (Recipe.objects.filter(Q(menu_item__restaurant_id=restaurant_id)
+                                      | Q(variant_option__group__menu_item__restaurant_id=restaurant_id))
+                .order_by('id').values('menu_item_id', 'variant_option_id', 'ingredient__name', 'quantity_required')):
+        owner = ('item', row['menu_item_id']) if row['menu_item_id'] else ('option', row['variant_option_id'])
+        recipes[owner].append({"ingredient": row['ingredient__name'], "quantity": _plain(row['quantity_required'])})
+
+    options = defaultdict(list)
+    for row in (VariantOption.objects.filter(group__menu_item__restaurant_id=restaurant_id)
+                .order_by('id').values('id', 'group_id', 'name', 'price_adjustment')):
+        options[row['group_id']].append({"name": row['name'], "price_adjustment": _plain(row['price_adjustment']),
+                                         "recipe": recipes[('option', row['id'])]})
+
+    groups = defaultdict(list)
+    for row in (VariantGroup.objects.filter(menu_item__restaurant_id=restaurant_id)
+                .order_by('id').values('id', 'menu_item_id', 'name', 'is_required', 'allow_multiple')):
+        groups[row['menu_item_id']].append({"name": row['name'], "is_required": row['is_required'],
+                                            "allow_multiple": row['allow_multiple'], "options": options[row['id']]})
+
+    items = defaultdict(list)
+    for row in (MenuItem.objects.filter(restaurant_id=restaurant_id).order_by('id')
+                .values('id', 'category_id', 'name', 'price', 'description', 'is_available', 'image')):
+        items[row['category_id']].append({
+            "name": row['name'], "price": _plain(row['price']), "description": row['description'] or '',
+            "is_available": row['is_available'], "image": row['image'] or None,
+            "recipe": recipes[('item', row['id'])], "variant_groups": groups[row['id']],
+        })
+
+    return {
+        "format": FORMAT,
+        "ingredients": [
+            {"name": row['name'], "unit": row['unit'], "cost_per_unit": _plain(row['cost_per_unit'])}
+            for row in Ingredient.objects.filter(restaurant_id=restaurant_id).order_by('id')
+            .values('name', 'unit', 'cost_per_unit')
+        ],
+        "categories": [
+            {"name": row['name'], "items": items[row['id']]}
+            for row in Category.objects.filter(restaurant_id=restaurant_id).order_by('id').values('id', 'name')
+        ],
+    }
+
+
+# --- Import ---
+
+class _Import:
+    def __init__(self, restaurant_id):
+        self.restaurant_id = restaurant_id
+        self.errors = []
+        self.stats = {name: {"created": 0, "updated": 0} for name in ('ingredients', *_STATS.values(), 'recipes')}
+        self.stats["recipes"]["deleted"] = 0
+        self.creates = defaultdict(list)   # model -> new instances, in dependency order
+        self.updates = defaultdict(dict)   # model -> {id: instance}, changed fields in self.changed
+        self.changed = defaultdict(set)    # model -> fields to bulk_update
+        self.recipe_deletes = []
+        self.new_images = []               # items whose image changed (thumbnails to rebuild)
+        self._load()
+
+    def _load(self):
+        """The current menu, one query per table."""
+        rid = self.restaurant_id
+        self.ingredients = {}
+        for ingredient in Ingredient.objects.filter(restaurant_id=rid).only('id', 'name').order_by('id'):
+            self.ingredients.setdefault(_key(ingredient.name), ingredient)
+        # Duplicate names in the existing menu: the oldest row wins
+        self.categories = {}
+        for category in Category.objects.filter(restaurant_id=rid).order_by('id'):
+            self.categories.setdefault(_key(category.name), category)
+        self.items = defaultdict(dict)
+        for item in MenuItem.objects.filter(restaurant_id=rid).order_by('id').defer('image_variants'):
+            self.items[item.category_id].setdefault(_key(item.name), item)
+        self.groups = defaultdict(dict)
+        for group in VariantGroup.objects.filter(menu_item__restaurant_id=rid).order_by('id'):
+            self.groups[group.menu_item_id].setdefault(_key(group.name), group)
+        self.options = defaultdict(dict)
+        for option in VariantOption.objects.filter(group__menu_item__restaurant_id=rid).order_by('id'):
+            self.options[option.group_id].setdefault(_key(option.name), option)
+        self.recipes = defaultdict(dict)
+        for recipe in Recipe.objects.filter(Q(menu_item__restaurant_id=rid)
+                                            | Q(variant_option__group__menu_item__restaurant_id=rid)).order_by('id'):
+            owner = ('item', recipe.menu_item_id) if recipe.menu_item_id else ('option', recipe.variant_option_id)
+            self.recipes[owner].setdefault(recipe.ingredient_id, recipe)
+
+    # -- reading the document --
+
+    def _list(self, node, key, path):
+        value = node.get(key)
+        if value is None:
+            return []
+        if not isinstance(value, list) or not all(isinstance(child, dict) for child in value):
+            self.errors.append(f"{path}.{key}: must be a list of objects")
+            return []
+        return [(f"{path}.{key}[{i}]", child) for i, child in enumerate(value)]
+
+    def _name(self, node, path, model, siblings):
+        name = node.get('name')
+        if not isinstance(name, str) or not name.strip():
+            self.errors.append(f"{path}.name: required")
+            return None
+        name = name.strip()
+        max_length = model._meta.get_field('name').max_length
+        if len(name) > max_length:
+            self.errors.append(f"{path}.name: at most {max_length} characters")
+            return None
+        if _key(name) in siblings:
+            self.errors.append(f"{path}.name: {name!r} appears twice")
+            return None
+        siblings.add(_key(name))
+        return name
+
+    def _values(self, node, path, model):
+        """{field: cleaned value} of the fields present in `node`."""
+        values = {}
+        for name in _FIELDS[model]:
+            if name not in node:
+                continue
+            value = node[name]
+            if name in ('description', 'image') and value in (None, ''):
+                values[name] = ''  # how FileField stores "no image" too
+                continue
+            if name == 'image':
+                # A storage path (e.g. from another branch's export), not an upload
+                if not isinstance(value, str) or len(value) > model._meta.get_field(name).max_length:
+                    self.errors.append(f"{path}.image: must be a file path")
+                else:
+                    values[name] = value
+                continue
+            try:
+                values[name] = model._meta.get_field(name).clean(value, None)
+            except ValidationError as e:
+                self.errors.append(f"{path}.{name}: {' '.join(e.messages)}")
+        return values
+
+    # -- matching --
+
+    def _upsert(self, model, existing, name, values, path, **parent):
+        """The existing row (with `values` applied) or a new one."""
+        if existing is None:
+            missing = [field for field in _REQUIRED.get(model, ()) if field not in values
+                       and not any(error.startswith(f"{path}.{field}:") for error in self.errors)]
+            if missing:
+                self.errors.append(f"{path}.{missing[0]}: required for a new {model._meta.verbose_name}")
+            instance = model(name=name, **parent, **values)
+            self.creates[model].append(instance)
+            self.stats[_STATS[model]]["created"] += 1
+            return instance
+        changed = [field for field, value in values.items() if getattr(existing, field) != value]
+        if changed:
+            for field in changed:
+                setattr(existing, field, values[field])
+            self.updates[model][existing.id] = existing
+            self.changed[model].update(changed)
+            self.stats[_STATS[model]]["updated"] += 1
+        return existing
+
+    def ingredient_list(self, document):
+        seen = set()
+        for path, node in self._list(document, 'ingredients', '$'):
+            name = self._name(node, path, Ingredient, seen)
+            if name is None or _key(name) in self.ingredients:
+                continue
+            values = {}
+            for field in ('unit', 'cost_per_unit'):
+                if field == 'cost_per_unit' and node.get(field) is None:
+                    continue
+                try:
+                    values[field] = Ingredient._meta.get_field(field).clean(node.get(field), None)
+                except ValidationError as e:
+                    self.errors.append(f"{path}.{field}: {' '.join(e.messages)}")
+            ingredient = Ingredient(restaurant_id=self.restaurant_id, name=name, **values)
+            self.ingredients[_key(name)] = ingredient
+            self.creates[Ingredient].append(ingredient)
+            self.stats["ingredients"]["created"] += 1
+
+    def recipe(self, node, path, owner_kind, owner):
+        if 'recipe' not in node:
+            return
+        existing = self.recipes.get((owner_kind, owner.id), {}) if owner.id else {}
+        listed = set()
+        for line_path, line in self._list(node, 'recipe', path):
+            ingredient = self.ingredients.get(_key(str(line.get('ingredient') or '')))
+            if ingredient is None:
+                self.errors.append(f"{line_path}.ingredient: unknown ingredient {line.get('ingredient')!r}")
+                continue
+            if id(ingredient) in listed:
+                self.errors.append(f"{line_path}.ingredient: {ingredient.name!r} appears twice")
+                continue
+            listed.add(id(ingredient))
+            try:
+                quantity = Recipe._meta.get_field('quantity_required').clean(line.get('quantity'), None)
+            except ValidationError as e:
+                self.errors.append(f"{line_path}.quantity: {' '.join(e.messages)}")
+                continue
+            if quantity <= 0:
+                self.errors.append(f"{line_path}.quantity: must be positive")
+                continue
+
+            recipe = existing.pop(ingredient.id, None) if ingredient.id else None
+            if recipe is None:
+                owner_field = 'menu_item' if owner_kind == 'item' else 'variant_option'
+                self.creates[Recipe].append(Recipe(ingredient=ingredient, quantity_required=quantity,
+                                                   **{owner_field: owner}))
+                self.stats["recipes"]["created"] += 1
+            elif recipe.quantity_required != quantity:
+                recipe.quantity_required = quantity
+                self.updates[Recipe][recipe.id] = recipe
+                self.changed[Recipe].add('quantity_required')
+                self.stats["recipes"]["updated"] += 1
+        # What's left wasn't listed: no longer part of the recipe
+        self.recipe_deletes.extend(recipe.id for recipe in existing.values())
+        self.stats["recipes"]["deleted"] = len(self.recipe_deletes)
+
+    def tree(self, document):
+        category_names = set()
+        for path, node in self._list(document, 'categories', '$'):
+            name = self._name(node, path, Category, category_names)
+            if name is None:
+                continue
+            category = self.categories.get(_key(name))
+            if category is None:
+                category = self._upsert(Category, None, name, {}, path, restaurant_id=self.restaurant_id)
+                self.categories[_key(name)] = category
+
+            item_names = set()
+            for item_path, item_node in self._list(node, 'items', path):
+                item_name = self._name(item_node, item_path, MenuItem, item_names)
+                if item_name is None:
+                    continue
+                existing = self.items[category.id].get(_key(item_name)) if category.id else None
+                values = self._values(item_node, item_path, MenuItem)
+                old_image = existing.image.name if existing else None
+                item = self._upsert(MenuItem, existing, item_name, values, item_path,
+                                    restaurant_id=self.restaurant_id, category=category)
+                if values.get('image') and values['image'] != old_image:
+                    self.new_images.append(item)
+                self.recipe(item_node, item_path, 'item', item)
+                self.variant_groups(item_node, item_path, item)
+
+    def variant_groups(self, item_node, item_path, item):
+        group_names = set()
+        for path, node in self._list(item_node, 'variant_groups', item_path):
+            name = self._name(node, path, VariantGroup, group_names)
+            if name is None:
+                continue
+            existing = self.groups[item.id].get(_key(name)) if item.id else None
+            group = self._upsert(VariantGroup, existing, name, self._values(node, path, VariantGroup), path,
+                                 menu_item=item)
+            option_names = set()
+            for option_path, option_node in self._list(node, 'options', path):
+                option_name = self._name(option_node, option_path, VariantOption, option_names)
+                if option_name is None:
+                    continue
+                existing = self.options[group.id].get(_key(option_name)) if group.id else None
+                option = self._upsert(VariantOption, existing, option_name,
+                                      self._values(option_node, option_path, VariantOption), option_path, group=group)
+                self.recipe(option_node, option_path, 'option', option)
+
+    # -- writing --
+
+    def write(self):
+        for model in (Ingredient, Category, MenuItem, VariantGroup, VariantOption, Recipe):
+            if self.creates[model]:
+                model.objects.bulk_create(self.creates[model], batch_size=BATCH_SIZE)
+            if self.updates[model]:
+                model.objects.bulk_update(list(self.updates[model].values()), sorted(self.changed[model]),
+                                          batch_size=BATCH_SIZE)
+        if self.recipe_deletes:
+            Recipe.objects.filter(id__in=self.recipe_deletes).delete()
+        if self.new_images:
+            from .images import build_variants
+            for item in self.new_images:
+                build_variants.defer(item.pk)
+
+
+def import_tree(restaurant_id, document, dry_run=False):
+    """
+    Merges a tree document into the restaurant's menu, all or nothing.
+    Returns {table: {"created": n, "updated": n}} (recipes also "deleted").
+    Raises MenuTreeError listing every problem (nothing is written then).
+    """
+    if not isinstance(document, dict) or document.get('format', FORMAT) != FORMAT:
+        raise MenuTreeError([f"$: expected a menu tree object (format {FORMAT})"])
+    with transaction.atomic():
+        job = _Import(restaurant_id)
+        job.ingredient_list(document)
+        job.tree(document)
+        if job.errors:
+            raise MenuTreeError(job.errors)
+        if not dry_run:
+            job.write()
+            Restaurant.bump_menu_version(restaurant_id)
+    return job.stats
+
+
+def clone_menu(source_id, target_id, dry_run=False):
+    """Copies (merges) the source restaurant's menu into the target, e.g. a new branch."""
+    return import_tree(target_id, export_tree(source_id), dry_run=dry_run)
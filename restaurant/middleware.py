@@ -0,0 +1,171 @@
+import sys
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import profiling
+from .compression import StreamCompressor, compress, negotiate_encoding
+
+# Types worth compressing; images/video are already compressed
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/msgpack', 'application/cbor', 'application/x-ndjson',
+    'application/javascript', 'text/',
+)
+
+
+class CompressionMiddleware:
+    """
+    Negotiated br/gzip compression for API responses.
+
+    * Responses below COMPRESSION_MIN_SIZE bytes are sent as-is.
+    * A response carrying `precompressed = {encoding: bytes}` (menu snapshots)
+      is served from those bytes, so nothing is compressed per request.
+    * Streaming responses are compressed chunk by chunk, never buffered.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.status_code != 200 or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        precompressed = getattr(response, 'precompressed', None) or {}
+        if encoding in precompressed:
+            response.content = precompressed[encoding]
+        elif response.streaming:
+            compressor = StreamCompressor(encoding)
+            if response.is_async:
+                response.streaming_content = compressor.awrap(response.streaming_content)
+            else:
+                response.streaming_content = compressor.wrap(response.streaming_content)
+            # Compressed size is unknown until the stream ends
+            del response.headers['Content-Length']
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+
+        if not response.streaming:
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # Same bytes-on-the-wire rule as Django's GZipMiddleware: strong ETag -> weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise is sync-only, which makes Django run the whole middleware chain
+    for every request (static or not) through a thread under daphne. This
+    version only hops to a thread when it actually serves a static file.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the rare request that asks for it (signed X-Profile header) or
+    is picked by PROFILING_SAMPLE_RATE; see restaurant/profiling.py. Every
+    other request costs a header lookup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        wanted = profiling.requested(request)
+        if wanted is None:
+            return self.get_response(request)
+
+        capture = profiling.Capture(*wanted)
+        capture.enter(top=sys._getframe())
+        began = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            capture.leave()
+        response.headers['X-Profile-Id'] = capture.save(request, response, time.perf_counter() - began)
+        return response
+
+    async def __acall__(self, request):
+        wanted = profiling.requested(request)
+        if wanted is None:
+            return await self.get_response(request)
+
+        capture = profiling.Capture(*wanted)
+        # The event loop (shared: only sampled while it runs this coroutine)
+        # and the request's own thread for sync code (views, ORM)
+        capture.enter(top=sys._getframe(), cprofile=False)
+        await sync_to_async(capture.enter)()
+        began = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(capture.leave)()
+            capture.leave()
+        seconds = time.perf_counter() - began
+        response.headers['X-Profile-Id'] = await sync_to_async(capture.save, thread_sensitive=False)(
+            request, response, seconds)
+        return response
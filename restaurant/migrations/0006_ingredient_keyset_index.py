@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 09:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0005_ingredient_cost_per_unit_order_completed_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['restaurant', 'name', 'id'], name='ingredient_rest_name_idx'),
+        ),
+    ]
@@ -1,17 +1,34 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 import uuid
 from decimal import Decimal
 
+from .changes import notify_change
+
 # 1. The Restaurant
 class Restaurant(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
     address = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # The chain owner's login; their dashboard covers all their restaurants
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='restaurants')
+    # Bumped whenever anything in the menu tree changes (see restaurant/signals.py),
+    # cached menu snapshots are keyed by it
+    menu_version = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def bump_menu_version(cls, restaurant_id):
+        if restaurant_id:
+            cls.objects.filter(id=restaurant_id).update(menu_version=models.F('menu_version') + 1)
+            # Polls of orders / tables carry menu_version in their ETag: wake them
+            notify_change(restaurant_id)
+
 # 2. Categories
 class Category(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
@@ -38,6 +55,9 @@ class MenuItem(models.Model):
     is_available = models.BooleanField(default=True)
     description = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to='menu_images/', blank=True, null=True)
+    # Resized WebP copies of `image`, filled in by restaurant/images.py:
+    # {"source": {"name": <original>, "size": <bytes>}, "160": "menu_images/variants/<hash>.webp", ...}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return self.name
@@ -81,15 +101,46 @@ class Table(models.Model):
     def __str__(self):
         return f"{self.restaurant.name} - {self.name}"
 
+# --- NEW: CUSTOMER PROFILES (one per restaurant per phone number) ---
+# Kept up to date as orders and reservations are written (restaurant/customers.py),
+# so a returning guest's profile is one indexed lookup, however many orders there are
+class Customer(models.Model):
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    phone = models.CharField(max_length=20)  # canonical, see customers.canonical_phone
+    name = models.CharField(max_length=100, blank=True, default='')
+    order_count = models.PositiveIntegerField(default=0)
+    visit_count = models.PositiveIntegerField(default=0)  # days with at least one order
+    lifetime_spend = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    reservation_count = models.PositiveIntegerField(default=0)
+    item_counts = models.JSONField(default=dict, blank=True)  # menu item id -> units ordered
+    first_seen = models.DateTimeField(default=timezone.now)
+    last_visit = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'phone'], name='customer_restaurant_phone_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.name or 'Guest'} ({self.phone})"
+
 # --- NEW: RESERVATIONS MODEL ---
 class Reservation(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
     table = models.ForeignKey(Table, on_delete=models.SET_NULL, null=True, blank=True)
     customer_name = models.CharField(max_length=100)
     customer_phone = models.CharField(max_length=15)
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='reservations', db_index=False)
     reservation_time = models.DateTimeField()
     guests = models.IntegerField(default=2)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # A guest's reservations, by date (also covers the customer FK)
+            models.Index(fields=['customer', 'reservation_time'], name='reservation_customer_idx'),
+        ]
     
     def __str__(self):
         return f"{self.customer_name} ({self.reservation_time})"
@@ -109,6 +160,8 @@ class Order(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     customer_name = models.CharField(max_length=100, blank=True, null=True)
     customer_phone = models.CharField(max_length=15, blank=True, null=True)
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='orders', db_index=False)
     
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
@@ -117,6 +170,14 @@ class Order(models.Model):
     ready_at = models.DateTimeField(null=True, blank=True) # When Kitchen Marked Ready
     completed_at = models.DateTimeField(null=True, blank=True) # When Cashier Closed it
 
+    class Meta:
+        indexes = [
+            # Date ranges: admin date_hierarchy, analytics, exports
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            # A guest's order history, newest first (also covers the customer FK)
+            models.Index(fields=['customer', 'created_at', 'id'], name='order_customer_idx'),
+        ]
+
     @property
     def preparation_time_minutes(self):
         if self.ready_at and self.created_at:
@@ -146,6 +207,12 @@ class Ingredient(models.Model):
     
     # --- NEW: PROFIT TRACKING ---
     cost_per_unit = models.DecimalField(max_digits=10, decimal_places=2, default=0.00) 
+
+    class Meta:
+        indexes = [
+            # Keyset pagination + prefix search in the inventory editor
+            models.Index(fields=['restaurant', 'name', 'id'], name='ingredient_rest_name_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.current_stock} {self.unit})"
@@ -157,4 +224,28 @@ class Recipe(models.Model):
     quantity_required = models.DecimalField(max_digits=10, decimal_places=3) 
 
     def __str__(self):
-        return f"Recipe Step"
\ No newline at end of file
+        return f"Recipe Step"
+# ==========================================
+# 7. BACKGROUND JOBS (durable queue, see restaurant/jobs.py)
+# ==========================================
+
+class BackgroundJob(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('FAILED', 'Failed'),
+    ]
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list)
+    priority = models.PositiveSmallIntegerField(default=5)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'priority', 'id'], name='backgroundjob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name}{tuple(self.args)} [{self.status}]"
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import threading
+import uuid
+from collections import deque
+
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# =========================================
+#  KITCHEN NOTIFICATIONS (post-commit, off the request path)
+# =========================================
+# Views never talk to the channel layer themselves. notify_kitchen() registers
+# the event with transaction.on_commit, so a rolled-back order is never
+# announced, and the commit hook only drops it in a queue. A single dispatcher
+# task drains that queue, sends what has piled up as one batch and retries
+# when the channel layer is unavailable. Every event gets a sequence number
+# and is kept in a small replay buffer (KitchenFeed) for screens that were
+# briefly disconnected.
+#
+# The task runs on the ASGI server's event loop (bound by `bind_server_loop`
+# in asgi.py) -- with the in-memory channel layer the consumers only see
+# messages sent from their own loop. Outside ASGI (WSGI, management commands,
+# tests) it starts its own loop on a daemon thread.
+
+KITCHEN_GROUP = "kitchen_group"
+BATCH_SIZE = 50
+MAX_RETRIES = 5
+RETRY_DELAY = 0.2   # seconds, doubled after every failed attempt
+REPLAY_SIZE = 200   # events kept per restaurant for reconnecting screens
+
+
+def restaurant_group(restaurant_id):
+    return f"kitchen_{restaurant_id}"
+
+
+class KitchenFeed:
+    """
+    Sequence numbers + a bounded replay buffer per restaurant. The dispatcher
+    stamps every event before sending it, so a screen that reconnects with
+    its last seq can be sent exactly what it missed (even events whose
+    delivery failed). Sequences restart with the process; `epoch` tells
+    clients when that happened.
+    """
+
+    def __init__(self, size=REPLAY_SIZE):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.size = size
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._buffers = {}
+        self._evicted = {}  # restaurant -> highest seq dropped from its buffer
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def record(self, event):
+        with self._lock:
+            self._seq += 1
+            event = dict(event, seq=self._seq)
+            key = event.get('restaurant')
+            buffer = self._buffers.setdefault(key, deque())
+            if len(buffer) == self.size:
+                self._evicted[key] = buffer.popleft()['seq']
+            buffer.append(event)
+            return event
+
+    def since(self, seq, restaurant_id=None):
+        """Events after `seq` (one restaurant's, or all), or None if some were already dropped."""
+        with self._lock:
+            keys = [str(restaurant_id)] if restaurant_id else list(self._buffers)
+            if any(self._evicted.get(key, 0) > seq for key in keys):
+                return None
+            events = [event for key in keys for event in self._buffers.get(key, ()) if event['seq'] > seq]
+        return sorted(events, key=lambda event: event['seq'])
+
+
+class NotificationDispatcher:
+
+    def __init__(self, group=KITCHEN_GROUP, batch_size=BATCH_SIZE, max_retries=MAX_RETRIES, retry_delay=RETRY_DELAY):
+        self.group = group
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._loop = None
+        self._queue = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+
+    # --- Starting ---
+
+    def bind(self, loop):
+        """Run the dispatcher on `loop` (the ASGI server's). No-op once started."""
+        with self._lock:
+            if self._loop is None:
+                self._start(loop)
+                loop.call_soon_threadsafe(self._spawn)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            self._start(loop)
+        threading.Thread(target=self._run_private_loop, name='kitchen-notify', daemon=True).start()
+
+    def _start(self, loop):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+
+    def _spawn(self):
+        self._task = self._loop.create_task(self._dispatch())
+
+    def _run_private_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._spawn()
+        self._loop.run_forever()
+
+    # --- Producing ---
+
+    def send(self, event):
+        """Queue an event for the kitchen group. Thread-safe, never blocks."""
+        self._ensure_started()
+        with self._lock:
+            self._pending += 1
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    def flush(self, timeout=5):
+        """Wait until everything queued so far was delivered (or given up on)."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    # --- Consuming ---
+
+    async def _dispatch(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._deliver(batch)
+            finally:
+                with self._idle:
+                    self._pending -= len(batch)
+                    self._idle.notify_all()
+
+    async def _deliver(self, batch):
+        batch = [feed.record(event) for event in batch]
+        # Screens showing every restaurant listen on self.group, the others on their own
+        groups = {self.group: batch}
+        for event in batch:
+            if event.get('restaurant'):
+                groups.setdefault(restaurant_group(event['restaurant']), []).append(event)
+        for group, events in groups.items():
+            await self._send(group, events)
+
+    async def _send(self, group, batch):
+        message = batch[0] if len(batch) == 1 else {"type": "order_batch", "events": batch}
+        delay = self.retry_delay
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await get_channel_layer().group_send(group, message)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error("Dropping %d kitchen notification(s) after %d attempts: %s", len(batch), attempt, e)
+                    return
+                logger.warning("Kitchen notification failed (attempt %d): %s", attempt, e)
+                await asyncio.sleep(delay)
+                delay *= 2
+
+
+feed = KitchenFeed()
+dispatcher = NotificationDispatcher()
+
+
+def notify_kitchen(event):
+    """Deliver `event` to the kitchen screens once the current transaction commits."""
+    transaction.on_commit(lambda: dispatcher.send(event))
+
+
+def bind_server_loop(application):
+    """ASGI wrapper: starts the dispatcher on the server's loop with the first connection."""
+    async def app(scope, receive, send):
+        if dispatcher._loop is None:
+            dispatcher.bind(asyncio.get_running_loop())
+        return await application(scope, receive, send)
+    return app
@@ -0,0 +1,91 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+# =========================================
+#  KEYSET (CURSOR) PAGINATION HELPERS
+# =========================================
+# Cursors are opaque url-safe tokens holding the sort key of the last row
+# the client saw, so the next page is a plain indexed range scan instead of
+# an OFFSET that gets slower the deeper you page.
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Returns the list of sort-key values, or None for a missing/garbled cursor."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def keyset_filter(fields, values, descending=False):
+    """
+    Builds the "row comes after (v1, v2, ...)" predicate for an ascending
+    ordering on `fields`, e.g. (name > n) OR (name = n AND id > i).
+    descending=True for a descending ordering on all of them (< instead).
+    """
+    lookup = 'lt' if descending else 'gt'
+    condition = Q()
+    for i, field in enumerate(fields):
+        step = Q(**{f"{field}__{lookup}": values[i]})
+        for prev_field, prev_value in zip(fields[:i], values[:i]):
+            step &= Q(**{prev_field: prev_value})
+        condition |= step
+    return condition
+
+
+def parse_limit(raw, default=50, maximum=200):
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+def page_params(params, model, ordering, unpaged_limit):
+    """
+    ?cursor= / ?limit= of a listing ordered by `ordering` (e.g. ('-created_at',
+    '-id'), one direction for all fields). Returns (cursor, limit, paged):
+    cursor is the decoded sort key (typed, None for the first page); paged is
+    False when the client sent neither, in which case the limit is
+    unpaged_limit (None: no limit, the old bare list). Raises ValueError for
+    a bad cursor.
+    """
+    paged = 'cursor' in params or 'limit' in params
+    limit = parse_limit(params.get('limit')) if paged else unpaged_limit
+    token = params.get('cursor')
+    if not token:
+        return None, limit, paged
+
+    values = decode_cursor(token)
+    if values is None or len(values) != len(ordering):
+        raise ValueError("Invalid cursor")
+    try:
+        cursor = [model._meta.get_field(field.lstrip('-')).to_python(value) for field, value in zip(ordering, values)]
+    except ValidationError:
+        raise ValueError("Invalid cursor")
+    if any(value is None for value in cursor):
+        raise ValueError("Invalid cursor")
+    return cursor, limit, paged
+
+
+def keyset_page(queryset, ordering, cursor, limit):
+    """
+    The sort keys of one page of `queryset` in `ordering`: the rows after
+    `cursor`, limit + 1 of them so the caller can tell if there's a next page.
+    """
+    fields = [field.lstrip('-') for field in ordering]
+    if cursor is not None:
+        queryset = queryset.filter(keyset_filter(fields, cursor, descending=ordering[0].startswith('-')))
+    return queryset.order_by(*ordering).values_list(*fields)[:limit + 1]
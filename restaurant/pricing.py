@@ -0,0 +1,177 @@
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from types import MappingProxyType
+
+from django.http import Http404
+
+from .models import MenuItem, VariantGroup, VariantOption, Recipe
+
+# =========================================
+#  COMPILED MENU PLANS (order validation + pricing)
+# =========================================
+# place_order used to re-read every dish, its variant groups and options
+# (twice) and its recipes for every line of every order. Instead each
+# restaurant's menu is compiled once per Restaurant.menu_version into
+# immutable per-item plans:
+#   * the variant group rules (required / single choice) with their option ids
+#   * option id -> group, option id -> price adjustment
+#   * base and per-option recipe amounts (ingredient id -> quantity)
+# and a whole order is validated and priced against them without touching
+# the database. Plans live in this process (one per restaurant, the newest
+# version wins); signals bump menu_version on any menu edit, so the next
+# order compiles a fresh one.
+
+
+class OrderError(Exception):
+    """The order doesn't fit the menu (bad item, option or selection)."""
+
+
+@dataclass(frozen=True)
+class GroupRule:
+    name: str
+    required: bool
+    allow_multiple: bool
+    option_ids: frozenset
+
+
+@dataclass(frozen=True)
+class ItemPlan:
+    id: int
+    name: str
+    price: Decimal
+    groups: tuple                 # GroupRule, ...
+    option_group: MappingProxyType  # option id -> index into groups
+    option_price: MappingProxyType  # option id -> price_adjustment
+    recipe: tuple                 # (ingredient id, quantity per unit), ...
+    option_recipes: MappingProxyType  # option id -> ((ingredient id, quantity), ...)
+
+
+@dataclass(frozen=True)
+class MenuPlan:
+    restaurant_id: str
+    version: int
+    items: MappingProxyType       # menu item id -> ItemPlan
+    ingredient_names: MappingProxyType
+
+
+@dataclass(frozen=True)
+class PricedLine:
+    item: ItemPlan
+    quantity: object              # as sent (stored on the OrderItem)
+    option_ids: tuple
+    unit_price: Decimal
+    line_total: Decimal
+
+
+def compile_menu(restaurant_id, version):
+    """Builds the MenuPlan in four queries, whatever the size of the menu."""
+    items = list(MenuItem.objects.filter(restaurant_id=restaurant_id).values_list('id', 'name', 'price'))
+    groups = defaultdict(list)
+    for group_id, item_id, name, required, multiple in (
+        VariantGroup.objects.filter(menu_item__restaurant_id=restaurant_id).order_by('id')
+        .values_list('id', 'menu_item_id', 'name', 'is_required', 'allow_multiple')
+    ):
+        groups[item_id].append((group_id, name, required, multiple))
+    options = defaultdict(list)
+    for option_id, group_id, adjustment in (
+        VariantOption.objects.filter(group__menu_item__restaurant_id=restaurant_id)
+        .values_list('id', 'group_id', 'price_adjustment')
+    ):
+        options[group_id].append((option_id, adjustment))
+
+    item_recipes, option_recipes, ingredient_names = defaultdict(list), defaultdict(list), {}
+    for menu_item_id, option_id, ingredient_id, ingredient_name, quantity in (
+        Recipe.objects.filter(ingredient__restaurant_id=restaurant_id).order_by('id')
+        .values_list('menu_item_id', 'variant_option_id', 'ingredient_id', 'ingredient__name', 'quantity_required')
+    ):
+        ingredient_names[ingredient_id] = ingredient_name
+        if menu_item_id is not None:
+            item_recipes[menu_item_id].append((ingredient_id, quantity))
+        if option_id is not None:
+            option_recipes[option_id].append((ingredient_id, quantity))
+
+    plans = {}
+    for item_id, name, price in items:
+        rules, option_group, option_price, recipes = [], {}, {}, {}
+        for index, (group_id, group_name, required, multiple) in enumerate(groups[item_id]):
+            ids = frozenset(option_id for option_id, _ in options[group_id])
+            rules.append(GroupRule(group_name, required, multiple, ids))
+            for option_id, adjustment in options[group_id]:
+                option_group[option_id] = index
+                option_price[option_id] = adjustment
+                recipes[option_id] = tuple(option_recipes[option_id])
+        plans[item_id] = ItemPlan(
+            id=item_id, name=name, price=price, groups=tuple(rules),
+            option_group=MappingProxyType(option_group), option_price=MappingProxyType(option_price),
+            recipe=tuple(item_recipes[item_id]), option_recipes=MappingProxyType(recipes),
+        )
+    return MenuPlan(str(restaurant_id), version, MappingProxyType(plans), MappingProxyType(ingredient_names))
+
+
+_plans = {}
+_lock = threading.Lock()
+
+
+def menu_plan(restaurant):
+    """The compiled plan for the restaurant's current menu_version."""
+    key = str(restaurant.id)
+    plan = _plans.get(key)
+    if plan is None or plan.version != restaurant.menu_version:
+        plan = compile_menu(restaurant.id, restaurant.menu_version)
+        with _lock:
+            current = _plans.get(key)
+            if current is None or current.version <= plan.version:
+                _plans[key] = plan
+    return plan
+
+
+def price_line(plan, item_id, quantity, option_ids):
+    """Validates one line against the plan and prices it. Raises OrderError / Http404."""
+    try:
+        item = plan.items[int(item_id)]
+    except (KeyError, TypeError, ValueError):
+        raise Http404("No MenuItem matches the given query.")
+    qty = Decimal(quantity)
+    try:
+        option_ids = sorted({int(option_id) for option_id in option_ids})
+    except (TypeError, ValueError):
+        raise OrderError(f"Invalid options for '{item.name}'")
+
+    chosen = [0] * len(item.groups)
+    price = item.price
+    for option_id in option_ids:
+        index = item.option_group.get(option_id)
+        if index is None:
+            raise OrderError(f"Option {option_id} is not available for '{item.name}'")
+        chosen[index] += 1
+        price += item.option_price[option_id]
+    for rule, count in zip(item.groups, chosen):
+        if rule.required and not count:
+            raise OrderError(f"Selection required for '{rule.name}'")
+        if not rule.allow_multiple and count > 1:
+            raise OrderError(f"Only one selection allowed for '{rule.name}'")
+
+    return PricedLine(item, quantity, tuple(option_ids), price, price * qty)
+
+
+def price_order(plan, items_data):
+    """[PricedLine] for the order's lines, in order. No database access."""
+    return [
+        price_line(plan, line['id'], line['qty'], line.get('selected_options', []))
+        for line in items_data
+    ]
+
+
+def stock_needed(lines):
+    """ingredient id -> total quantity the priced lines use (base + option recipes)."""
+    needed = defaultdict(Decimal)
+    for line in lines:
+        qty = Decimal(line.quantity)
+        for ingredient_id, amount in line.item.recipe:
+            needed[ingredient_id] += amount * qty
+        for option_id in line.option_ids:
+            for ingredient_id, amount in line.item.option_recipes[option_id]:
+                needed[ingredient_id] += amount * qty
+    return needed
@@ -0,0 +1,271 @@
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.utils import timezone
+
+# =========================================
+#  ON-DEMAND REQUEST PROFILING (ProfilingMiddleware)
+# =========================================
+# Off for every request except:
+#   * one carrying "X-Profile: <token>" (manage.py profile_token mints one:
+#     signed with SECRET_KEY, carries the mode and an expiry), or
+#   * a random PROFILING_SAMPLE_RATE share of all requests.
+#
+# Two modes:
+#   sample   -- a thread reads the request's stacks every SAMPLE_INTERVAL
+#               (sys._current_frames). Sees both the async part on the event
+#               loop (only while the loop is running *this* request: samples
+#               are cut at the middleware's own frame) and the request's ORM
+#               thread (sync views, sync_to_async) -- cut at asgiref's
+#               thread_handler, idle = not sampled.
+#   cprofile -- cProfile in the request's sync thread(s): exact call counts,
+#               but under ASGI it doesn't see the async code on the loop
+#               (other requests run there too).
+# Both record every SQL statement with its time (no parameters: phone
+# numbers and names stay out of the files).
+#
+# Each profile is one JSON file in PROFILING_DIR named
+# <time>-<endpoint>-<id>.json, the oldest removed past PROFILING_KEEP; the
+# response says which one in X-Profile-Id. `manage.py profile_summary`
+# adds them up.
+
+PROFILE_HEADER = 'X-Profile'
+MODES = ('sample', 'cprofile')
+SALT = 'restaurant.profiling'
+MAX_SQL = 2000
+_ADDRESS = re.compile(r' at 0x[0-9a-f]+')  # "<function f at 0x7f..>" differs per process
+
+# Where a sampled stack starts in the request's ORM thread
+_SYNC_THREAD_TOP = SyncToAsync.thread_handler.__code__
+
+_ROOTS = sorted({os.path.dirname(os.path.dirname(os.__file__)), str(settings.BASE_DIR), *sys.path[1:]},
+                key=len, reverse=True)
+
+
+def make_token(mode='sample', minutes=60):
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    return signing.dumps({"mode": mode, "until": int(time.time()) + minutes * 60}, salt=SALT)
+
+
+def requested(request):
+    """(mode, trigger) if this request is to be profiled, else None."""
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        try:
+            claim = signing.loads(token, salt=SALT)
+        except signing.BadSignature:
+            return None
+        if claim.get('mode') in MODES and claim.get('until', 0) >= time.time():
+            return claim['mode'], 'header'
+        return None
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+    if rate and random.random() < rate:
+        return getattr(settings, 'PROFILING_MODE', 'sample'), 'sampled'
+    return None
+
+
+def _short(path):
+    for root in _ROOTS:
+        if root and path.startswith(root + os.sep):
+            return path[len(root) + 1:]
+    return path
+
+
+def _label(code):
+    return f"{code.co_name} ({_short(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(name='request-profile-sampler', daemon=True)
+        self.interval = interval
+        self.targets = {}  # thread id -> frame or code object where the request's stack starts
+        self.stacks = Counter()
+        self.ticks = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.ticks += 1
+            frames = sys._current_frames()
+            for thread_id, top in list(self.targets.items()):
+                stack = self._stack(frames.get(thread_id), top)
+                if stack:
+                    self.stacks[stack] += 1
+
+    @staticmethod
+    def _stack(frame, top):
+        labels = []
+        while frame is not None:
+            if frame is top or frame.f_code is top:
+                return ';'.join(reversed(labels))  # root first, like collapsed flame-graph stacks
+            labels.append(_label(frame.f_code))
+            frame = frame.f_back
+        return None  # not working on this request right now
+
+    def finish(self):
+        self._done.set()
+
+    def stop(self):
+        self.finish()
+        self.join()
+
+
+class _QueryLog:
+    """A connection execute wrapper recording each statement and its time."""
+
+    def __init__(self):
+        self.entries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.entries.append({
+                "sql": sql[:MAX_SQL],
+                "ms": round((time.perf_counter() - began) * 1000, 3),
+                "alias": context['connection'].alias,
+                "many": many,
+            })
+
+
+class Capture:
+    """One profiled request. enter() / leave() in every thread doing its work."""
+
+    def __init__(self, mode, trigger):
+        self.mode, self.trigger = mode, trigger
+        self.queries = _QueryLog()
+        self.profilers = []
+        self._threads = {}  # thread id -> (profiler, connections wrapped)
+        self.sampler = None
+        if mode == 'sample':
+            self.sampler = _Sampler(getattr(settings, 'PROFILING_SAMPLE_INTERVAL', 0.005))
+            self.sampler.start()
+        self.started = timezone.now()
+
+    def enter(self, top=_SYNC_THREAD_TOP, cprofile=True):
+        """
+        Starts recording in the calling thread. `top` is the frame (or code)
+        the request's stack starts at; cprofile=False on the event loop.
+        """
+        thread_id = threading.get_ident()
+        wrapped = []
+        for alias in connections:
+            connection = connections[alias]
+            connection.execute_wrappers.append(self.queries)
+            wrapped.append(connection)
+        profiler = None
+        if self.mode == 'cprofile' and cprofile:
+            profiler = cProfile.Profile()
+            self.profilers.append(profiler)
+            profiler.enable()
+        if self.sampler:
+            self.sampler.targets[thread_id] = top
+        self._threads[thread_id] = (profiler, wrapped)
+
+    def leave(self):
+        thread_id = threading.get_ident()
+        profiler, wrapped = self._threads.pop(thread_id)
+        if profiler:
+            profiler.disable()
+        for connection in wrapped:
+            connection.execute_wrappers.remove(self.queries)
+        if self.sampler:
+            self.sampler.targets.pop(thread_id, None)
+            if not self._threads:
+                self.sampler.finish()  # also when the request raised (save() isn't called then)
+
+    def _functions(self):
+        """[label, calls, self ms, total ms] per function, slowest first."""
+        totals = {}
+        for profiler in self.profilers:
+            profiler.create_stats()
+            for (filename, line, name), (_, calls, tottime, cumtime, _) in profiler.stats.items():
+                label = f"{name} ({_short(filename)}:{line})" if line else _ADDRESS.sub('', name)
+                row = totals.setdefault(label, [label, 0, 0.0, 0.0])
+                row[1] += calls
+                row[2] += tottime * 1000
+                row[3] += cumtime * 1000
+        rows = sorted(totals.values(), key=lambda row: -row[3])
+        return [[label, calls, round(own, 3), round(total, 3)] for label, calls, own, total in rows]
+
+    def save(self, request, response, seconds):
+        """Writes the profile file, returns its name."""
+        if self.sampler:
+            self.sampler.stop()
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match else 'unresolved'
+        document = {
+            "endpoint": endpoint,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "ms": round(seconds * 1000, 3),
+            "mode": self.mode,
+            "trigger": self.trigger,
+            "started": self.started.isoformat(),
+            "queries": {
+                "count": len(self.queries.entries),
+                "ms": round(sum(entry["ms"] for entry in self.queries.entries), 3),
+                "log": self.queries.entries,
+            },
+        }
+        if self.sampler:
+            document["samples"] = {
+                "interval_ms": self.sampler.interval * 1000,
+                "ticks": self.sampler.ticks,
+                "stacks": dict(self.sampler.stacks.most_common()),
+            }
+        else:
+            document["functions"] = self._functions()
+        return write_profile(document)
+
+
+def write_profile(document):
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    safe = ''.join(c if c.isalnum() or c in '._-' else '_' for c in document["endpoint"])[:80]
+    name = f"{timezone.now():%Y%m%d-%H%M%S}-{safe}-{uuid.uuid4().hex[:8]}.json"
+    partial = os.path.join(directory, f".{name}.tmp")
+    with open(partial, 'w') as f:
+        json.dump(document, f)
+    os.replace(partial, os.path.join(directory, name))
+
+    # Names start with the time, so they sort oldest first
+    existing = sorted(entry for entry in os.listdir(directory) if entry.endswith('.json'))
+    for old in existing[:max(len(existing) - settings.PROFILING_KEEP, 0)]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except FileNotFoundError:
+            pass  # another worker rotated it first
+    return name
+
+
+def load_profiles(directory):
+    """Every profile document in the directory, oldest first (unreadable files are skipped)."""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
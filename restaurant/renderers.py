@@ -0,0 +1,124 @@
+import uuid
+from decimal import Decimal
+
+import cbor2
+import msgpack
+import ujson
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# =========================================
+#  BINARY RENDERERS / PARSERS (Android tablets)
+# =========================================
+# Picked by content negotiation: JSON stays the default, a tablet opts in
+# with "Accept: application/msgpack" or "Accept: application/cbor" (or
+# ?format=msgpack / ?format=cbor) and can POST bodies in the same format.
+#
+# Native UUID and Decimal values are packed compactly instead of as text:
+#   CBOR    -> standard tags (37 = 16-byte UUID, 4 = decimal fraction)
+#   msgpack -> ext types using the same numbers, so clients share one table:
+#              ext 37 = 16 raw UUID bytes, ext 4 = msgpack [exponent, mantissa]
+# Decimals that a serializer already turned into strings are left as-is.
+# CBOR sends datetimes and dates as its standard tags (naive datetimes are
+# taken to be in the current time zone, as Django does). Everything else --
+# and, in msgpack, dates too -- is written the way DRF's JSON encoder writes it.
+
+MSGPACK_EXT_UUID = 37
+MSGPACK_EXT_DECIMAL = 4
+
+_json_default = JSONEncoder().default
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, uuid.UUID):
+        return msgpack.ExtType(MSGPACK_EXT_UUID, obj.bytes)
+    if isinstance(obj, Decimal):
+        if not obj.is_finite():
+            return float(obj)  # NaN / Infinity have no [exponent, mantissa]
+        sign, digits, exponent = obj.as_tuple()
+        mantissa = int(''.join(map(str, digits)) or 0) * (-1 if sign else 1)
+        return msgpack.ExtType(MSGPACK_EXT_DECIMAL, msgpack.packb([exponent, mantissa]))
+    return _json_default(obj)
+
+
+def _msgpack_ext_hook(code, data):
+    if code == MSGPACK_EXT_UUID:
+        return uuid.UUID(bytes=data)
+    if code == MSGPACK_EXT_DECIMAL:
+        exponent, mantissa = msgpack.unpackb(data)
+        return Decimal(mantissa).scaleb(exponent)
+    return msgpack.ExtType(code, data)
+
+
+def _cbor_default(encoder, obj):
+    # cbor2 already handles UUID/Decimal/datetime natively
+    encoder.encode(_json_default(obj))
+
+
+class UJSONRenderer(JSONRenderer):
+    """
+    Same JSON as DRF's JSONRenderer, encoded with ujson. Used on the hot
+    polling endpoints; anything ujson can't encode natively (UUID, datetime,
+    lazy strings, ...) is handed to DRF's own encoder so the output doesn't change.
+    Indented or non-compact output is left to JSONRenderer itself.
+    """
+    _fallback = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not self.compact or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = ujson.dumps(
+            data, ensure_ascii=self.ensure_ascii, escape_forward_slashes=False, allow_nan=not self.strict,
+            default=self._fallback
+        )
+        # Escaped like JSONRenderer does, so the output stays a JavaScript subset
+        return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode('utf-8')
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+
+class CBORRenderer(BaseRenderer):
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return cbor2.dumps(data, default=_cbor_default, timezone=timezone.get_current_timezone())
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), ext_hook=_msgpack_ext_hook, raw=False)
+        except Exception as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
+
+
+class CBORParser(BaseParser):
+    media_type = 'application/cbor'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return cbor2.loads(stream.read())
+        except Exception as exc:
+            raise ParseError(f"CBOR parse error - {exc}")
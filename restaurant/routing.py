@@ -3,4 +3,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/kitchen/$', consumers.KitchenConsumer.as_asgi()),
+    re_path(r'ws/kitchen/(?P<restaurant_id>[0-9a-f-]{36})/$', consumers.KitchenConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Ingredient, Recipe, Restaurant, Category, MenuItem, Order, OrderItem, Table
 from .models import VariantGroup, VariantOption, Ingredient, Recipe # <--- Added Imports
+from .images import variant_urls
 
 # --- NEW: INVENTORY SERIALIZERS ---
 class IngredientSerializer(serializers.ModelSerializer):
@@ -33,10 +34,37 @@ class VariantGroupSerializer(serializers.ModelSerializer):
 class MenuItemSerializer(serializers.ModelSerializer):
     variant_groups = VariantGroupSerializer(many=True, read_only=True)
     recipes = RecipeSerializer(many=True, read_only=True) # <--- Show base recipes
+    image_variants = serializers.SerializerMethodField() # <--- WebP thumbnails by width
 
     class Meta:
         model = MenuItem
-        fields = ['id', 'category', 'name', 'description', 'price', 'is_available', 'image', 'variant_groups', 'recipes']
+        fields = ['id', 'category', 'name', 'description', 'price', 'is_available', 'image', 'image_variants', 'variant_groups', 'recipes']
+
+    def get_image_variants(self, obj):
+        return variant_urls(obj)
+
+# --- NEW: LAZY INVENTORY EDITOR (one category at a time, only what the editor needs) ---
+class InventoryOptionSerializer(serializers.ModelSerializer):
+    recipes = RecipeSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = VariantOption
+        fields = ['id', 'name', 'recipes']
+
+class InventoryGroupSerializer(serializers.ModelSerializer):
+    options = InventoryOptionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = VariantGroup
+        fields = ['id', 'name', 'options']
+
+class InventoryMenuItemSerializer(serializers.ModelSerializer):
+    variant_groups = InventoryGroupSerializer(many=True, read_only=True)
+    recipes = RecipeSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = MenuItem
+        fields = ['id', 'name', 'variant_groups', 'recipes']
 
 class CategorySerializer(serializers.ModelSerializer):
     menu_items = MenuItemSerializer(many=True, read_only=True, source='menuitem_set')
@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import analytics
+from .changes import notify_change
+from .models import Restaurant, Category, MenuItem, VariantGroup, VariantOption, Ingredient, Recipe, Order, Table
+
+
+@receiver(post_save, sender=MenuItem)
+def queue_image_variants(sender, instance, raw=False, **kwargs):
+    # Thumbnails are built after the commit, by the job runner, and only for a new image
+    if raw or not (instance.image or instance.image_variants):
+        return
+    from .images import build_variants, variants_stale
+    if variants_stale(instance):
+        build_variants.defer(instance.pk)
+
+
+# --- MENU VERSION: any edit in the menu tree invalidates the cached snapshot ---
+
+def _menu_restaurant_id(instance):
+    if isinstance(instance, (Category, MenuItem, Ingredient)):
+        return instance.restaurant_id
+    if isinstance(instance, VariantGroup):
+        return MenuItem.objects.filter(id=instance.menu_item_id).values_list('restaurant_id', flat=True).first()
+    if isinstance(instance, VariantOption):
+        return (VariantGroup.objects.filter(id=instance.group_id)
+                .values_list('menu_item__restaurant_id', flat=True).first())
+    if isinstance(instance, Recipe):
+        return Ingredient.objects.filter(id=instance.ingredient_id).values_list('restaurant_id', flat=True).first()
+    return None
+
+
+# Stock and cost aren't part of the menu payload; orders save these all day long
+_NON_MENU_INGREDIENT_FIELDS = {'current_stock', 'cost_per_unit'}
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=VariantGroup)
+@receiver(post_save, sender=VariantOption)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_delete, sender=VariantGroup)
+@receiver(post_delete, sender=VariantOption)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Ingredient)
+def bump_menu_version(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if sender is Ingredient and update_fields and set(update_fields) <= _NON_MENU_INGREDIENT_FIELDS:
+        return
+    Restaurant.bump_menu_version(_menu_restaurant_id(instance))
+
+
+# --- CHANGE FEED: wakes waiters polling tables / active orders ---
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Table)
+def bump_change_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        notify_change(instance.restaurant_id)
+
+
+# --- SALES ANALYTICS: a changed order reopens its (cached) day ---
+
+# What the day buckets are made of (analytics.compute_days)
+_SALES_FIELDS = {'status', 'total_amount', 'created_at', 'waiter', 'table', 'restaurant'}
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def forget_sales_day(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.created_at is None:
+        return
+    if update_fields and not set(update_fields) & _SALES_FIELDS:
+        return
+    restaurant_id, created_at = instance.restaurant_id, instance.created_at
+    # After the commit, or a report running meanwhile could cache the old totals again
+    transaction.on_commit(lambda: analytics.forget_days(restaurant_id, [created_at]))
@@ -0,0 +1,245 @@
+import codecs
+import csv
+import json
+from decimal import Decimal
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from rest_framework.parsers import BaseParser
+
+from .models import Ingredient, Restaurant
+
+# =========================================
+#  STOCK-TAKE IMPORT (nightly counts, in bulk)
+# =========================================
+# After closing the manager counts the store room and uploads the sheet:
+# CSV (header row) or JSON rows with these columns, blanks = leave as is
+#
+#   id | name | unit | stock (the counted amount) | cost_per_unit
+#
+# A row is matched by id, or else by name (case-insensitive); an unknown
+# name is a new ingredient. The restaurant's ingredients are loaded in one
+# query up front, rows are read as they arrive (CSV is parsed straight off
+# the request stream) and written CHUNK_SIZE at a time with bulk_create /
+# bulk_update -- only the columns that changed, so a count doesn't
+# overwrite a cost with what we read, and vice versa. Bad rows are reported
+# and skipped; the rest is applied in one transaction.
+#
+# bulk_* skip the post_save signals, so the menu version is bumped here
+# (once) when a name or unit changed, like signals.bump_menu_version would.
+
+CHUNK_SIZE = 500
+MAX_ROWS = 20000
+COLUMNS = {'id', 'name', 'unit', 'stock', 'cost_per_unit'}
+ALIASES = {'current_stock': 'stock', 'count': 'stock', 'cost': 'cost_per_unit', 'ingredient': 'name'}
+FIELDS = {'name': 'name', 'unit': 'unit', 'stock': 'current_stock', 'cost_per_unit': 'cost_per_unit'}
+MENU_FIELDS = {'name', 'unit'}  # part of the menu payload (stock/cost aren't)
+
+
+class CSVParser(BaseParser):
+    """text/csv request bodies, as a lazy iterator of row dicts."""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return csv_rows(stream)
+
+
+def csv_rows(lines):
+    """Row dicts of a CSV given as an iterable of byte lines (request stream, uploaded file)."""
+    reader = csv.reader(codecs.iterdecode(lines, 'utf-8-sig'))
+    header = next(reader, None)
+    if header is None:
+        return
+    keys = [ALIASES.get(name.strip().lower(), name.strip().lower()) for name in header]
+    for values in reader:
+        if any(value.strip() for value in values):
+            yield dict(zip(keys, values))
+
+
+def upload_rows(data, upload=None):
+    """The rows of a request: JSON list / {"rows": [...]}, a CSVParser iterator, or an uploaded .csv/.json file."""
+    if upload is not None:
+        if upload.name.lower().endswith('.json') or upload.content_type == 'application/json':
+            try:
+                data = json.load(upload)
+            except ValueError as e:
+                raise ValueError(f"Invalid JSON file: {e}")
+        else:
+            return csv_rows(upload)
+    if isinstance(data, dict):
+        data = data.get('rows')
+    if isinstance(data, list):
+        return iter(data)
+    if data is not None and hasattr(data, '__next__'):
+        return data
+    raise ValueError("Send a CSV, a JSON list of rows or {\"rows\": [...]}")
+
+
+def _clean(row):
+    """{model field: value} of the non-blank columns, plus the id. ValueError with the reason."""
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+    row = {ALIASES.get(str(key).strip().lower(), str(key).strip().lower()): value for key, value in row.items()}
+    unknown = set(row) - COLUMNS
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(sorted(unknown))}")
+
+    values = {}
+    for column, field_name in FIELDS.items():
+        value = row.get(column)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            continue
+        field = Ingredient._meta.get_field(field_name)
+        try:
+            value = field.clean(value, None)
+        except ValidationError as e:
+            raise ValueError(f"{column}: {' '.join(e.messages)}")
+        if field.get_internal_type() == 'DecimalField':
+            if value < 0:
+                raise ValueError(f"{column}: must not be negative")
+            value = value.quantize(Decimal(1).scaleb(-field.decimal_places))
+        values[field_name] = value
+
+    ingredient_id = row.get('id')
+    if isinstance(ingredient_id, str):
+        ingredient_id = ingredient_id.strip() or None
+    if ingredient_id is not None:
+        try:
+            ingredient_id = int(ingredient_id)
+        except (TypeError, ValueError):
+            raise ValueError("id: must be a whole number")
+    if ingredient_id is None and 'name' not in values:
+        raise ValueError("Needs an id or a name")
+    return ingredient_id, values
+
+
+def _plain(value):
+    # Decimals as strings, like the serializers (DRF's encoder would make floats)
+    return str(value) if isinstance(value, Decimal) else value
+
+
+class _Import:
+    def __init__(self, restaurant_id, dry_run):
+        self.restaurant_id = restaurant_id
+        self.dry_run = dry_run
+        self.by_id, self.by_name = {}, {}
+        for ingredient in Ingredient.objects.filter(restaurant_id=restaurant_id).only(
+                'id', 'restaurant_id', *FIELDS.values()):
+            self.by_id[ingredient.id] = ingredient
+            self.by_name.setdefault(ingredient.name.strip().lower(), []).append(ingredient)
+        self.seen = {}  # ingredient id / new name -> row number
+        self.report = []
+        self.menu_changed = False
+
+    def _resolve(self, ingredient_id, values):
+        if ingredient_id is not None:
+            ingredient = self.by_id.get(ingredient_id)
+            if ingredient is None:
+                raise ValueError(f"No ingredient with id {ingredient_id}")
+            return ingredient
+        matches = self.by_name.get(values['name'].lower(), [])
+        if len(matches) > 1:
+            raise ValueError(f"{len(matches)} ingredients are called {values['name']!r}, give the id")
+        return matches[0] if matches else None
+
+    def row(self, number, raw, creates, updates):
+        try:
+            ingredient_id, values = _clean(raw)
+            ingredient = self._resolve(ingredient_id, values)
+            key = ingredient.id if ingredient else values['name'].lower()
+            if key in self.seen:
+                raise ValueError(f"Same ingredient as row {self.seen[key]}")
+            self.seen[key] = number
+        except ValueError as e:
+            self.report.append({"row": number, "action": "error", "error": str(e)})
+            return
+
+        if ingredient is None:
+            if 'unit' not in values:
+                self.report.append({"row": number, "action": "error", "name": values['name'],
+                                    "error": "unit: required for a new ingredient"})
+                return
+            ingredient = Ingredient(restaurant_id=self.restaurant_id, **values)
+            creates.append(ingredient)
+            self.report.append({"row": number, "action": "created", "name": ingredient.name,
+                                "changes": {field: [None, _plain(value)] for field, value in values.items()}})
+            return
+
+        if ingredient_id is None:
+            values.pop('name')  # matched by it; don't "rename" 'tomato' to 'Tomato'
+        changes = {
+            field: [_plain(getattr(ingredient, field)), _plain(value)]
+            for field, value in values.items() if getattr(ingredient, field) != value
+        }
+        entry = {"row": number, "id": ingredient.id, "name": ingredient.name,
+                 "action": "updated" if changes else "unchanged"}
+        if changes:
+            entry["changes"] = changes
+            for field in changes:
+                setattr(ingredient, field, values[field])
+            updates.append((ingredient, tuple(sorted(changes))))
+        self.report.append(entry)
+
+    def write(self, creates, updates):
+        """One chunk: a bulk_create, and a bulk_update per set of changed columns."""
+        self.menu_changed |= bool(creates) or any(MENU_FIELDS & set(fields) for _, fields in updates)
+        if self.dry_run:
+            return
+        if creates:
+            Ingredient.objects.bulk_create(creates, batch_size=CHUNK_SIZE)
+        groups = {}
+        for ingredient, fields in updates:
+            groups.setdefault(fields, []).append(ingredient)
+        for fields, ingredients in groups.items():
+            Ingredient.objects.bulk_update(ingredients, fields, batch_size=CHUNK_SIZE)
+
+
+def import_rows(restaurant_id, rows, dry_run=False, chunk_size=CHUNK_SIZE):
+    """
+    Applies stock-take rows to the restaurant's ingredients. Returns the
+    report: counts per action and one entry per row ({row, action, id,
+    name, changes: {field: [old, new]}} or {row, action: "error", error}).
+    Raises ValueError if the upload itself is unreadable (nothing is saved).
+    """
+    with transaction.atomic():
+        job = _Import(restaurant_id, dry_run)
+        rows = iter(rows)
+        number = 0
+        while True:
+            try:
+                chunk = list(islice(rows, chunk_size))
+            except (csv.Error, UnicodeDecodeError) as e:
+                raise ValueError(f"Unreadable CSV after row {number}: {e}")
+            if not chunk:
+                break
+            if number + len(chunk) > MAX_ROWS:
+                raise ValueError(f"At most {MAX_ROWS} rows per import")
+            creates, updates = [], []
+            first_entry = len(job.report)
+            for raw in chunk:
+                number += 1
+                job.row(number, raw, creates, updates)
+            job.write(creates, updates)
+            created = iter(creates)
+            for entry in job.report[first_entry:]:
+                if entry["action"] == "created":
+                    entry["id"] = next(created).id  # None on a dry run
+
+        if job.menu_changed and not dry_run:
+            Restaurant.bump_menu_version(restaurant_id)
+
+    counts = {"created": 0, "updated": 0, "unchanged": 0, "error": 0}
+    for entry in job.report:
+        counts[entry["action"]] += 1
+    return {
+        "dry_run": dry_run,
+        "rows": number,
+        "created": counts["created"],
+        "updated": counts["updated"],
+        "unchanged": counts["unchanged"],
+        "errors": counts["error"],
+        "report": job.report,
+    }
@@ -0,0 +1,73 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from .jobs import job, HIGH, LOW
+from .models import Restaurant, MenuItem, Ingredient, Recipe
+
+logger = logging.getLogger(__name__)
+
+# =========================================
+#  ORDER SIDE EFFECTS (run by restaurant/jobs.py)
+# =========================================
+
+LOW_STOCK_THRESHOLD = Decimal('2.0')   # same cut-off as the analytics dashboard
+
+
+def low_stock_rows(restaurant_id):
+    return list(
+        Ingredient.objects.filter(restaurant_id=restaurant_id, current_stock__lt=LOW_STOCK_THRESHOLD)
+        .order_by('name').values('id', 'name', 'current_stock', 'unit')
+    )
+
+
+@job(priority=HIGH)
+def check_low_stock(restaurant_id):
+    """Refreshes the restaurant's low-stock list and logs ingredients that just ran low."""
+    key = f"low_stock:{restaurant_id}"
+    previous = {row['id'] for row in cache.get(key, [])}
+    low = low_stock_rows(restaurant_id)
+    cache.set(key, low, None)
+    for row in low:
+        if row['id'] not in previous:
+            logger.warning("Low stock: %s has %s %s left", row['name'], row['current_stock'], row['unit'])
+
+
+def _menu_costs_key(restaurant_id, menu_version):
+    return f"menu_costs:{restaurant_id}:{menu_version}"
+
+
+def compute_menu_costs(restaurant_id):
+    """[{name, price, cost, margin}] for every dish -- MenuItem.get_approx_cost/get_profit_margin in 2 queries."""
+    costs = defaultdict(lambda: Decimal('0.00'))
+    recipes = Recipe.objects.filter(menu_item__restaurant_id=restaurant_id).values_list(
+        'menu_item_id', 'quantity_required', 'ingredient__cost_per_unit')
+    for menu_item_id, quantity, cost_per_unit in recipes:
+        costs[menu_item_id] += quantity * cost_per_unit
+
+    rows = []
+    for item_id, name, price in MenuItem.objects.filter(restaurant_id=restaurant_id).values_list('id', 'name', 'price'):
+        cost = costs[item_id]
+        margin = 0 if price == 0 else round(((price - cost) / price) * 100, 2)
+        rows.append({"name": name, "price": price, "cost": cost, "margin": margin})
+    return rows
+
+
+@job(priority=LOW)
+def recalculate_menu_costs(restaurant_id):
+    version = Restaurant.objects.filter(id=restaurant_id).values_list('menu_version', flat=True).first()
+    if version is not None:
+        cache.set(_menu_costs_key(restaurant_id, version), compute_menu_costs(restaurant_id), None)
+
+
+def menu_costs(restaurant_id):
+    """Cached per menu_version; recomputed inline on a miss (e.g. right after a menu edit)."""
+    version = Restaurant.objects.filter(id=restaurant_id).values_list('menu_version', flat=True).first()
+    key = _menu_costs_key(restaurant_id, version)
+    rows = cache.get(key)
+    if rows is None:
+        rows = compute_menu_costs(restaurant_id)
+        cache.set(key, rows, None)
+    return rows
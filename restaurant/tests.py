@@ -1,3 +1,1821 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+from time import monotonic, sleep
+from unittest import mock
+from urllib.parse import urlencode
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+import brotli
+import cbor2
+import msgpack
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db import connection, connections, transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from nexus_core.settings import sqlite_production_databases
+
+from .models import Restaurant, Category, MenuItem, Table, Order, OrderItem, Waiter
+from .models import VariantGroup, VariantOption, Ingredient, Recipe, Customer, Reservation, BackgroundJob
+from .serializers import TableSerializer, OrderSerializer, KitchenOrderSerializer
+from .renderers import CBORParser, CBORRenderer, MessagePackParser, MessagePackRenderer, UJSONRenderer
+from .changes import changes
+from .db_router import READ_ALIAS, ReadWriteRouter, use_read_database
+from .notifications import KITCHEN_GROUP, KitchenFeed, dispatcher, restaurant_group
+from .middleware import CompressionMiddleware
+from .routing import websocket_urlpatterns
+from . import admin, analytics, chain, consumers, customers, db_router, fastpath, images, jobs, media, menu_snapshot, menu_tree, pagination, pricing, profiling, warmup
+
+
+def make_restaurant():
+    """A small but complete restaurant: menu with variants + recipes, tables, a waiter."""
+    restaurant = Restaurant.objects.create(name="Nexus Test Kitchen")
+    category = Category.objects.create(restaurant=restaurant, name="Pizza")
+    cheese = Ingredient.objects.create(restaurant=restaurant, name="Cheese", unit="g", current_stock=1000)
+    dough = Ingredient.objects.create(restaurant=restaurant, name="Dough", unit="g", current_stock=1000)
+
+    pizza = MenuItem.objects.create(restaurant=restaurant, category=category, name="Paneer Tikka Pizza", price=Decimal('249.00'))
+    Recipe.objects.create(menu_item=pizza, ingredient=dough, quantity_required=Decimal('180'))
+    size = VariantGroup.objects.create(menu_item=pizza, name="Size", is_required=True)
+    regular = VariantOption.objects.create(group=size, name="Regular", price_adjustment=0)
+    large = VariantOption.objects.create(group=size, name="Large", price_adjustment=Decimal('80.5'))
+    Recipe.objects.create(variant_option=large, ingredient=cheese, quantity_required=Decimal('40.125'))
+    extras = VariantGroup.objects.create(menu_item=pizza, name="Extras", is_required=False, allow_multiple=True)
+    olives = VariantOption.objects.create(group=extras, name="Olives", price_adjustment=Decimal('15'))
+    jalapeno = VariantOption.objects.create(group=extras, name="Jalapeno", price_adjustment=Decimal('15'))
+
+    tables = [Table.objects.create(restaurant=restaurant, name=f"T{i}", is_occupied=i % 2 == 0) for i in range(1, 4)]
+    waiter = Waiter.objects.create(restaurant=restaurant, name="Asha", pin_code="1234")
+
+    return {
+        "restaurant": restaurant, "category": category, "pizza": pizza, "tables": tables, "waiter": waiter,
+        "ingredients": {"cheese": cheese, "dough": dough},
+        "options": {"regular": regular, "large": large, "olives": olives, "jalapeno": jalapeno},
+    }
+
+
+class FastPathParityTests(TestCase):
+    """fastpath.* must produce exactly what the DRF serializers produce."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = make_restaurant()
+        restaurant, pizza, opts = cls.data["restaurant"], cls.data["pizza"], cls.data["options"]
+        t1, t2, _ = cls.data["tables"]
+
+        # Order with options (and recipes on them), placed by a waiter
+        with_options = Order.objects.create(restaurant=restaurant, table=t1, waiter=cls.data["waiter"],
+                                            total_amount=Decimal('359.50'), customer_name="Ravi", customer_phone="98765")
+        item = OrderItem.objects.create(order=with_options, menu_item=pizza, quantity=1, price_at_time_of_order=Decimal('359.5'))
+        item.selected_options.set([opts["jalapeno"], opts["large"], opts["olives"]])
+        OrderItem.objects.create(order=with_options, menu_item=pizza, quantity=2, price_at_time_of_order=Decimal('249'))
+
+        # Order with no waiter, no customer details, no items, already READY
+        Order.objects.create(restaurant=restaurant, table=t2, status='READY', customer_name=None, customer_phone=None)
+
+        # Order for another restaurant must not leak in
+        other = make_restaurant()
+        Order.objects.create(restaurant=other["restaurant"], table=other["tables"][0])
+
+    def assertSameJson(self, fast, slow):
+        self.assertEqual(fast, slow)
+        self.assertEqual(json.loads(UJSONRenderer().render(fast)), json.loads(JSONRenderer().render(slow)))
+
+    def test_tables(self):
+        tables = Table.objects.filter(restaurant=self.data["restaurant"])
+        self.assertSameJson(fastpath.table_rows(tables), TableSerializer(tables, many=True).data)
+
+    def test_active_orders(self):
+        orders = Order.objects.filter(restaurant=self.data["restaurant"], status__in=['PENDING', 'READY']).order_by('-created_at')
+        self.assertSameJson(fastpath.order_rows(orders), OrderSerializer(orders, many=True).data)
+
+    def test_kitchen_orders(self):
+        orders = Order.objects.filter(status='PENDING').order_by('created_at')
+        self.assertSameJson(fastpath.kitchen_order_rows(orders), KitchenOrderSerializer(orders, many=True).data)
+
+    def test_empty_querysets(self):
+        none = Order.objects.none()
+        self.assertEqual(fastpath.order_rows(none), [])
+        self.assertEqual(fastpath.kitchen_order_rows(none), [])
+        self.assertEqual(fastpath.table_rows(Table.objects.none()), [])
+
+    def test_endpoints_match_serializers(self):
+        restaurant = self.data["restaurant"]
+        orders = Order.objects.filter(restaurant=restaurant, status__in=['PENDING', 'READY']).order_by('-created_at')
+        response = self.client.get(f'/api/orders/active/{restaurant.id}/')
+        self.assertEqual(response.json(), json.loads(JSONRenderer().render(OrderSerializer(orders, many=True).data)))
+
+        kitchen = Order.objects.filter(status='PENDING').order_by('created_at')
+        response = self.client.get('/api/kitchen/orders/')
+        self.assertEqual(response.json(), json.loads(JSONRenderer().render(KitchenOrderSerializer(kitchen, many=True).data)))
+
+        tables = Table.objects.filter(restaurant=restaurant)
+        response = self.client.get(f'/api/tables/{restaurant.id}/')
+        self.assertEqual(response.json(), TableSerializer(tables, many=True).data)
+
+
+@override_settings(JOBS_EAGER=True)
+class KitchenNotificationTests(TestCase):
+    """Kitchen screens hear about committed orders only, after the commit."""
+
+    def setUp(self):
+        self.data = make_restaurant()
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(KITCHEN_GROUP, self.channel)
+
+    def tearDown(self):
+        async_to_sync(self.layer.group_discard)(KITCHEN_GROUP, self.channel)
+
+    def place(self, *lines):
+        payload = {
+            "restaurant_id": str(self.data["restaurant"].id),
+            "table_id": self.data["tables"][0].id,
+            "items": [{"id": self.data["pizza"].id, "qty": qty, "selected_options": options} for options, qty in lines],
+        }
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post('/api/orders/create/', payload, content_type='application/json')
+        self.assertTrue(dispatcher.flush())
+        return response, callbacks
+
+    def received(self):
+        async def receive():
+            try:
+                return await asyncio.wait_for(self.layer.receive(self.channel), timeout=0.2)
+            except asyncio.TimeoutError:
+                return None
+        return async_to_sync(receive)()
+
+    def test_committed_order_reaches_kitchen(self):
+        response, callbacks = self.place(([self.data["options"]["large"].id], 1))
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(callbacks)
+        message = self.received()
+        self.assertEqual(message["type"], "order_notification")
+        self.assertEqual(message["order"]["id"], response.json()["order_id"])
+        self.assertEqual(message["order"]["items"], ["1 x Paneer Tikka Pizza"])
+        sold = analytics.units_sold(self.data["restaurant"].id, timezone.localdate())
+        self.assertEqual((sold["orders"], sold["items"]), (1, {"Paneer Tikka Pizza": 1}))
+
+    def test_rolled_back_order_never_reaches_kitchen(self):
+        large = self.data["options"]["large"].id
+        with self.assertLogs('restaurant.async_views', 'ERROR') as logs:
+            # Fails validation (no Size picked) after the order row was already written
+            response, callbacks = self.place(([], 1))
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"error": str(logs.records[0].exc_info[1])})
+            # First line deducts stock and is saved, the second one runs out of dough
+            response, more_callbacks = self.place(([large], 1), ([large], 10))
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual([record.getMessage() for record in logs.records], ["Order failed"] * 2)
+
+        self.assertEqual(callbacks + more_callbacks, [])
+        self.assertFalse(Order.objects.exists())
+        self.data["ingredients"]["dough"].refresh_from_db()
+        self.assertEqual(self.data["ingredients"]["dough"].current_stock, 1000)
+        self.assertIsNone(self.received())
+
+
+class SalesExportTests(TestCase):
+    """The streamed export: one row per line, only the requested days and restaurant."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = make_restaurant()
+        restaurant, pizza, opts = cls.data["restaurant"], cls.data["pizza"], cls.data["options"]
+        order = Order.objects.create(restaurant=restaurant, table=cls.data["tables"][0], total_amount=Decimal('359.50'))
+        item = OrderItem.objects.create(order=order, menu_item=pizza, quantity=1, price_at_time_of_order=Decimal('359.50'))
+        item.selected_options.set([opts["large"], opts["olives"]])
+        OrderItem.objects.create(order=order, menu_item=pizza, quantity=2, price_at_time_of_order=Decimal('249.00'))
+        # Yesterday's order and another restaurant's must stay out
+        old = Order.objects.create(restaurant=restaurant, table=cls.data["tables"][1])
+        Order.objects.filter(id=old.id).update(created_at=old.created_at - timedelta(days=1))
+        OrderItem.objects.create(order=old, menu_item=pizza, quantity=1, price_at_time_of_order=Decimal('249.00'))
+        other = make_restaurant()
+        other_order = Order.objects.create(restaurant=other["restaurant"], table=other["tables"][0])
+        OrderItem.objects.create(order=other_order, menu_item=other["pizza"], quantity=1, price_at_time_of_order=Decimal('249.00'))
+        cls.order = order
+        cls.staff = User.objects.create_user('accounts', password='x', is_staff=True)
+
+    def export(self, **params):
+        self.client.force_login(self.staff)
+        today = timezone.localdate().isoformat()
+        response = self.client.get(f'/api/export/sales/{self.data["restaurant"].id}/', {'from': today, 'to': today, **params})
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([row['order_id'] for row in rows], [str(self.order.id)] * 2)
+        self.assertEqual((rows[0]['unit_price'], rows[0]['options'], rows[0]['table']), ('359.50', 'Large, Olives', 'T1'))
+        self.assertEqual((rows[1]['quantity'], rows[1]['options'], rows[1]['waiter']), ('2', '', ''))
+
+    def test_ndjson(self):
+        _, body = self.export(format='ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['quantity'] for row in rows], [1, 2])
+        self.assertEqual((rows[0]['order_total'], rows[0]['options'], rows[0]['waiter']), ('359.50', 'Large, Olives', None))
+
+    def test_bad_requests(self):
+        self.client.force_login(self.staff)
+        url = f'/api/export/sales/{self.data["restaurant"].id}/'
+        self.assertEqual(self.client.get(url, {'from': '2026-02-30', 'to': '2026-03-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': '2026-03-01', 'to': '2026-03-01', 'format': 'xml'}).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(url, {'from': '2026-03-01', 'to': '2026-03-01'}).status_code, 302)
+
+
+class SalesReportTests(TestCase):
+    """Ranged analytics: DB-side grouping, closed days served from the cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.data = make_restaurant()
+        self.t1, self.t2, _ = self.data["tables"]
+        self.today = timezone.localdate()
+        self.monday = self.today - timedelta(days=self.today.weekday() + 7)  # last week's Monday
+
+    def order(self, day, hour, amount, table, status='PAID', waiter=None):
+        order = Order.objects.create(restaurant=self.data["restaurant"], table=table, waiter=waiter,
+                                     status=status, total_amount=Decimal(amount))
+        created_at = timezone.make_aware(datetime.combine(day, time(hour, 30)))
+        Order.objects.filter(id=order.id).update(created_at=created_at)
+
+    def report(self, first, last):
+        response = self.client.get(f'/api/analytics/range/{self.data["restaurant"].id}/',
+                                   {'from': first.isoformat(), 'to': last.isoformat(), 'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_report(self):
+        waiter = self.data["waiter"]
+        self.order(self.monday, 12, '100.00', self.t1, waiter=waiter)
+        self.order(self.monday, 12, '50.00', self.t2)
+        self.order(self.monday + timedelta(days=2), 20, '30.00', self.t1, waiter=waiter)
+        self.order(self.monday, 13, '999.00', self.t1, status='PENDING')   # not revenue
+        self.order(self.monday - timedelta(days=1), 13, '999.00', self.t1)  # outside the range
+
+        data = self.report(self.monday, self.monday + timedelta(days=6))
+        self.assertEqual((data["orders"], data["revenue"], data["average_ticket"]), (3, 180, 60))
+        self.assertEqual(data["heatmap"]["orders"][0][12], 2)
+        self.assertEqual(data["heatmap"]["revenue"][2][20], 30)
+        self.assertEqual(sum(map(sum, data["heatmap"]["orders"])), 3)
+        self.assertEqual([day["orders"] for day in data["daily"]], [2, 0, 1, 0, 0, 0, 0])
+        self.assertEqual([(row["name"], row["orders"], row["revenue"]) for row in data["waiters"]],
+                         [("Asha", 2, 130), (None, 1, 50)])
+        self.assertEqual([(row["name"], row["average_ticket"]) for row in data["tables"]],
+                         [("T1", 65), ("T2", 50)])
+
+    def test_closed_days_are_cached(self):
+        self.order(self.monday, 12, '100.00', self.t1)
+        first, last = self.monday, self.monday + timedelta(days=6)
+        self.report(first, last)
+        # Rows written behind the ORM's back aren't picked up: nothing is recomputed
+        self.order(self.monday, 15, '40.00', self.t1)
+        with self.assertNumQueries(0):
+            data = self.report(first, last)
+        self.assertEqual(data["revenue"], 100)
+
+        # Today is still open: recomputed every time
+        self.order(self.today, 0, '10.00', self.t1)
+        self.assertEqual(self.report(self.today, self.today)["revenue"], 10)
+        self.order(self.today, 0, '5.00', self.t1)
+        self.assertEqual(self.report(self.today, self.today)["revenue"], 15)
+
+    def test_late_settlement_reopens_a_closed_day(self):
+        self.order(self.monday, 12, '100.00', self.t1)
+        self.order(self.monday, 22, '60.00', self.t2, status='READY')  # tab left open overnight
+        first, last = self.monday, self.monday + timedelta(days=6)
+        self.assertEqual(self.report(first, last)["revenue"], 100)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(f'/api/settle/{self.t2.id}/').status_code, 200)
+        data = self.report(first, last)
+        self.assertEqual((data["orders"], data["revenue"]), (2, 160))
+        self.assertEqual(data["heatmap"]["revenue"][0][22], 60)
+
+        # A correction through the ORM (admin, shell) reopens the day too
+        order = Order.objects.get(total_amount=Decimal('100.00'))
+        order.total_amount = Decimal('90.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+        self.assertEqual(self.report(first, last)["revenue"], 150)
+        with self.assertNumQueries(0):  # and is cached again
+            self.report(first, last)
+
+    def test_bad_range(self):
+        url = f'/api/analytics/range/{self.data["restaurant"].id}/'
+        self.assertEqual(self.client.get(url, {'from': '2026-03-02', 'to': '2026-03-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': '2024-01-01', 'to': '2026-03-01'}).status_code, 400)
+
+
+@override_settings(CHAIN_WORKERS=1)
+class ChainDashboardTests(TestCase):
+    """One page for every restaurant the logged-in owner has."""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', password='x')
+        self.first, self.second, other = make_restaurant(), make_restaurant(), make_restaurant()
+        for data in (self.first, self.second):
+            Restaurant.objects.filter(id=data["restaurant"].id).update(owner=self.owner)
+        now = timezone.now()
+        for data, amount, prep in ((self.first, '100.00', 10), (self.second, '50.00', 20), (other, '999.00', 1)):
+            order = Order.objects.create(restaurant=data["restaurant"], table=data["tables"][0], status='PAID',
+                                         total_amount=Decimal(amount))
+            Order.objects.filter(id=order.id).update(created_at=now - timedelta(minutes=prep), ready_at=now)
+        Ingredient.objects.filter(id=self.second["ingredients"]["cheese"].id).update(current_stock=1)
+
+    def test_dashboard(self):
+        self.client.force_login(self.owner)
+        data = self.client.get('/api/analytics/chain/', {'format': 'json'}).json()
+        self.assertEqual([row["id"] for row in data["restaurants"]],
+                         [str(self.first["restaurant"].id), str(self.second["restaurant"].id)])
+        self.assertEqual([(row["orders"], row["revenue"], row["avg_prep_minutes"]) for row in data["restaurants"]],
+                         [(1, 100, 10), (1, 50, 20)])
+        self.assertEqual([len(row["low_stock"]) for row in data["restaurants"]], [0, 1])
+        self.assertEqual(data["totals"], {"orders": 2, "revenue": 150, "average_ticket": 75,
+                                          "avg_prep_minutes": 15, "low_stock": 1})
+
+    def test_failing_restaurant_does_not_sink_the_page(self):
+        broken = self.second["restaurant"].id
+        real = chain.restaurant_summary
+
+        def summary(restaurant_id, first, last):
+            if restaurant_id == broken:
+                raise RuntimeError("replica down")
+            return real(restaurant_id, first, last)
+
+        with mock.patch.object(chain, 'restaurant_summary', summary):
+            data = chain.chain_dashboard([(self.first["restaurant"].id, "A"), (broken, "B")],
+                                         timezone.localdate(), timezone.localdate())
+        self.assertEqual(data["restaurants"][1]["error"], "replica down")
+        self.assertEqual(data["totals"]["orders"], 1)
+
+    def test_login_required(self):
+        self.assertEqual(self.client.get('/api/analytics/chain/').status_code, 403)
+
+
+class PricingPlanTests(TestCase):
+    """Orders are validated and priced against the compiled menu, without queries."""
+
+    def setUp(self):
+        self.data = make_restaurant()
+        self.restaurant = Restaurant.objects.get(id=self.data["restaurant"].id)
+        self.opts = self.data["options"]
+        self.pizza = self.data["pizza"].id
+
+    def test_validate_and_price_without_queries(self):
+        plan = pricing.menu_plan(self.restaurant)
+        with self.assertNumQueries(0):
+            lines = pricing.price_order(plan, [
+                {"id": self.pizza, "qty": 2, "selected_options": [self.opts["large"].id, self.opts["olives"].id]},
+                {"id": self.pizza, "qty": 1, "selected_options": [self.opts["regular"].id]},
+            ])
+            needed = pricing.stock_needed(lines)
+        self.assertEqual([line.unit_price for line in lines], [Decimal('344.50'), Decimal('249.00')])
+        self.assertEqual(sum(line.line_total for line in lines), Decimal('938.00'))
+        self.assertEqual(needed, {self.data["ingredients"]["dough"].id: Decimal('540'),
+                                  self.data["ingredients"]["cheese"].id: Decimal('80.250')})
+
+    def test_rules(self):
+        plan = pricing.menu_plan(self.restaurant)
+        other = make_restaurant()
+        for options, error in (
+            ([], "Selection required for 'Size'"),
+            ([self.opts["large"].id, self.opts["regular"].id], "Only one selection allowed for 'Size'"),
+            ([self.opts["large"].id, other["options"]["large"].id],
+             f"Option {other['options']['large'].id} is not available for 'Paneer Tikka Pizza'"),
+        ):
+            with self.assertRaisesMessage(pricing.OrderError, error):
+                pricing.price_order(plan, [{"id": self.pizza, "qty": 1, "selected_options": options}])
+        with self.assertRaises(Http404):  # another restaurant's dish
+            pricing.price_order(plan, [{"id": other["pizza"].id, "qty": 1, "selected_options": []}])
+        # Extras allow several
+        pricing.price_order(plan, [{"id": self.pizza, "qty": 1, "selected_options": [
+            self.opts["large"].id, self.opts["olives"].id, self.opts["jalapeno"].id]}])
+
+    def test_recompiled_after_menu_edit(self):
+        plan = pricing.menu_plan(self.restaurant)
+        self.assertIs(pricing.menu_plan(self.restaurant), plan)
+        large = VariantOption.objects.get(id=self.opts["large"].id)
+        large.price_adjustment = Decimal('100')
+        large.save()  # bumps menu_version (signals)
+        self.restaurant.refresh_from_db()
+        line = pricing.price_line(pricing.menu_plan(self.restaurant), self.pizza, 1, [large.id])
+        self.assertEqual(line.unit_price, Decimal('349.00'))
+
+
+@override_settings(JOBS_EAGER=True)
+class WarmupTests(TestCase):
+    """Startup warmup preloads the busy restaurants; /ready/ gates on it."""
+
+    def setUp(self):
+        cache.clear()
+        pricing._plans.clear()
+        self.busy = make_restaurant()
+        self.quiet = make_restaurant()
+        Order.objects.create(restaurant=self.busy["restaurant"], table=self.busy["tables"][0], total_amount=100)
+        old = Order.objects.create(restaurant=self.quiet["restaurant"], table=self.quiet["tables"][0], total_amount=100)
+        Order.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=60))
+        self.warmup = warmup.Warmup()
+
+    def test_preloads_active_restaurants(self):
+        self.warmup.run()
+        report = self.warmup.report()
+        self.assertTrue(report["ready"])
+        self.assertEqual(report["restaurants"], 1)
+        self.assertEqual(report["errors"], {})
+        self.assertEqual(set(report["steps"]), {"database", "modules", "jobs", "menus"})
+
+        self.assertIn(str(self.busy["restaurant"].id), pricing._plans)
+        self.assertNotIn(str(self.quiet["restaurant"].id), pricing._plans)
+        with self.assertNumQueries(1):  # menu_version only, the snapshot is cached
+            menu_snapshot.get_snapshot(self.busy["restaurant"].id)
+
+    def test_readiness(self):
+        with mock.patch.object(warmup, 'startup', self.warmup), mock.patch.object(self.warmup, 'start'):
+            response = self.client.get('/ready/')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()["state"], "pending")
+            self.warmup.run()
+            response = self.client.get('/ready/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["ready"])
+
+    def test_database_failure_keeps_worker_unready(self):
+        with mock.patch.object(self.warmup, '_open_connections', side_effect=RuntimeError("db down")):
+            self.warmup.run()
+        self.assertEqual(self.warmup.state, "failed")
+        self.assertEqual(self.warmup.report()["errors"], {"database": "db down"})
+        self.assertEqual(list(self.warmup.steps), ["database"])
+
+
+class OrderListingPageTests(TestCase):
+    """Active / kitchen order listings: keyset pages on (created_at, id) and ?fields= projection."""
+
+    def setUp(self):
+        self.data = make_restaurant()
+        restaurant, table, pizza = self.data["restaurant"], self.data["tables"][0], self.data["pizza"]
+        base = timezone.now() - timedelta(hours=1)
+        self.orders = []
+        for minutes in (0, 5, 5, 5, 10, 20):  # ties on created_at: id breaks them
+            order = Order.objects.create(restaurant=restaurant, table=table, total_amount=Decimal('249.00'))
+            OrderItem.objects.create(order=order, menu_item=pizza, quantity=1, price_at_time_of_order=Decimal('249'))
+            Order.objects.filter(id=order.id).update(created_at=base + timedelta(minutes=minutes))
+            self.orders.append(order.id)
+        self.active = f'/api/orders/active/{restaurant.id}/'
+
+    def pages(self, url, **params):
+        ids, cursor = [], None
+        while True:
+            query = dict(params, **({"cursor": cursor} if cursor else {}))
+            body = self.client.get(url, query).json()
+            self.assertLessEqual(len(body["results"]), params["limit"])
+            ids += [row["id"] for row in body["results"]]
+            cursor = body["next"]
+            if cursor is None:
+                return ids, body["results"]
+
+    def test_pages(self):
+        ids, last_page = self.pages(self.active, limit=2)
+        self.assertEqual(ids, self.orders[::-1])  # newest first
+        self.assertEqual(last_page[0]["items"][0]["menu_item"], self.data["pizza"].id)
+
+        ids, _ = self.pages('/api/kitchen/orders/', limit=4)
+        self.assertEqual(ids, self.orders)  # oldest first
+
+        # Clients that don't page keep getting the bare list
+        self.assertEqual([row["id"] for row in self.client.get(self.active).json()], self.orders[::-1])
+
+    def test_unpaged_listing_is_not_cut_off(self):
+        restaurant, table = self.data["restaurant"], self.data["tables"][0]
+        Order.objects.bulk_create([Order(restaurant=restaurant, table=table, total_amount=Decimal('10.00'))
+                                   for _ in range(600)])
+        with self.assertNumQueries(4):  # menu_version (ETag), orders, items, options: no sort-key query
+            rows = self.client.get(self.active).json()
+        self.assertEqual(len(rows), 606)
+        self.assertEqual(len(self.client.get('/api/kitchen/orders/', {"fields": "id"}).json()), 606)
+
+    def test_fields(self):
+        with self.assertNumQueries(3):  # menu_version (ETag), sort keys, orders: no item/option queries
+            body = self.client.get(self.active, {"fields": "id,status,total_amount", "limit": 3}).json()
+        self.assertEqual(body["results"][0], {"id": self.orders[-1], "status": "PENDING", "total_amount": "249.00"})
+
+        rows = self.client.get('/api/kitchen/orders/', {"fields": "id,created_at"}).json()
+        self.assertEqual(set(rows[0]), {"id", "created_at"})
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(self.active, {"fields": "id,secret"}).json(),
+                         {"error": "Unknown field(s): secret"})
+        for cursor in ("garbage", "WyJub3QgYSBkYXRlIiwxXQ"):  # ["not a date",1]
+            response = self.client.get('/api/kitchen/orders/', {"cursor": cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"error": "Invalid cursor"})
+
+
+@override_settings(JOBS_EAGER=True, PHONE_COUNTRY_CODE='91')
+class CustomerProfileTests(TestCase):
+    """Profiles keyed by canonical phone, kept up to date by place_order / make_reservation."""
+
+    def setUp(self):
+        self.data = make_restaurant()
+        self.restaurant = self.data["restaurant"]
+        self.url = f'/api/customers/{self.restaurant.id}/'
+
+    def order(self, phone, name="Guest", qty=1, options=()):
+        payload = {
+            "restaurant_id": str(self.restaurant.id), "table_id": self.data["tables"][0].id,
+            "customer_name": name, "customer_phone": phone,
+            "items": [{"id": self.data["pizza"].id, "qty": qty,
+                       "selected_options": [self.data["options"]["regular"].id, *options]}],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/orders/create/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()["order_id"]
+
+    def test_canonical_phone(self):
+        for raw in ("+91 98765-43210", "0091 98765 43210", "098765 43210", "9876543210", " (98765) 43210 "):
+            self.assertEqual(customers.canonical_phone(raw), "+919876543210", raw)
+        for raw in (None, "", "N/A", "12", "+1234567890123456"):
+            self.assertIsNone(customers.canonical_phone(raw), raw)
+
+    def test_orders_update_one_profile(self):
+        first = self.order("98765 43210", name="Ravi", qty=2, options=[self.data["options"]["olives"].id])
+        second = self.order("+91-98765-43210")
+        self.order("")  # no phone, no profile
+
+        customer = Customer.objects.get()
+        self.assertEqual((customer.phone, customer.name), ("+919876543210", "Ravi"))
+        self.assertEqual((customer.order_count, customer.visit_count), (2, 1))
+        self.assertEqual(customer.lifetime_spend, Decimal('777.00'))  # 2 x 264 + 249
+        self.assertEqual(set(Order.objects.filter(customer=customer).values_list('id', flat=True)), {first, second})
+
+        body = self.client.get(self.url, {"phone": "09876543210", "limit": 1}).json()
+        self.assertEqual(body["customer"]["orders"], 2)
+        self.assertEqual(body["customer"]["favourites"],
+                         [{"menu_item": self.data["pizza"].id, "name": "Paneer Tikka Pizza", "quantity": 3}])
+        self.assertEqual([row["id"] for row in body["orders"]["results"]], [second])
+        page = self.client.get(self.url, {"phone": "9876543210", "cursor": body["orders"]["next"]}).json()
+        self.assertEqual([row["id"] for row in page["orders"]["results"]], [first])
+
+    def test_lookup_cost_does_not_grow_with_history(self):
+        for _ in range(2):
+            self.order("9876543210")
+        params = {"phone": "9876543210", "fields": "id,total_amount", "limit": 2}
+        with self.assertNumQueries(5):  # profile, page keys, page rows, favourite names, reservations
+            self.client.get(self.url, params)
+        Ingredient.objects.update(current_stock=100000)
+        for _ in range(3):
+            self.order("9876543210")
+        with self.assertNumQueries(5):
+            self.client.get(self.url, params)
+
+    def test_reservations(self):
+        when = (timezone.now() + timedelta(days=2)).strftime("%Y-%m-%d %H:%M:%S")
+        response = self.client.post('/api/reservations/create/', {
+            "restaurant_id": str(self.restaurant.id), "name": "Meera", "phone": "+91 91234 56789", "time": when,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        body = self.client.get(self.url, {"phone": "9123456789"}).json()
+        self.assertEqual((body["customer"]["name"], body["customer"]["reservations"]), ("Meera", 1))
+        self.assertEqual(len(body["upcoming_reservations"]), 1)
+
+    def test_bad_lookups(self):
+        self.assertEqual(self.client.get(self.url, {"phone": "x"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"phone": "9000000000"}).status_code, 404)
+
+    def test_rebuild_from_history(self):
+        table = self.data["tables"][0]
+        for phone, total in (("98765 43210", 100), ("+919876543210", 50), ("n/a", 10)):
+            order = Order.objects.create(restaurant=self.restaurant, table=table, customer_name="Ravi",
+                                         customer_phone=phone, total_amount=total)
+            OrderItem.objects.create(order=order, menu_item=self.data["pizza"], quantity=2, price_at_time_of_order=50)
+        Reservation.objects.create(restaurant=self.restaurant, customer_name="Ravi", customer_phone="09876543210",
+                                   reservation_time=timezone.now())
+
+        self.assertEqual(customers.rebuild([self.restaurant.id]), {self.restaurant.id: 1})
+        customer = Customer.objects.get()
+        self.assertEqual((customer.order_count, customer.lifetime_spend, customer.reservation_count),
+                         (2, Decimal('150.00'), 1))
+        self.assertEqual(customer.item_counts, {str(self.data["pizza"].id): 4})
+        self.assertEqual(Order.objects.filter(customer=customer).count(), 2)
+        self.assertEqual(Reservation.objects.get().customer, customer)
+        customers.rebuild([self.restaurant.id])  # idempotent
+        self.assertEqual(Customer.objects.get().order_count, 2)
+
+
+@override_settings(JOBS_EAGER=True)
+class StocktakeImportTests(TestCase):
+    def setUp(self):
+        self.data = make_restaurant()
+        self.restaurant = self.data["restaurant"]
+        self.url = f'/api/inventory/import/{self.restaurant.id}/'
+        self.cheese = Ingredient.objects.get(restaurant=self.restaurant, name="Cheese")
+        self.dough = Ingredient.objects.get(restaurant=self.restaurant, name="Dough")
+
+    def post(self, body, content_type='text/csv', query=''):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url + query, body, content_type=content_type)
+        return response
+
+    def test_csv_count_creates_updates_and_reports(self):
+        sheet = (
+            "﻿ID,Name,Unit,Stock,Cost\n"
+            f"{self.cheese.id},,,850.5,\n"            # counted
+            ",dough,,1000,40\n"                       # matched by name, same count, new cost
+            ",Basil,g,200,3.5\n"                      # new
+            ",Oregano,,10,\n"                         # new but no unit
+            "999999,,,5,\n"                           # unknown id
+            ",Basil,g,1,\n"                           # listed twice
+            f"{self.cheese.id},,,-1,\n"
+        )
+        version = Restaurant.objects.get(id=self.restaurant.id).menu_version
+        # restaurant, savepoint, ingredient lookup, insert, one update per changed column set, menu version, release
+        with self.assertNumQueries(8):
+            response = self.client.post(self.url, sheet, content_type='text/csv')
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual((body["rows"], body["created"], body["updated"], body["unchanged"], body["errors"]),
+                         (7, 1, 2, 0, 4))
+        report = {entry["row"]: entry for entry in body["report"]}
+        self.assertEqual(report[1]["changes"], {"current_stock": ["1000.000", "850.500"]})
+        self.assertEqual(report[2]["changes"], {"cost_per_unit": ["0.00", "40.00"]})
+        self.assertEqual(report[4]["error"], "unit: required for a new ingredient")
+        self.assertIn("999999", report[5]["error"])
+        self.assertEqual(report[6]["error"], "Same ingredient as row 3")
+        self.assertIn("negative", report[7]["error"])
+
+        self.cheese.refresh_from_db()
+        self.dough.refresh_from_db()
+        basil = Ingredient.objects.get(restaurant=self.restaurant, name="Basil")
+        self.assertEqual(self.cheese.current_stock, Decimal('850.500'))
+        self.assertEqual((self.dough.name, self.dough.cost_per_unit), ("Dough", Decimal('40.00')))
+        self.assertEqual((report[3]["id"], basil.current_stock), (basil.id, Decimal('200.000')))
+        self.assertEqual(Restaurant.objects.get(id=self.restaurant.id).menu_version, version + 1)
+
+    def test_stock_only_import_keeps_concurrent_cost_and_menu_version(self):
+        version = Restaurant.objects.get(id=self.restaurant.id).menu_version
+        response = self.post([{"id": self.cheese.id, "stock": "12"}], content_type='application/json')
+        self.assertEqual(response.json()["updated"], 1)
+        self.assertEqual(Restaurant.objects.get(id=self.restaurant.id).menu_version, version)
+
+    def test_dry_run_writes_nothing(self):
+        response = self.post({"rows": [{"name": "Basil", "unit": "g"}, {"name": "cheese", "stock": 1}]},
+                             content_type='application/json', query='?dry_run=1')
+        body = response.json()
+        self.assertEqual((body["dry_run"], body["created"], body["updated"]), (True, 1, 1))
+        self.assertFalse(Ingredient.objects.filter(name="Basil").exists())
+        self.cheese.refresh_from_db()
+        self.assertEqual(self.cheese.current_stock, Decimal('1000.000'))
+
+    def test_multipart_file_upload(self):
+        upload = io.BytesIO(f"id,stock\n{self.dough.id},5\n".encode())
+        upload.name = "count.csv"
+        response = self.client.post(self.url, {"file": upload})
+        self.assertEqual(response.json()["updated"], 1)
+        self.dough.refresh_from_db()
+        self.assertEqual(self.dough.current_stock, Decimal('5.000'))
+
+    def test_unreadable_upload_is_rejected_whole(self):
+        response = self.post(b"name,unit\nBasil,g\n\xff\xfe,g\n" * 400)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Ingredient.objects.filter(name="Basil").exists())
+        self.assertEqual(self.post('"just a string"', content_type='application/json').status_code, 400)
+
+
+class MenuTreeTests(TestCase):
+    def setUp(self):
+        self.data = make_restaurant()
+        self.source = self.data["restaurant"]
+        self.branch = Restaurant.objects.create(name="Branch")
+        self.client.force_login(User.objects.create_user('menus', password='x', is_staff=True))
+
+    def test_export_then_clone_to_a_new_branch(self):
+        response = self.client.get(f'/api/menu/{self.source.id}/export/')
+        self.assertEqual(response.status_code, 200)
+        tree = response.json()
+        pizza = tree["categories"][0]["items"][0]
+        self.assertEqual((pizza["name"], pizza["price"]), ("Paneer Tikka Pizza", "249.00"))
+        self.assertEqual([group["name"] for group in pizza["variant_groups"]], ["Size", "Extras"])
+
+        # session, user, restaurant; one read and one insert per table; menu version; savepoint + release
+        with self.assertNumQueries(18):
+            response = self.client.post(f'/api/menu/{self.branch.id}/import/', tree, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["items"], {"created": 1, "updated": 0})
+        self.assertEqual(menu_tree.export_tree(self.branch.id), menu_tree.export_tree(self.source.id))
+        self.assertEqual(Ingredient.objects.get(restaurant=self.branch, name="Dough").current_stock, 0)
+        # The branch's menu works end to end: cached snapshot and order pricing
+        self.assertEqual(menu_snapshot.get_snapshot(self.branch.id).version, 1)
+        plan = pricing.menu_plan(Restaurant.objects.get(id=self.branch.id))
+        large = VariantOption.objects.get(group__menu_item__restaurant=self.branch, name="Large")
+        self.assertEqual(plan.items[large.group.menu_item_id].option_price[large.id], Decimal('80.50'))
+
+        # Importing the same tree again changes nothing
+        again = menu_tree.import_tree(self.branch.id, tree)
+        self.assertFalse(any(n for counts in again.values() for n in counts.values()))
+
+    def test_merge_updates_and_replaces_recipes(self):
+        tree = {"categories": [{"name": "pizza", "items": [{
+            "name": "paneer tikka pizza", "price": "219",
+            "recipe": [{"ingredient": "Dough", "quantity": "200"}, {"ingredient": "cheese", "quantity": "30"}],
+            "variant_groups": [{"name": "Size", "options": [
+                {"name": "Medium", "price_adjustment": "40"}, {"name": "Large", "recipe": []},
+            ]}],
+        }, {
+            "name": "Margherita", "price": "179", "recipe": [{"ingredient": "basil", "quantity": "5"}],
+        }]}], "ingredients": [{"name": "Basil", "unit": "g"}]}
+        result = menu_tree.import_tree(self.source.id, tree)
+        self.assertEqual(result["items"], {"created": 1, "updated": 1})
+        self.assertEqual(result["recipes"], {"created": 2, "updated": 1, "deleted": 1})
+
+        pizza = self.data["pizza"]
+        pizza.refresh_from_db()
+        self.assertEqual((pizza.name, pizza.price), ("Paneer Tikka Pizza", Decimal('219.00')))
+        self.assertEqual(sorted(pizza.recipes.values_list('ingredient__name', 'quantity_required')),
+                         [("Cheese", Decimal('30.000')), ("Dough", Decimal('200.000'))])
+        self.assertFalse(self.data["options"]["large"].recipes.exists())
+        self.assertEqual(sorted(pizza.variant_groups.get(name="Size").options.values_list('name', flat=True)),
+                         ["Large", "Medium", "Regular"])
+        self.assertTrue(MenuItem.objects.filter(restaurant=self.source, name="Margherita",
+                                                recipes__ingredient__name="Basil").exists())
+
+    def test_invalid_tree_writes_nothing(self):
+        tree = {"categories": [{"name": "Pizza", "items": [
+            {"name": "New", "recipe": [{"ingredient": "Saffron", "quantity": 1}]},
+            {"name": "Other", "price": "abc"},
+            {"name": "new", "price": "1"},
+        ]}, {"name": "Drinks"}]}
+        response = self.client.post(f'/api/menu/{self.source.id}/import/', tree, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json()["errors"]), 4)
+        self.assertFalse(Category.objects.filter(name="Drinks").exists())
+
+        self.client.logout()
+        response = self.client.post(f'/api/menu/{self.source.id}/import/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(JOBS_EAGER=True, PROFILING_SAMPLE_RATE=0, PROFILING_KEEP=3)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.data = make_restaurant()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        override = override_settings(PROFILING_DIR=self.dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.payload = {
+            "restaurant_id": str(self.data["restaurant"].id), "table_id": self.data["tables"][0].id,
+            "items": [{"id": self.data["pizza"].id, "qty": 1, "selected_options": [self.data["options"]["large"].id]}],
+        }
+
+    def order(self, **headers):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/orders/create/', self.payload, content_type='application/json',
+                                        headers=headers)
+        self.assertEqual(response.status_code, 201, response.content)
+        return response
+
+    def test_off_without_a_valid_token(self):
+        expired = signing.dumps({"mode": "sample", "until": 1}, salt=profiling.SALT)
+        for headers in ({}, {"X-Profile": "forged"}, {"X-Profile": expired}):
+            self.assertNotIn('X-Profile-Id', self.order(**headers))
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_cprofile_with_query_log(self):
+        response = self.order(**{"X-Profile": profiling.make_token('cprofile')})
+        profile = profiling.load_profiles(self.dir)[0]
+        self.assertEqual(os.listdir(self.dir), [response['X-Profile-Id']])
+        self.assertEqual((profile["endpoint"], profile["mode"], profile["trigger"], profile["status"]),
+                         ("restaurant.async_views.create_order", "cprofile", "header", 201))
+        self.assertTrue(any(label.startswith("place_order (restaurant/views.py") for label, *_ in profile["functions"]))
+        self.assertGreater(profile["queries"]["count"], 3)
+        self.assertTrue(any('INSERT INTO "restaurant_order"' in entry["sql"] for entry in profile["queries"]["log"]))
+        self.assertFalse(any(self.data["restaurant"].name in entry["sql"] for entry in profile["queries"]["log"]))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_MODE='sample', PROFILING_SAMPLE_INTERVAL=0.001)
+    async def test_sampled_async_requests_rotate(self):
+        price_order = pricing.price_order
+
+        def slow_price_order(*args):
+            sleep(0.02)  # long enough to be sampled, in the request's ORM thread
+            return price_order(*args)
+
+        with mock.patch.object(pricing, 'price_order', slow_price_order):
+            for _ in range(4):
+                response = await self.async_client.post('/api/orders/create/', self.payload,
+                                                        content_type='application/json')
+                self.assertEqual(response.status_code, 201)
+        profiles = await sync_to_async(profiling.load_profiles)(self.dir)
+        self.assertEqual(len(profiles), 3)
+        self.assertEqual({(p["mode"], p["trigger"], p["endpoint"]) for p in profiles},
+                         {("sample", "sampled", "restaurant.async_views.create_order")})
+        for profile in profiles:
+            self.assertGreater(profile["queries"]["count"], 3)
+            stacks = profile["samples"]["stacks"]
+            self.assertTrue(any("place_order (restaurant/views.py" in stack and "slow_price_order" in stack
+                                for stack in stacks), stacks)
+
+    def test_summary(self):
+        self.order(**{"X-Profile": profiling.make_token('cprofile')})
+        out = io.StringIO()
+        call_command('profile_summary', stdout=out)
+        report = out.getvalue()
+        self.assertIn("restaurant.async_views.create_order", report)
+        self.assertIn("Hot spots by self time", report)
+        self.assertIn('INSERT INTO "restaurant_order"', report)
+
+
+class MenuSnapshotTests(TestCase):
+    """The menu is cached as prebuilt bytes per menu_version; parsed only for the binary renderers."""
+
+    def setUp(self):
+        cache.clear()
+        self.data = make_restaurant()
+        self.url = f'/api/menu/{self.data["restaurant"].id}/'
+
+    def test_cache_holds_bytes_only(self):
+        response = self.client.get(self.url)
+        restaurant = self.data["restaurant"]
+        restaurant.refresh_from_db()
+        cached = cache.get(menu_snapshot._cache_key(restaurant.id, restaurant.menu_version))
+        self.assertEqual(set(cached), {"version", "json", "encoded", "etag"})
+        self.assertEqual(response.content, cached["json"])
+        self.assertTrue(all(isinstance(body, bytes) for body in cached["encoded"].values()))
+
+        response = self.client.get(self.url, headers={"If-None-Match": cached["etag"]})
+        self.assertEqual(response.status_code, 304)
+
+    def test_binary_renderers_get_the_same_menu(self):
+        menu = self.client.get(self.url).json()
+        response = self.client.get(self.url, headers={"Accept": "application/msgpack"})
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), menu)
+        self.assertEqual(cbor2.loads(self.client.get(self.url, {"format": "cbor"}).content), menu)
+
+
+def kitchen_socket(path):
+    return WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+
+
+class KitchenBumpCommandTests(TestCase):
+    """bump / unbump / bump_many over the kitchen socket."""
+
+    def setUp(self):
+        self.data = make_restaurant()
+        restaurant, table = self.data["restaurant"], self.data["tables"][0]
+        self.orders = [Order.objects.create(restaurant=restaurant, table=table).id for _ in range(3)]
+        other = make_restaurant()
+        self.foreign = Order.objects.create(restaurant=other["restaurant"], table=other["tables"][0]).id
+
+    async def connect(self, restaurant=True):
+        path = f'/ws/kitchen/{self.data["restaurant"].id}/' if restaurant else '/ws/kitchen/'
+        socket = kitchen_socket(path)
+        connected, _ = await socket.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await socket.receive_json_from())["type"], "snapshot")
+        return socket
+
+    async def command(self, socket, **command):
+        await socket.send_json_to(command)
+        return await socket.receive_json_from()
+
+    async def statuses(self, *ids):
+        rows = Order.objects.filter(id__in=ids).order_by('id').values_list('status', flat=True)
+        return [status async for status in rows]
+
+    async def test_bump_and_unbump(self):
+        socket = await self.connect()
+        first = self.orders[0]
+        self.assertEqual(await self.command(socket, action="bump", order_id=first, ref="t1"),
+                         {"type": "ack", "ref": "t1", "action": "bump", "order_ids": [first], "skipped": []})
+        self.assertEqual(await self.statuses(first), ["READY"])
+        # Already bumped (the HTTP fallback or another screen got there first)
+        ack = await self.command(socket, action="bump", order_id=str(first), ref="t2")
+        self.assertEqual((ack["order_ids"], ack["skipped"]), ([], [first]))
+
+        ack = await self.command(socket, action="unbump", order_id=first, ref="t3")
+        self.assertEqual((ack["action"], ack["order_ids"]), ("unbump", [first]))
+        self.assertEqual(await self.statuses(first), ["PENDING"])
+        await socket.disconnect()
+
+    async def test_errors(self):
+        socket = await self.connect()
+        self.assertEqual(await self.command(socket, action="explode", ref="x"),
+                         {"type": "error", "ref": "x", "error": "Unknown action: 'explode'"})
+        error = await self.command(socket, action="bump", order_id="twelve", ref="y")
+        self.assertEqual((error["type"], error["ref"]), ("error", "y"))
+        await socket.send_to(text_data="not json")
+        self.assertEqual((await socket.receive_json_from())["ref"], None)
+        self.assertEqual(await self.statuses(*self.orders), ["PENDING"] * 3)
+        await socket.disconnect()
+
+    async def test_bump_many_is_capped(self):
+        restaurant, table = self.data["restaurant"], self.data["tables"][0]
+        extra = await Order.objects.abulk_create([Order(restaurant=restaurant, table=table)
+                                                  for _ in range(consumers.MAX_BULK_BUMP)])
+        ids = self.orders + [order.id for order in extra]
+        socket = await self.connect()
+        ack = await self.command(socket, action="bump_many", order_ids=ids, ref="all")
+        self.assertEqual(ack["order_ids"], ids[:consumers.MAX_BULK_BUMP])
+        self.assertEqual(ack["skipped"], [])
+        self.assertEqual(await self.statuses(*ids[consumers.MAX_BULK_BUMP:]), ["PENDING"] * 3)
+        await socket.disconnect()
+
+    async def test_restaurant_scoping(self):
+        socket = await self.connect()
+        ack = await self.command(socket, action="bump_many", order_ids=[self.orders[1], self.foreign], ref="s")
+        self.assertEqual((ack["order_ids"], ack["skipped"]), ([self.orders[1]], [self.foreign]))
+        self.assertEqual(await self.statuses(self.foreign), ["PENDING"])
+        await socket.disconnect()
+
+        # The all-restaurants screen may bump any of them
+        socket = await self.connect(restaurant=False)
+        ack = await self.command(socket, action="bump", order_id=self.foreign, ref="s2")
+        self.assertEqual(ack["order_ids"], [self.foreign])
+        await socket.disconnect()
+
+
+class KitchenReplayTests(TestCase):
+    """Kitchen sockets: seq numbers, replay after ?since=, snapshot when the gap can't be replayed."""
+
+    def setUp(self):
+        self.data = make_restaurant()
+        self.restaurant = str(self.data["restaurant"].id)
+        self.pending = Order.objects.create(restaurant=self.data["restaurant"], table=self.data["tables"][0]).id
+        self.feed = KitchenFeed(size=3)
+        patcher = mock.patch.object(consumers, 'feed', self.feed)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def event(self, order_id, restaurant=None):
+        return self.feed.record({"type": "order_notification", "restaurant": restaurant or self.restaurant,
+                                 "order": {"id": order_id}})
+
+    async def connect(self, **query):
+        socket = kitchen_socket(f'/ws/kitchen/{self.restaurant}/?{urlencode(query)}')
+        connected, _ = await socket.connect()
+        self.assertTrue(connected)
+        return socket, await socket.receive_json_from()
+
+    async def test_seq_numbers(self):
+        self.event(1)
+        socket, hello = await self.connect()
+        self.assertEqual((hello["type"], hello["epoch"], hello["seq"]), ("snapshot", self.feed.epoch, 1))
+        self.assertEqual([order["id"] for order in hello["orders"]], [self.pending])
+
+        # Live events carry the feed's seq; anything the snapshot already covered is dropped
+        layer = get_channel_layer()
+        group = restaurant_group(self.restaurant)
+        stale, fresh = {**self.event(2), "seq": 1}, self.event(3)
+        await layer.group_send(group, {"type": "order_batch", "events": [stale, fresh]})
+        self.assertEqual(await socket.receive_json_from(), {"type": "order", "seq": 3, "order": {"id": 3}})
+        self.assertTrue(await socket.receive_nothing())
+        await socket.disconnect()
+
+    async def test_replay_since(self):
+        self.event(1)
+        self.event(2, restaurant=str(uuid.uuid4()))  # another restaurant's: not ours to replay
+        self.event(3)
+        socket, hello = await self.connect(epoch=self.feed.epoch, since=1)
+        self.assertEqual(hello, {"type": "replay", "epoch": self.feed.epoch, "seq": 3,
+                                 "events": [{"type": "order", "seq": 3, "order": {"id": 3}}]})
+        await socket.disconnect()
+
+        socket, hello = await self.connect(epoch=self.feed.epoch, since=3)
+        self.assertEqual((hello["type"], hello["events"]), ("replay", []))
+        await socket.disconnect()
+
+    async def test_snapshot_when_replay_is_impossible(self):
+        self.event(1)
+        # The process restarted since (seqs start over under a new epoch)
+        socket, hello = await self.connect(epoch="0ld3p0ch", since=1)
+        self.assertEqual(hello["type"], "snapshot")
+        await socket.disconnect()
+
+        # Too far behind: events after `since` already fell out of the buffer
+        for order_id in range(2, 6):
+            self.event(order_id)
+        socket, hello = await self.connect(epoch=self.feed.epoch, since=1)
+        self.assertEqual((hello["type"], hello["seq"]), ("snapshot", 5))
+        self.assertEqual([order["id"] for order in hello["orders"]], [self.pending])
+        await socket.disconnect()
+
+        socket, hello = await self.connect(epoch=self.feed.epoch, since=2)  # 3..5 are all still there
+        self.assertEqual([event["seq"] for event in hello["events"]], [3, 4, 5])
+        await socket.disconnect()
+
+
+class ConditionalPollTests(TestCase):
+    """Tables / active orders: ETag on the change and menu versions, 304s and ?wait= long-polls."""
+
+    def setUp(self):
+        self.data = make_restaurant()
+        self.restaurant = self.data["restaurant"]
+        order = Order.objects.create(restaurant=self.restaurant, table=self.data["tables"][0])
+        OrderItem.objects.create(order=order, menu_item=self.data["pizza"], price_at_time_of_order=Decimal('249'))
+        self.tables = f'/api/tables/{self.restaurant.id}/'
+        self.active = f'/api/orders/active/{self.restaurant.id}/'
+
+    def test_not_modified(self):
+        for url in (self.tables, self.active):
+            etag = self.client.get(url)["ETag"]
+            with self.assertNumQueries(1):  # menu_version only
+                response = self.client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual((response.status_code, response["ETag"]), (304, etag))
+
+            changes.bump(self.restaurant.id)
+            response = self.client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+
+    def test_menu_edits_revalidate_orders(self):
+        etag = self.client.get(self.active)["ETag"]
+        pizza = self.data["pizza"]
+        pizza.name = "Paneer Makhani Pizza"
+        pizza.save()
+        response = self.client.get(self.active, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["items"][0]["menu_item_name"], "Paneer Makhani Pizza")
+
+    async def test_wait_wakes_on_change(self):
+        etag = (await self.async_client.get(self.active))["ETag"]
+        asyncio.get_running_loop().call_later(0.05, changes.bump, self.restaurant.id)
+        began = asyncio.get_running_loop().time()
+        response = await self.async_client.get(self.active, {"wait": 5}, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertLess(asyncio.get_running_loop().time() - began, 2)
+
+    async def test_wait_is_capped(self):
+        etag = (await self.async_client.get(self.tables))["ETag"]
+        with mock.patch('restaurant.changes.MAX_WAIT', 0.05):
+            began = asyncio.get_running_loop().time()
+            response = await self.async_client.get(self.tables, {"wait": 600}, headers={"If-None-Match": etag})
+        self.assertEqual((response.status_code, response["ETag"]), (304, etag))
+        self.assertLess(asyncio.get_running_loop().time() - began, 2)
+
+
+class ReadWriteRouterTests(SimpleTestCase):
+    """use_read_database + ReadWriteRouter on a file-backed SQLite database in production mode."""
+
+    def in_production_mode(self, check):
+        """Runs check() in a fresh thread whose connections are a scratch SQLITE_PRODUCTION database."""
+        with tempfile.TemporaryDirectory() as tmp:
+            databases = connections.configure_settings(sqlite_production_databases(os.path.join(tmp, 'db.sqlite3')))
+
+            def run():
+                try:
+                    with connections['default'].schema_editor() as editor:
+                        editor.create_model(BackgroundJob)  # any table without foreign keys
+                    return check()
+                finally:
+                    connections.close_all()  # this thread's own
+
+            with mock.patch.object(connections, 'settings', databases), \
+                    mock.patch.object(type(self), 'databases', frozenset(databases)), ThreadPoolExecutor(1) as pool:
+                return pool.submit(run).result()
+
+    def test_reads_go_to_the_read_alias(self):
+        @use_read_database
+        def view():
+            used = []
+            with connections[READ_ALIAS].execute_wrapper(lambda execute, *args: used.append(READ_ALIAS) or execute(*args)):
+                names = list(BackgroundJob.objects.values_list('name', flat=True))
+                # Writes stay on default (the read connection is query_only and would refuse them)
+                BackgroundJob.objects.create(name="written in a read view")
+                with transaction.atomic():
+                    BackgroundJob.objects.create(name="in a transaction")
+                    inside = BackgroundJob.objects.filter(name="in a transaction").db
+                    self.assertTrue(BackgroundJob.objects.filter(name="in a transaction").exists())
+                after = BackgroundJob.objects.all().db
+            return names, used, inside, after
+
+        def check():
+            BackgroundJob.objects.create(name="committed")
+            outside = BackgroundJob.objects.all().db
+            return outside, view()
+
+        outside, (names, used, inside, after) = self.in_production_mode(check)
+        self.assertEqual(outside, 'default')
+        self.assertEqual(names, ["committed"])
+        self.assertEqual(used, [READ_ALIAS])
+        self.assertEqual((inside, after), ('default', READ_ALIAS))
+
+    def test_no_op_without_a_read_alias_or_on_in_memory_sqlite(self):
+        router = ReadWriteRouter()
+        with mock.patch.object(db_router, '_read_only', ContextVar('read_only', default=True)):
+            self.assertIsNone(router.db_for_read(Restaurant))  # tests: no "read" alias
+            with mock.patch.object(connections, 'settings', {**connections.settings, READ_ALIAS: {}}), \
+                    mock.patch.object(connections['default'], 'is_in_memory_db', return_value=True):
+                self.assertIsNone(router.db_for_read(Restaurant))  # the test runner's in-memory database
+        self.assertEqual(router.db_for_write(Restaurant), 'default')
+
+
+class OrderAdminPaginatorTests(TestCase):
+    """EstimatedCountPaginator: estimated counts on unfiltered changelists, deferred joins on deep pages."""
+
+    def setUp(self):
+        self.data = make_restaurant()
+        restaurant, tables = self.data["restaurant"], self.data["tables"]
+        Order.objects.bulk_create([Order(restaurant=restaurant, table=tables[i % 3], total_amount=Decimal('10.00'))
+                                   for i in range(25)])
+        self.orders = Order.objects.select_related('table').order_by('-created_at', '-id')
+
+    def test_count(self):
+        Order.objects.filter(id=Order.objects.order_by('id')[3].id).delete()  # MAX(rowid) no longer exact
+        self.assertEqual(admin.EstimatedCountPaginator(self.orders, 10).count, 24)  # small table: exact
+        with mock.patch.object(admin, 'ESTIMATE_ABOVE', 10):
+            with self.assertNumQueries(1):
+                self.assertEqual(admin.EstimatedCountPaginator(self.orders, 10).count, 25)
+            pending = self.orders.filter(status='PENDING')
+            self.assertEqual(admin.EstimatedCountPaginator(pending, 10).count, 24)  # filtered: exact
+
+    def test_deep_pages_match_offset_pages(self):
+        stock = Paginator(self.orders, 4, orphans=2)
+        with mock.patch.object(admin, 'DEFERRED_JOIN_AFTER', 8):
+            paginator = admin.EstimatedCountPaginator(self.orders, 4, orphans=2)
+            self.assertEqual(paginator.num_pages, stock.num_pages)
+            for number in paginator.page_range:
+                with self.assertNumQueries(1 if number < 3 else 2):  # past 8 rows: ids, then the page
+                    rows = [(order.id, order.table.name) for order in paginator.page(number)]
+                self.assertEqual(rows, [(order.id, order.table.name) for order in stock.page(number)])
+            self.assertEqual(len(paginator.page(paginator.num_pages)), 5)  # orphans fold into the last page
+
+    def test_changelist(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        with mock.patch.object(admin, 'DEFERRED_JOIN_AFTER', 8), \
+                mock.patch.object(admin.OrderAdmin, 'list_per_page', 4):
+            for params in ({}, {"p": 4}, {"status__exact": "PENDING", "p": 5}):
+                response = self.client.get('/admin/restaurant/order/', params)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, "25 orders")
+        # Page 5 newest first: rows 17-20, i.e. the 6th-9th orders created
+        for order in Order.objects.order_by('id')[5:9]:
+            self.assertContains(response, f'/admin/restaurant/order/{order.id}/change/')
+
+
+class MediaServingTests(SimpleTestCase):
+    """serve_media: conditional GETs, byte ranges, cache headers, and nothing outside MEDIA_ROOT."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = os.path.join(tmp.name, 'media')
+        os.makedirs(os.path.join(self.root, 'menu_images', 'variants'))
+        self.body = bytes(range(256)) * 4
+        for name in ('menu_images/paneer.jpg', 'menu_images/variants/0123456789abcdef.webp'):
+            with open(os.path.join(self.root, name), 'wb') as f:
+                f.write(self.body)
+        with open(os.path.join(tmp.name, 'secret.txt'), 'w') as f:
+            f.write("outside MEDIA_ROOT")
+        settings = override_settings(MEDIA_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_full_file_and_cache_headers(self):
+        response = self.client.get('/media/menu_images/paneer.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        variant = self.client.get('/media/menu_images/variants/0123456789abcdef.webp')
+        self.assertEqual(variant['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_conditional_get(self):
+        url = '/media/menu_images/paneer.jpg'
+        first = self.client.get(url)
+        etag, last_modified = first['ETag'], first['Last-Modified']
+        for headers in ({'If-None-Match': etag}, {'If-None-Match': f'"other", {etag}'},
+                        {'If-Modified-Since': last_modified}):
+            response = self.client.get(url, headers=headers)
+            self.assertEqual(response.status_code, 304, headers)
+            self.assertEqual(response['ETag'], etag)
+        # A stale ETag wins over a current date: the file is sent again
+        stale = self.client.get(url, headers={'If-None-Match': '"stale"', 'If-Modified-Since': last_modified})
+        self.assertEqual(stale.status_code, 200)
+
+    def test_ranges(self):
+        url = '/media/menu_images/paneer.jpg'
+        for header, start, end in (('bytes=0-99', 0, 99), ('bytes=1000-', 1000, 1023),
+                                   ('bytes=-24', 1000, 1023), ('bytes=1000-5000', 1000, 1023)):
+            response = self.client.get(url, headers={'Range': header})
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/1024')
+            self.assertEqual(b''.join(response.streaming_content), self.body[start:end + 1])
+
+        for header in ('bytes=1024-', 'bytes=-0', 'bytes=500-400'):
+            response = self.client.get(url, headers={'Range': header})
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+        # Multiple ranges, or an If-Range the file no longer matches: the whole file
+        etag = self.client.get(url)['ETag']
+        for headers in ({'Range': 'bytes=0-1,5-9'}, {'Range': 'bytes=0-99', 'If-Range': '"stale"'}):
+            self.assertEqual(self.client.get(url, headers=headers).status_code, 200)
+        self.assertEqual(self.client.get(url, headers={'Range': 'bytes=0-99', 'If-Range': etag}).status_code, 206)
+
+    def test_head(self):
+        # Called directly: the test client drops HEAD bodies itself, which would hide one sent here
+        url = '/media/menu_images/paneer.jpg'
+        etag = self.client.get(url)['ETag']
+        with mock.patch.object(Path, 'open', side_effect=AssertionError("HEAD opened the file")):
+            response = media.serve_media(RequestFactory().head(url), 'menu_images/paneer.jpg')
+            ranged = media.serve_media(RequestFactory().head(url, headers={'Range': 'bytes=1000-'}),
+                                       'menu_images/paneer.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual((response['Content-Length'], response['Accept-Ranges'], response['ETag']),
+                         ('1024', 'bytes', etag))
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual((ranged.status_code, ranged.content), (206, b''))
+        self.assertEqual((ranged['Content-Range'], ranged['Content-Length']), ('bytes 1000-1023/1024', '24'))
+
+        through_stack = self.client.head(url)
+        self.assertEqual((through_stack.status_code, through_stack['Content-Length']), (200, '1024'))
+        self.assertEqual(self.client.head(url, headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_nothing_outside_media_root(self):
+        for path in ('../secret.txt', 'menu_images/../../secret.txt', '/etc/passwd', 'menu_images', 'missing.jpg'):
+            with self.assertRaises(Http404, msg=path):
+                media.serve_media(RequestFactory().get('/media/x'), path)
+        self.assertEqual(self.client.get('/media/%2e%2e/secret.txt').status_code, 404)
+
+
+def png(mode, size=(800, 600), color=None):
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@override_settings(JOBS_EAGER=True)
+class ImageVariantTests(TestCase):
+    """WebP variants: built by the job runner when the image changes, and only then."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(MEDIA_ROOT=tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.data = make_restaurant()
+        self.pizza = self.data["pizza"]
+
+    def upload(self, data, name="pizza.png"):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pizza.image = SimpleUploadedFile(name, data)
+            self.pizza.save()
+        self.pizza.refresh_from_db()
+        return self.pizza.image_variants
+
+    def test_variants_follow_the_image(self):
+        restaurant = self.data["restaurant"]
+        variants = self.upload(png('RGB', color=(200, 40, 40)))
+        self.assertEqual(variants['source'], {'name': self.pizza.image.name, 'size': self.pizza.image.size})
+        for width in images.VARIANT_WIDTHS:
+            with default_storage.open(variants[str(width)]) as f, Image.open(f) as variant:
+                self.assertEqual((variant.format, variant.width), ('WEBP', width))
+        self.assertFalse(BackgroundJob.objects.exists())  # durable row gone once done
+        self.assertEqual(set(images.variant_urls(self.pizza)), {'160', '320', '640'})
+
+        # Saves that leave the image alone queue nothing
+        version = Restaurant.objects.get(id=restaurant.id).menu_version
+        with mock.patch.object(images.build_variants, 'defer') as defer, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.pizza.price = Decimal('259.00')
+            self.pizza.save()
+        defer.assert_not_called()
+
+        # A new photo replaces them; removing it clears them
+        self.assertNotEqual(self.upload(png('RGB', color=(40, 200, 40)), "pizza-v2.png"), variants)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pizza.image = None
+            self.pizza.save()
+        self.pizza.refresh_from_db()
+        self.assertEqual(self.pizza.image_variants, {})
+        self.assertGreater(Restaurant.objects.get(id=restaurant.id).menu_version, version + 1)
+
+    def test_same_photo_same_files(self):
+        photo = png('RGB', color=(10, 20, 30))
+        first = self.upload(photo)
+        second = self.upload(photo)  # stored under a new name, so rebuilt...
+        self.assertNotEqual(first['source'], second['source'])
+        self.assertEqual({k: v for k, v in first.items() if k != 'source'},  # ...into the same files
+                         {k: v for k, v in second.items() if k != 'source'})
+
+    def test_alpha_is_kept(self):
+        for mode, color in (('LA', (128, 0)), ('RGBA', (255, 0, 0, 0)), ('L', 128)):
+            rendered = images.render_variants(io.BytesIO(png(mode, color=color)))
+            with Image.open(io.BytesIO(rendered[160])) as variant:
+                self.assertEqual(variant.mode, 'RGB' if mode == 'L' else 'RGBA', mode)
+                self.assertEqual(variant.size, (160, 120))
+
+
+class BinaryFormatTests(SimpleTestCase):
+    """MessagePack / CBOR renderers and parsers: native UUID, Decimal and datetime values survive the trip."""
+
+    def setUp(self):
+        self.payload = {
+            "id": uuid.UUID("0f8fad5b-d9cb-469f-a165-70867728950e"),
+            "prices": [Decimal("249.00"), Decimal("-80.5"), Decimal("1E+3"), Decimal("0")],
+            "placed_at": datetime(2026, 10, 19, 9, 30, 15, 250000, tzinfo=dt_timezone.utc),
+            "day": date(2026, 10, 19),
+            "items": [{"name": "Paneer Tikka Pizza 🍕", "quantity": 2, "note": None}],
+        }
+
+    def round_trip(self, renderer, parser, data):
+        return parser.parse(io.BytesIO(renderer.render(data)))
+
+    def test_msgpack(self):
+        parsed = self.round_trip(MessagePackRenderer(), MessagePackParser(), self.payload)
+        self.assertEqual(parsed["id"], self.payload["id"])
+        self.assertEqual(parsed["prices"], self.payload["prices"])
+        self.assertEqual([str(price) for price in parsed["prices"]], ["249.00", "-80.5", "1E+3", "0"])
+        self.assertEqual(parsed["items"], self.payload["items"])
+        # Dates have no ext type: the same text as the JSON renderer
+        dates = {k: self.payload[k] for k in ("placed_at", "day")}
+        self.assertEqual({k: parsed[k] for k in dates}, json.loads(JSONRenderer().render(dates)))
+        self.assertEqual(parsed["placed_at"], "2026-10-19T09:30:15.250000Z")
+
+        # On the wire: ext 37 = raw UUID bytes, ext 4 = [exponent, mantissa]
+        raw = msgpack.unpackb(MessagePackRenderer().render(self.payload))
+        self.assertEqual(raw["id"], msgpack.ExtType(37, self.payload["id"].bytes))
+        self.assertEqual(raw["prices"][1], msgpack.ExtType(4, msgpack.packb([-1, -805])))
+
+        nan = self.round_trip(MessagePackRenderer(), MessagePackParser(), {"v": Decimal("NaN")})["v"]
+        self.assertNotEqual(nan, nan)
+        self.assertEqual(MessagePackRenderer().render(None), b'')
+
+    def test_cbor(self):
+        self.assertEqual(self.round_trip(CBORRenderer(), CBORParser(), self.payload), self.payload)
+        encoded = CBORRenderer().render(self.payload)
+        self.assertIn(cbor2.dumps(cbor2.CBORTag(37, self.payload["id"].bytes)), encoded)
+        self.assertIn(cbor2.dumps(cbor2.CBORTag(4, [-1, -805])), encoded)  # -80.5 as a decimal fraction
+
+        # Naive datetimes are in the current time zone, like everywhere else in Django
+        with timezone.override(ZoneInfo("Asia/Kolkata")):
+            parsed = self.round_trip(CBORRenderer(), CBORParser(), {"v": datetime(2026, 10, 19, 15, 0)})
+        self.assertEqual(parsed["v"], datetime(2026, 10, 19, 9, 30, tzinfo=dt_timezone.utc))
+
+    def test_bad_bodies(self):
+        for parser in (MessagePackParser(), CBORParser()):
+            with self.assertRaises(ParseError, msg=parser.media_type):
+                parser.parse(io.BytesIO(b'\xc1\xff'))
+
+
+class UJSONRendererParityTests(SimpleTestCase):
+    """UJSONRenderer writes the same bytes as DRF's JSONRenderer."""
+
+    payload = {
+        "id": uuid.UUID("0f8fad5b-d9cb-469f-a165-70867728950e"),
+        "total_amount": Decimal("249.00"), "long": Decimal("12345678901234567890.125"),
+        "created_at": datetime(2026, 10, 19, 9, 30, 15, 250000, tzinfo=dt_timezone.utc),
+        "day": date(2026, 10, 19), "at": time(9, 30), "prep": timedelta(minutes=12),
+        "status": gettext_lazy("Pending"),
+        "image": "/media/menu_images/variants/0123456789abcdef.webp",
+        "names": ["Paneer Tikka Pizza 🍕", "Crème brûlée", "tab\there \"quoted\" \\", "line\u2028sep\u2029"],
+        "table_ids": {3}, "pair": (1, 2), "big": 2 ** 70, "ratio": 0.1, "flags": [True, False, None],
+        "nested": {"items": [{"options": []}], "empty": {}},
+    }
+
+    def test_same_bytes(self):
+        self.assertEqual(UJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+        self.assertEqual(UJSONRenderer().render(None), b'')
+        self.assertEqual(UJSONRenderer().render([]), b'[]')
+
+        # Exponent notation is spelled differently ("1e-7" vs "1e-07"): same number
+        tiny = {"v": 1e-7}
+        self.assertEqual(json.loads(UJSONRenderer().render(tiny)), json.loads(JSONRenderer().render(tiny)))
+
+    def test_fallback_path(self):
+        with mock.patch.object(UJSONRenderer, '_fallback', wraps=UJSONRenderer._fallback) as fallback:
+            UJSONRenderer().render({k: self.payload[k] for k in ("id", "total_amount", "created_at", "names")})
+        # Only what ujson can't encode itself (it writes Decimals as floats, like DRF)
+        self.assertEqual([call.args[0] for call in fallback.call_args_list],
+                         [self.payload["id"], self.payload["created_at"]])
+
+        for renderer in (UJSONRenderer(), JSONRenderer()):
+            with self.assertRaises(TypeError):
+                renderer.render({"v": object()})
+            with self.assertRaises((ValueError, OverflowError)):  # STRICT_JSON: no NaN / Infinity
+                renderer.render({"v": float("nan")})
+
+    def test_indented_and_non_compact(self):
+        for media_type, context in (("application/json; indent=4", None), (None, {"indent": 2})):
+            self.assertEqual(UJSONRenderer().render(self.payload, media_type, context),
+                             JSONRenderer().render(self.payload, media_type, context))
+        with mock.patch.object(UJSONRenderer, 'compact', False), mock.patch.object(JSONRenderer, 'compact', False):
+            self.assertEqual(UJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+        with mock.patch.object(UJSONRenderer, 'ensure_ascii', True), \
+                mock.patch.object(JSONRenderer, 'ensure_ascii', True):
+            self.assertEqual(UJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+
+class InventoryIngredientPageTests(TestCase):
+    """Inventory editor ingredient list: keyset pages on (name, id) and ?q= prefix search."""
+
+    def setUp(self):
+        self.data = make_restaurant()  # Cheese, Dough
+        restaurant = self.data["restaurant"]
+        for name in ("Basil", "Basil", "Chili", "chives", "Cherry Tomato", "Onion", "Tomato"):
+            Ingredient.objects.create(restaurant=restaurant, name=name, unit="g")
+        other = Restaurant.objects.create(name="Elsewhere")
+        Ingredient.objects.create(restaurant=other, name="Cheddar", unit="g")
+        self.url = f'/api/inventory/ingredients/{restaurant.id}/'
+        self.ordered = list(Ingredient.objects.filter(restaurant=restaurant).order_by('name', 'id')
+                            .values_list('name', 'id'))
+
+    def pages(self, **params):
+        pages, cursor = [], None
+        while True:
+            body = self.client.get(self.url, dict(params, **({"cursor": cursor} if cursor else {}))).json()
+            rows = [(row["name"], row["id"]) for row in body["results"]]
+            pages.append(rows)
+            cursor = body["next"]
+            if cursor is None:
+                return pages
+            self.assertEqual(pagination.decode_cursor(cursor), list(rows[-1]))  # the last row's sort key
+
+    def test_pages(self):
+        pages = self.pages(limit=3)
+        self.assertEqual([len(page) for page in pages], [3, 3, 3])  # a full last page: no empty one after it
+        self.assertEqual([row for page in pages for row in page], self.ordered)
+        (first, first_id), (second, second_id) = pages[0][:2]
+        self.assertEqual((first, second), ("Basil", "Basil"))
+        self.assertLess(first_id, second_id)  # id breaks the tie
+
+        self.assertEqual([len(page) for page in self.pages(limit=4)], [4, 4, 1])
+        self.assertEqual(self.pages(limit=500), [self.ordered])
+        self.assertEqual(len(self.client.get(self.url, {"limit": 0}).json()["results"]), 1)
+
+    def test_prefix_search(self):
+        pages = self.pages(q="ch", limit=2)  # case-insensitive, this restaurant only
+        self.assertEqual([name for page in pages for name, _ in page], ["Cheese", "Cherry Tomato", "Chili", "chives"])
+        self.assertEqual(self.pages(q="  TOM "), [[("Tomato", Ingredient.objects.get(name="Tomato").id)]])
+        self.assertEqual(self.pages(q="zz"), [[]])
+
+    def test_index(self):
+        cursor = pagination.encode_cursor(list(self.ordered[1]))
+        for params in ({"limit": 3}, {"q": "ch", "cursor": cursor}):
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(self.url, params)
+            sql = next(query["sql"] for query in captured if 'FROM "restaurant_ingredient"' in query["sql"])
+            with connection.cursor() as c:
+                c.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = " ".join(row[-1] for row in c.fetchall())
+            self.assertIn("ingredient_rest_name_idx", plan)
+            self.assertNotIn("TEMP B-TREE", plan)  # rows come out in page order, no sort
+
+    def test_bad_cursor(self):
+        for values in (None, ["Basil"], ["Basil", "not an id"]):
+            cursor = "garbage" if values is None else pagination.encode_cursor(values)
+            response = self.client.get(self.url, {"cursor": cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"error": "Invalid cursor"})
+
+
+# Jobs for JobRunnerTests (registered by name, like the real ones)
+JOB_LOG = []
+_job_attempts = {}
+_job_started, _job_release = threading.Event(), threading.Event()
+
+
+@jobs.job()
+def record_job(label):
+    JOB_LOG.append(label)
+
+
+@jobs.job()
+def blocking_job():
+    _job_started.set()
+    _job_release.wait(5)
+
+
+@jobs.job(durable=True, max_retries=3)
+def flaky_job(label, failures):
+    _job_attempts[label] = attempt = _job_attempts.get(label, 0) + 1
+    if attempt <= failures:
+        raise RuntimeError(f"attempt {attempt}")
+    JOB_LOG.append(label)
+
+
+@override_settings(JOB_WORKERS=1, JOB_QUEUE_SIZE=10)
+class JobRunnerTests(TransactionTestCase):
+    """JobRunner with a real worker thread (everything else runs jobs eagerly)."""
+
+    def setUp(self):
+        JOB_LOG.clear()
+        _job_attempts.clear()
+        _job_started.clear()
+        _job_release.clear()
+        self.runner = jobs.JobRunner()
+        self.addCleanup(self.runner.cancel_retries)
+        self.addCleanup(_job_release.set)
+        delay = mock.patch.object(jobs, 'RETRY_DELAY', 0.05)
+        delay.start()
+        self.addCleanup(delay.stop)
+
+    def hold_worker(self):
+        """Keeps the only worker busy, so what's deferred next waits in the queue."""
+        self.runner.defer(blocking_job)
+        self.assertTrue(_job_started.wait(5))
+
+    def finish(self):
+        _job_release.set()
+        self.assertTrue(self.runner.drain(5))
+
+    def test_retries_with_backoff(self):
+        start = monotonic()
+        with self.assertLogs('restaurant.jobs', 'WARNING') as logs:
+            self.runner.defer(flaky_job, "x", 2)
+            self.assertTrue(self.runner.drain(5))  # waits through both retries' backoff
+        self.assertGreaterEqual(monotonic() - start, 0.05 + 0.1)
+        self.assertEqual((JOB_LOG, _job_attempts["x"]), (["x"], 3))
+        self.assertEqual(len(logs.records), 2)
+        self.assertFalse(BackgroundJob.objects.exists())
+
+        with self.assertLogs('restaurant.jobs', 'WARNING'):
+            self.runner.defer(flaky_job, "y", 5)
+            self.assertTrue(self.runner.drain(5))
+        failed = BackgroundJob.objects.get()
+        self.assertEqual((failed.status, failed.attempts, failed.last_error), ('FAILED', 3, "attempt 3"))
+
+    def test_drain_counts_pending_retries(self):
+        with mock.patch.object(jobs, 'RETRY_DELAY', 60), self.assertLogs('restaurant.jobs', 'WARNING'):
+            self.runner.defer(flaky_job, "z", 1)
+            self.assertFalse(self.runner.drain(0.5))  # first attempt done, retry still waiting
+        self.assertEqual(self.runner.cancel_retries(), 1)
+        self.assertTrue(self.runner.drain(1))
+        self.assertEqual(JOB_LOG, [])
+        row = BackgroundJob.objects.get()  # left for the next recovery
+        self.assertEqual((row.status, row.attempts), ('PENDING', 1))
+
+    def test_priority_order(self):
+        self.hold_worker()
+        for label, priority in (("low", jobs.LOW), ("normal", None), ("high", jobs.HIGH), ("normal 2", None)):
+            self.runner.defer(record_job, label, priority=priority)
+        self.finish()
+        self.assertEqual(JOB_LOG, ["high", "normal", "normal 2", "low"])  # first in, first out within a level
+
+    def test_coalescing(self):
+        self.hold_worker()
+        for label in ("a", "a", "b", "a"):
+            self.runner.defer(record_job, label)
+        # blocking_job is running, no longer waiting: deferring it again queues a fresh run
+        self.runner.defer(blocking_job)
+        self.assertEqual(self.runner._queue.qsize(), 3)
+        self.finish()
+        self.assertEqual(JOB_LOG, ["a", "b"])
+
+        self.runner.defer(record_job, "a")  # done, so it runs again
+        self.assertTrue(self.runner.drain(5))
+        self.assertEqual(JOB_LOG, ["a", "b", "a"])
+
+    @override_settings(JOB_QUEUE_SIZE=2)
+    def test_bounded_queue(self):
+        self.hold_worker()
+        self.runner.defer(record_job, "a")
+        self.runner.defer(record_job, "b")
+        with self.assertLogs('restaurant.jobs', 'WARNING') as logs:
+            self.runner.defer(record_job, "dropped")
+            self.runner.defer(flaky_job, "kept", 0)
+        self.assertIn("dropping", logs.output[0])
+        self.assertIn("stays in the database", logs.output[1])
+        self.finish()
+        self.assertEqual(JOB_LOG, ["a", "b"])
+
+        self.assertEqual(self.runner.recover(), 1)  # the durable one wasn't lost
+        self.assertTrue(self.runner.drain(5))
+        self.assertEqual(JOB_LOG, ["a", "b", "kept"])
+        self.assertFalse(BackgroundJob.objects.exists())
+
+    def test_recover(self):
+        self.hold_worker()  # start() has already recovered (nothing); these are left over from "before"
+        BackgroundJob.objects.create(name=record_job.job_name, args=["late"], priority=jobs.LOW)
+        BackgroundJob.objects.create(name=record_job.job_name, args=["early"], priority=jobs.HIGH)
+        BackgroundJob.objects.create(name=record_job.job_name, args=["failed"], status='FAILED')
+        gone = BackgroundJob.objects.create(name="restaurant.tests.removed_job", args=[])
+        self.assertEqual(self.runner.recover(), 3)
+        self.assertEqual(self.runner.recover(), 0)  # already queued in this process
+        with self.assertLogs('restaurant.jobs', 'ERROR'):
+            self.finish()
+        self.assertEqual(JOB_LOG, ["early", "late"])
+        gone.refresh_from_db()
+        self.assertEqual((gone.status, gone.last_error), ('FAILED', "Unknown job restaurant.tests.removed_job"))
+        self.assertEqual(list(BackgroundJob.objects.exclude(id=gone.id).values_list('args', 'status')),
+                         [(["failed"], 'FAILED')])
+
+
+def decode(body, encoding):
+    return brotli.decompress(body) if encoding == 'br' else gzip.decompress(body)
+
+
+class CompressionMiddlewareTests(TestCase):
+    """br/gzip negotiation, size cutoff, precompressed snapshots and streamed responses."""
+
+    body = json.dumps([{"id": i, "status": "PENDING", "table": f"T{i % 12}"} for i in range(200)]).encode()
+
+    def respond(self, response, accept_encoding=None):
+        headers = {} if accept_encoding is None else {"Accept-Encoding": accept_encoding}
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(RequestFactory().get('/api/x', headers=headers))
+
+    def json_response(self, body=None, **headers):
+        return HttpResponse(self.body if body is None else body, content_type='application/json', headers=headers)
+
+    def test_negotiation(self):
+        for header, expected in (
+            ("br, gzip", "br"), ("gzip, deflate", "gzip"), ("gzip;q=0.5, br;q=0.4", "gzip"), ("BR", "br"),
+            ("br;q=0, gzip", "gzip"), ("*", "br"), ("*;q=0.5, br;q=0", "gzip"), ("*;q=0", None),
+            ("gzip;q=0", None), ("gzip;q=nonsense", None), ("identity", None), ("", None), (None, None),
+        ):
+            response = self.respond(self.json_response(), header)
+            self.assertEqual(response.get('Content-Encoding'), expected, header)
+            self.assertIn('Accept-Encoding', response['Vary'])
+            if expected is None:
+                self.assertEqual(response.content, self.body, header)
+            else:
+                self.assertEqual(decode(response.content, expected), self.body, header)
+                self.assertEqual(response['Content-Length'], str(len(response.content)))
+
+    def test_left_alone(self):
+        with override_settings(COMPRESSION_MIN_SIZE=len(self.body) + 1):
+            small = self.respond(self.json_response(), "br, gzip")
+        self.assertEqual((small.content, small.has_header('Content-Encoding')), (self.body, False))
+
+        for response in (
+            self.json_response(**{"Content-Encoding": "gzip"}),  # already encoded
+            HttpResponse(self.body, content_type='image/png'),  # not worth it
+            HttpResponse(self.body, content_type='application/json', status=404),
+            self.json_response(os.urandom(4096)),  # would only grow
+        ):
+            content, encoding = response.content, response.get('Content-Encoding')
+            response = self.respond(response, "br, gzip")
+            self.assertEqual((response.content, response.get('Content-Encoding')), (content, encoding))
+
+    def test_etag_turns_weak(self):
+        for etag, accept_encoding, expected in (('"v1"', "gzip", 'W/"v1"'), ('W/"v1"', "br", 'W/"v1"'),
+                                                ('"v1"', "identity", '"v1"')):
+            response = self.respond(self.json_response(ETag=etag), accept_encoding)
+            self.assertEqual(response['ETag'], expected)
+
+    def test_precompressed(self):
+        response = self.json_response()
+        response.precompressed = {"br": b"stored br bytes"}
+        self.assertEqual(self.respond(response, "br").content, b"stored br bytes")  # served, not recompressed
+        response = self.json_response()
+        response.precompressed = {"br": b"stored br bytes"}
+        self.assertEqual(decode(self.respond(response, "gzip").content, "gzip"), self.body)  # none stored
+
+        # The menu endpoint hands over the snapshot's bytes compressed once at build time
+        data = make_restaurant()
+        url = f'/api/menu/{data["restaurant"].id}/'
+        plain = self.client.get(url)
+        snapshot = menu_snapshot.get_snapshot(data["restaurant"].id)
+        self.assertLess(len(plain.content), 1024)  # the test menu is small
+        for encoding in ("br", "gzip"):
+            with override_settings(COMPRESSION_MIN_SIZE=256):
+                response = Client().get(url, headers={"Accept-Encoding": encoding})
+            self.assertEqual(response.content, snapshot.encoded[encoding])
+            self.assertEqual(decode(response.content, encoding), plain.content)
+
+    def test_streaming(self):
+        chunks = [self.body[i:i + 1000] for i in range(0, len(self.body), 1000)]
+        for encoding in ("br", "gzip"):
+            response = self.respond(StreamingHttpResponse(iter(chunks), content_type='application/x-ndjson'),
+                                    encoding)
+            self.assertEqual(response['Content-Encoding'], encoding)
+            self.assertFalse(response.has_header('Content-Length'))
+            parts = list(response.streaming_content)
+            self.assertEqual(decode(b"".join(parts), encoding), self.body)
+            # Flushed per chunk: the first part decodes to the first chunk on its own
+            first = brotli.Decompressor().process(parts[0]) if encoding == 'br' else \
+                zlib.decompressobj(31).decompress(parts[0])
+            self.assertEqual(first, chunks[0])
+
+    def test_async_streaming(self):
+        chunks = [self.body[i:i + 1000] for i in range(0, len(self.body), 1000)]
+
+        async def rows():
+            for chunk in chunks:
+                yield chunk
+
+        async def get_response(request):
+            return StreamingHttpResponse(rows(), content_type='application/x-ndjson')
+
+        async def fetch(encoding):
+            middleware = CompressionMiddleware(get_response)
+            response = await middleware(RequestFactory().get('/api/x', headers={"Accept-Encoding": encoding}))
+            self.assertTrue(response.is_async)
+            return response, [part async for part in response.streaming_content]
+
+        for encoding in ("br", "gzip"):
+            response, parts = async_to_sync(fetch)(encoding)
+            self.assertEqual(response['Content-Encoding'], encoding)
+            self.assertEqual(decode(b"".join(parts), encoding), self.body)
+            self.assertGreater(len(parts), 1)
+
+
+class InventoryCategoryTests(TestCase):
+    """Inventory editor category index and per-category items: id keyset pages and ETags."""
+
+    def setUp(self):
+        self.data = make_restaurant()
+        restaurant, pizza = self.data["restaurant"], self.data["category"]
+        for name in ("Drinks", "Desserts", "Sides"):
+            Category.objects.create(restaurant=restaurant, name=name)
+        for i in range(4):
+            MenuItem.objects.create(restaurant=restaurant, category=pizza, name=f"Pizza {i}", price=Decimal('199'))
+        other = make_restaurant()
+        self.other_category = other["category"]
+        self.categories = f'/api/inventory/categories/{restaurant.id}/'
+        self.items = f'/api/inventory/categories/{restaurant.id}/{pizza.id}/items/'
+
+    def pages(self, url, limit):
+        pages, cursor = [], None
+        while True:
+            body = self.client.get(url, {"limit": limit, **({"cursor": cursor} if cursor else {})}).json()
+            self.assertLessEqual(len(body["results"]), limit)
+            pages.append(body["results"])
+            cursor = body["next"]
+            if cursor is None:
+                return pages
+            self.assertEqual(pagination.decode_cursor(cursor), [body["results"][-1]["id"]])
+
+    def test_categories(self):
+        everything = self.client.get(self.categories).json()  # not paging: the bare list
+        self.assertEqual([(row["name"], row["item_count"]) for row in everything],
+                         [("Pizza", 5), ("Drinks", 0), ("Desserts", 0), ("Sides", 0)])
+        pages = self.pages(self.categories, 3)
+        self.assertEqual([len(page) for page in pages], [3, 1])
+        self.assertEqual([row for page in pages for row in page], everything)
+        self.assertEqual(self.pages(self.categories, 4), [everything])  # a full last page, nothing after it
+
+    def test_category_items(self):
+        everything = self.client.get(self.items).json()
+        self.assertEqual(len(everything), 5)
+        self.assertEqual(everything[0]["variant_groups"][0]["options"][1]["recipes"][0]["ingredient_name"], "Cheese")
+        pages = self.pages(self.items, 2)
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual([row for page in pages for row in page], everything)
+        # Another restaurant's category is empty here
+        other = self.items.replace(f'/{self.data["category"].id}/', f'/{self.other_category.id}/')
+        self.assertEqual(self.client.get(other).json(), [])
+
+    def test_etags(self):
+        for url, params in ((self.categories, {}), (self.categories, {"limit": 2}), (self.items, {"limit": 2})):
+            first = self.client.get(url, params)
+            etag = first["ETag"]
+            cached = self.client.get(url, params, headers={"If-None-Match": etag})
+            self.assertEqual((cached.status_code, cached["ETag"], cached.content), (304, etag, b''))
+            self.assertEqual(self.client.get(url, params, headers={"If-None-Match": '"stale"'}).status_code, 200)
+
+        etag = self.client.get(self.items)["ETag"]
+        MenuItem.objects.filter(name="Pizza 0").update(name="Pizza Zero")
+        changed = self.client.get(self.items, headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+    def test_bad_cursor(self):
+        for url in (self.categories, self.items):
+            for cursor in ("garbage", pagination.encode_cursor(["not an id"]), pagination.encode_cursor([1, 2])):
+                response = self.client.get(url, {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"error": "Invalid cursor"})
@@ -1,29 +1,41 @@
 from django.urls import path
-from . import views
+from . import views, async_views, exports
 
 urlpatterns = [
     # --- APP APIs (Android) ---
-    path('menu/<uuid:restaurant_id>/', views.get_restaurant_menu),
-    path('tables/<uuid:restaurant_id>/', views.get_tables),
+    path('menu/<uuid:restaurant_id>/', async_views.get_restaurant_menu),
+    path('tables/<uuid:restaurant_id>/', async_views.get_tables),
     path('waiter/login/', views.waiter_login),
-    path('orders/create/', views.create_order),
-    path('orders/active/<uuid:restaurant_id>/', views.get_active_orders), # New "Active Orders" API
+    path('orders/create/', async_views.create_order),
+    path('orders/active/<uuid:restaurant_id>/', async_views.get_active_orders), # New "Active Orders" API
+    path('customers/<uuid:restaurant_id>/', views.get_customer), # Returning guest by ?phone=
 
     # --- KITCHEN API ---
-    path('kitchen/orders/', views.get_kitchen_orders),
+    path('kitchen/orders/', async_views.get_kitchen_orders),
     path('orders/<int:order_id>/complete/', views.complete_order),
 
     # --- CASHIER API ---
-    path('bill/<int:table_id>/', views.get_table_bill),
+    path('bill/<int:table_id>/', async_views.get_table_bill),
     path('settle/<int:table_id>/', views.settle_table),
     path('reservations/create/', views.make_reservation), # New Reservations API
 
     # --- INVENTORY API ---
     path('inventory/data/<uuid:restaurant_id>/', views.get_inventory_data),
+    path('inventory/categories/<uuid:restaurant_id>/', views.get_inventory_categories),
+    path('inventory/categories/<uuid:restaurant_id>/<int:category_id>/items/', views.get_inventory_category_items),
+    path('inventory/ingredients/<uuid:restaurant_id>/', views.get_inventory_ingredients),
     path('inventory/save/', views.save_recipe_connection),
     path('inventory/ingredient/add/', views.add_ingredient),
     path('inventory/update-cost/', views.update_ingredient_cost), # New Costing API
+    path('inventory/import/<uuid:restaurant_id>/', views.import_stocktake),
+    path('menu/<uuid:restaurant_id>/export/', views.export_menu),  # Whole menu tree (staff)
+    path('menu/<uuid:restaurant_id>/import/', views.import_menu),
 
     # --- ANALYTICS DATA API (FIXED) ---
     path('analytics/data/<uuid:restaurant_id>/', views.get_analytics_data),
+    path('analytics/range/<uuid:restaurant_id>/', views.get_sales_report),
+    path('analytics/chain/', views.get_chain_dashboard), # Every restaurant of the logged-in owner
+
+    # --- ACCOUNTING EXPORT (streamed CSV / NDJSON, staff only) ---
+    path('export/sales/<uuid:restaurant_id>/', exports.export_sales),
 ]
\ No newline at end of file
@@ -1,137 +1,154 @@
 from datetime import timedelta, timezone
 from django.shortcuts import render, get_object_or_404
-from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, parser_classes, permission_classes, renderer_classes
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.db import transaction
 from decimal import Decimal
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Sum
+from django.db.models import F, Sum, Count
+from rest_framework.renderers import JSONRenderer
+import hashlib
+from functools import partial
 from django.utils import timezone
 import datetime
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 
 from .models import Reservation, Restaurant, Category, MenuItem, Table, Order, OrderItem, Waiter
 from .models import VariantGroup, VariantOption, Ingredient, Recipe
 from .serializers import IngredientSerializer, RestaurantSerializer, CategorySerializer, KitchenOrderSerializer, TableSerializer, OrderSerializer
+from .serializers import InventoryMenuItemSerializer
+from .pagination import encode_cursor, keyset_filter, page_params, parse_limit
+from .renderers import UJSONRenderer, MessagePackRenderer, CBORRenderer
+from .changes import changes, notify_change
+from .compression import etag_matches
+from .db_router import use_read_database
+from .notifications import notify_kitchen
+from . import analytics, chain, customers, fastpath, menu_snapshot, menu_tree, pricing, stocktake, tasks
+
+# Hot polling endpoints skip the browsable API and encode JSON with ujson
+FAST_RENDERERS = [UJSONRenderer, MessagePackRenderer, CBORRenderer]
+
+# Order listings (here and in async_views.py): keyset pages on these sort
+# keys with ?limit=&cursor= ({"results", "next"}), or the old bare list for
+# clients that don't page (all of it, as before paging). ?fields= projects.
+ACTIVE_ORDERS_ORDERING = ('-created_at', '-id')
+KITCHEN_ORDERING = ('created_at', 'id')
+
+
+def listing_params(params, ordering, allowed_fields):
+    """(fields, cursor, limit, paged) of an order listing request. ValueError on bad input."""
+    fields = fastpath.parse_fields(params.get('fields'), allowed_fields)
+    cursor, limit, paged = page_params(params, Order, ordering, None)
+    return fields, cursor, limit, paged
+
+
+def listing_body(rows, next_cursor, paged):
+    return {"results": rows, "next": next_cursor} if paged else rows
 
 # =========================================
 #  APP APIs (Android)
 # =========================================
 
+def _versioned_response(request, restaurant_id, build):
+    # If-None-Match on the restaurant's change and menu versions (changes.py);
+    # the async versions of these views can also long-poll with ?wait=N
+    version = changes.current(restaurant_id)
+    menu_version = menu_snapshot.current_version(restaurant_id)
+    headers = {'ETag': changes.etag(restaurant_id, version, menu_version, request.accepted_renderer.format),
+               'Cache-Control': 'no-cache'}
+    if etag_matches(request, headers['ETag']):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(build(), headers=headers)
+
+@transaction.atomic
+def place_order(data):
+    """
+    Creates the order, its lines and the stock movements in one transaction
+    and queues the kitchen notification for after the commit. Raises on any
+    problem. Shared by the sync view below and the async one in async_views.py.
+    """
+    restaurant_id = data.get('restaurant_id')
+    table_id = data.get('table_id')
+    waiter_id = data.get('waiter_id')
+    items_data = data.get('items')
+    
+    # NEW: Extract Customer Details
+    c_name = data.get('customer_name', 'Guest')
+    c_phone = data.get('customer_phone', '')
+
+    restaurant = get_object_or_404(Restaurant, id=restaurant_id)
+    table = get_object_or_404(Table, id=table_id)
+    waiter = Waiter.objects.filter(id=waiter_id).first() if waiter_id else None
+
+    # Validated and priced against the compiled menu (pricing.py): no queries
+    plan = pricing.menu_plan(restaurant)
+    lines = pricing.price_order(plan, items_data)
+    total_bill = sum((line.line_total for line in lines), Decimal('0.00'))
+
+    # Returning guests: profile totals move with the order (customers.py)
+    customer = customers.record_order(restaurant.id, c_name, c_phone, total_bill, lines)
+
+    order = Order.objects.create(
+        restaurant=restaurant,
+        table=table,
+        waiter=waiter,
+        status='PENDING',
+        customer_name=c_name,   # Save Name
+        customer_phone=c_phone, # Save Phone
+        customer=customer,
+        total_amount=total_bill
+    )
+
+    # --- INVENTORY LOGIC ---
+    # One conditional UPDATE per ingredient for the whole order (in id order,
+    # so concurrent orders lock rows the same way round)
+    needed = pricing.stock_needed(lines)
+    for ingredient_id in sorted(needed):
+        required_amount = needed[ingredient_id]
+        deducted = Ingredient.objects.filter(id=ingredient_id, current_stock__gte=required_amount).update(
+            current_stock=F('current_stock') - required_amount)
+        if not deducted:
+            have = Ingredient.objects.filter(id=ingredient_id).values_list('current_stock', flat=True).first()
+            raise Exception(f"Out of Stock: {plan.ingredient_names[ingredient_id]}. Need {required_amount}, have {have}")
+    # -----------------------
+
+    order_items = OrderItem.objects.bulk_create([
+        OrderItem(order=order, menu_item_id=line.item.id, quantity=line.quantity, price_at_time_of_order=line.unit_price)
+        for line in lines
+    ])
+    OrderItem.selected_options.through.objects.bulk_create([
+        OrderItem.selected_options.through(orderitem_id=order_item.id, variantoption_id=option_id)
+        for order_item, line in zip(order_items, lines) for option_id in line.option_ids
+    ])
+    kitchen_lines = [f"{int(Decimal(line.quantity))} x {line.item.name}" for line in lines]
+
+    table.is_occupied = True
+    table.save()
+
+    notify_kitchen({
+        "type": "order_notification",
+        "restaurant": str(restaurant.id),
+        "order": {
+            "id": order.id,
+            "table": table.name,
+            "items": kitchen_lines,
+            "total": str(order.total_amount)
+        }
+    })
+    # Non-critical follow-ups run after the commit, off the request path
+    tasks.check_low_stock.defer(str(restaurant.id))
+    return order
+
+
 @api_view(['POST'])
 @csrf_exempt
 @authentication_classes([]) 
 @permission_classes([])
-@transaction.atomic
 def create_order(request):
-    data = request.data
     try:
-        restaurant_id = data.get('restaurant_id')
-        table_id = data.get('table_id')
-        waiter_id = data.get('waiter_id')
-        items_data = data.get('items')
-        
-        # NEW: Extract Customer Details
-        c_name = data.get('customer_name', 'Guest')
-        c_phone = data.get('customer_phone', '')
-
-        restaurant = get_object_or_404(Restaurant, id=restaurant_id)
-        table = get_object_or_404(Table, id=table_id)
-        waiter = Waiter.objects.filter(id=waiter_id).first() if waiter_id else None
-
-        order = Order.objects.create(
-            restaurant=restaurant,
-            table=table,
-            waiter=waiter,
-            status='PENDING',
-            customer_name=c_name,   # Save Name
-            customer_phone=c_phone  # Save Phone
-        )
-
-        total_bill = Decimal('0.00')
-
-        for item in items_data:
-            menu_item = get_object_or_404(MenuItem, id=item['id'])
-            qty = Decimal(item['qty'])
-            input_option_ids = set(item.get('selected_options', []))
-            
-            # --- INVENTORY LOGIC ---
-            recipes_to_process = []
-            recipes_to_process.extend(menu_item.recipes.all()) # Base Recipes
-            
-            if input_option_ids:
-                selected_variants = VariantOption.objects.filter(id__in=input_option_ids).prefetch_related('recipes')
-                for variant in selected_variants:
-                    recipes_to_process.extend(variant.recipes.all()) # Variant Recipes
-
-            for recipe in recipes_to_process:
-                ingredient = recipe.ingredient
-                required_amount = recipe.quantity_required * qty
-                
-                if ingredient.current_stock < required_amount:
-                    raise Exception(f"Out of Stock: {ingredient.name}. Need {required_amount}, have {ingredient.current_stock}")
-                
-                ingredient.current_stock -= required_amount
-                ingredient.save()
-            # -----------------------
-
-            # Validate Groups
-            valid_groups = menu_item.variant_groups.prefetch_related('options').all()
-            for group in valid_groups:
-                group_option_ids = {opt.id for opt in group.options.all()}
-                selected_in_group = input_option_ids.intersection(group_option_ids)
-                if group.is_required and not selected_in_group:
-                    raise Exception(f"Selection required for '{group.name}'")
-                if not group.allow_multiple and len(selected_in_group) > 1:
-                    raise Exception(f"Only one selection allowed for '{group.name}'")
-
-            # Calculate Price
-            price = menu_item.price
-            options_to_add = []
-            if input_option_ids:
-                options_to_add = VariantOption.objects.filter(id__in=input_option_ids)
-                for opt in options_to_add:
-                    price += opt.price_adjustment
-
-            order_item = OrderItem.objects.create(
-                order=order,
-                menu_item=menu_item,
-                quantity=item['qty'],
-                price_at_time_of_order=price
-            )
-            
-            if options_to_add:
-                order_item.selected_options.set(options_to_add)
-
-            total_bill += (price * qty)
-
-        order.total_amount = total_bill
-        order.save()
-        
-        table.is_occupied = True
-        table.save()
-
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            "kitchen_group",
-            {
-                "type": "order_notification",
-                "order": {
-                    "id": order.id,
-                    "table": order.table.name,
-                    "items": [
-                        f"{item.quantity} x {item.menu_item.name}"
-                        for item in order.items.all()
-                    ],
-                    "total": str(order.total_amount)
-                }
-            }
-        )
-
-        return Response({"message": "success", "order_id": order.id}, status=status.HTTP_201_CREATED)
-
+        order = place_order(request.data)
     except Exception as e:
         # ADD THIS LINE TO SEE THE ERROR IN YOUR TERMINAL
         print(f"❌ ORDER ERROR: {str(e)}") 
@@ -139,27 +156,31 @@ def create_order(request):
         traceback.print_exc() # Prints the line number of the error
         
         return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({"message": "success", "order_id": order.id}, status=status.HTTP_201_CREATED)
     
 
 @api_view(['GET'])
 @authentication_classes([])
 @permission_classes([]) 
+@use_read_database
 def get_restaurant_menu(request, restaurant_id):
-    try:
-        restaurant = Restaurant.objects.get(id=restaurant_id)
-    except Restaurant.DoesNotExist:
+    # Served from a cached snapshot (with precompressed br/gzip bodies),
+    # rebuilt only when the restaurant's menu_version changes
+    snapshot = menu_snapshot.get_snapshot(restaurant_id)
+    if snapshot is None:
         return Response({"error": "Restaurant not found"}, status=404)
-    categories = Category.objects.filter(restaurant=restaurant)
-    serializer = CategorySerializer(categories, many=True)
-    return Response(serializer.data)
+    return menu_snapshot.snapshot_response(request, snapshot)
 
 @api_view(['GET'])
+@renderer_classes(FAST_RENDERERS)
 @authentication_classes([])
 @permission_classes([]) 
+@use_read_database
 def get_tables(request, restaurant_id):
     tables = Table.objects.filter(restaurant__id=restaurant_id)
-    serializer = TableSerializer(tables, many=True)
-    return Response(serializer.data)
+    # Same output as TableSerializer, without the serializer overhead
+    return _versioned_response(request, restaurant_id, lambda: fastpath.table_rows(tables))
 
 @api_view(['POST'])
 @csrf_exempt
@@ -179,17 +200,65 @@ def waiter_login(request):
     return Response({"error": "Invalid PIN"}, status=400)
 
 @api_view(['GET'])
+@renderer_classes(FAST_RENDERERS)
 @authentication_classes([])
 @permission_classes([])
+@use_read_database
 def get_active_orders(request, restaurant_id):
+    try:
+        fields, cursor, limit, paged = listing_params(request.query_params, ACTIVE_ORDERS_ORDERING, fastpath.ORDER_FIELDS)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
     # Fetch orders that are NOT completed/paid yet
     orders = Order.objects.filter(
         restaurant__id=restaurant_id, 
         status__in=['PENDING', 'READY']
-    ).order_by('-created_at')
+    )
     
-    serializer = OrderSerializer(orders, many=True)
-    return Response(serializer.data)
+    # Same output as OrderSerializer, built from .values() rows
+    return _versioned_response(request, restaurant_id, lambda: listing_body(
+        *fastpath.order_page(orders, ACTIVE_ORDERS_ORDERING, cursor, limit, fields), paged))
+
+
+CUSTOMER_HISTORY = 20  # orders per page in a guest lookup
+
+
+@api_view(['GET'])
+@renderer_classes(FAST_RENDERERS)
+@authentication_classes([])
+@permission_classes([])
+@use_read_database
+def get_customer(request, restaurant_id):
+    """
+    Returning guest by ?phone= (any spelling of the number): their profile,
+    a page of their orders (newest first; ?limit=, ?cursor= and ?fields= as
+    on the order listings) and their upcoming reservations.
+    """
+    try:
+        fields = fastpath.parse_fields(request.query_params.get('fields'), fastpath.ORDER_FIELDS)
+        cursor, limit, _ = page_params(request.query_params, Order, ACTIVE_ORDERS_ORDERING, CUSTOMER_HISTORY)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    phone = request.query_params.get('phone')
+    if customers.canonical_phone(phone) is None:
+        return Response({"error": "A valid phone number is required"}, status=400)
+
+    customer = customers.lookup(restaurant_id, phone)
+    if customer is None:
+        return Response({"error": "Customer not found"}, status=404)
+
+    rows, next_cursor = fastpath.order_page(customer.orders.all(), ACTIVE_ORDERS_ORDERING, cursor, limit, fields)
+    upcoming = (customer.reservations.filter(reservation_time__gte=timezone.now())
+                .order_by('reservation_time').values('id', 'reservation_time', 'guests', 'table__name')[:10])
+    return Response({
+        "customer": customers.profile(customer),
+        "orders": {"results": rows, "next": next_cursor},
+        "upcoming_reservations": [
+            {"id": r['id'], "time": r['reservation_time'], "guests": r['guests'], "table": r['table__name']}
+            for r in upcoming
+        ],
+    })
 
 
 # =========================================
@@ -197,24 +266,71 @@ def get_active_orders(request, restaurant_id):
 # =========================================
 
 @api_view(['GET'])
+@renderer_classes(FAST_RENDERERS)
 @authentication_classes([])
 @permission_classes([]) # Fixes 403 on polling
+@use_read_database
 def get_kitchen_orders(request):
-    orders = Order.objects.filter(status='PENDING').order_by('created_at')
-    serializer = KitchenOrderSerializer(orders, many=True)
-    return Response(serializer.data)
+    try:
+        fields, cursor, limit, paged = listing_params(request.query_params, KITCHEN_ORDERING, fastpath.KITCHEN_ORDER_FIELDS)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    orders = Order.objects.filter(status='PENDING')
+    # Same output as KitchenOrderSerializer, built from .values() rows
+    return Response(listing_body(*fastpath.kitchen_order_page(orders, KITCHEN_ORDERING, cursor, limit, fields), paged))
 
 @api_view(['POST'])
 @csrf_exempt
 @authentication_classes([])
 @permission_classes([])
 def complete_order(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
-    order.status = 'READY'
-    order.ready_at = timezone.now() # <--- NEW: Track when kitchen finished
-    order.save()
+    set_orders_ready([order_id])
+    order = Order.objects.filter(id=order_id).only('id', 'created_at', 'ready_at').first()
+    if order is None:
+        return Response({"error": "Order not found"}, status=404)
     return Response({"status": "success", "prep_time": order.preparation_time_minutes})
 
+
+@transaction.atomic
+def set_orders_ready(order_ids, ready=True, restaurant_id=None):
+    """
+    Kitchen bump (PENDING -> READY, stamps ready_at) or un-bump (READY ->
+    PENDING) as one UPDATE of status/ready_at. Orders already in the target
+    state are skipped. Returns the ids that changed; after the commit the
+    kitchen screens get an "order_status" event and waiters' polls wake up.
+    Used by complete_order and the kitchen WebSocket (consumers.py).
+
+    The rows are locked while they're read (in id order), so when two
+    screens bump the same ticket at once the second one waits and then
+    finds it already moved: only one of them reports and announces it.
+    SQLite has no FOR UPDATE; with SQLITE_PRODUCTION's BEGIN IMMEDIATE the
+    transactions queue up on the write lock instead.
+    """
+    from_status, to_status = ('PENDING', 'READY') if ready else ('READY', 'PENDING')
+    orders = Order.objects.select_for_update().filter(id__in=order_ids, status=from_status)
+    if restaurant_id:
+        orders = orders.filter(restaurant_id=restaurant_id)
+    changed = list(orders.order_by('id').values_list('id', 'restaurant_id'))
+    if not changed:
+        return []
+
+    ids = [order_id for order_id, _ in changed]
+    Order.objects.filter(id__in=ids, status=from_status).update(
+        status=to_status, ready_at=timezone.now() if ready else None)
+
+    by_restaurant = {}
+    for order_id, rest_id in changed:
+        by_restaurant.setdefault(rest_id, []).append(order_id)
+    for rest_id, rest_ids in by_restaurant.items():
+        notify_change(rest_id)  # .update() doesn't fire the signal
+        event = {"type": "order_status", "restaurant": str(rest_id), "status": to_status,
+                 "order_ids": rest_ids}
+        if not ready:
+            # Un-bumped tickets go back on the screens, which need their contents
+            event["orders"] = fastpath.kitchen_order_rows(Order.objects.filter(id__in=rest_ids).order_by('created_at'))
+        notify_kitchen(event)
+    return ids
+
 def kitchen_dashboard(request):
     return render(request, 'kitchen.html')
 
@@ -226,6 +342,7 @@ def kitchen_dashboard(request):
 @api_view(['GET'])
 @authentication_classes([])
 @permission_classes([]) 
+@use_read_database
 def get_table_bill(request, table_id):
     # Fetch ALL active orders for this table (not just the last one)
     orders = Order.objects.filter(table__id=table_id, status__in=['PENDING', 'READY'])
@@ -268,6 +385,13 @@ def settle_table(request, table_id):
         table = Table.objects.get(id=table_id)
         
         with transaction.atomic():
+            # .update() skips the post_save signal: reopen the settled orders'
+            # days in the sales analytics ourselves
+            settled = list(orders.values_list('restaurant_id', 'created_at'))
+            for restaurant_id in {rid for rid, _ in settled}:
+                moments = [created_at for rid, created_at in settled if rid == restaurant_id]
+                transaction.on_commit(partial(analytics.forget_days, restaurant_id, moments))
+
             # Mark all as COMPLETED
             orders.update(status='COMPLETED',
                           completed_at=timezone.now()
@@ -293,6 +417,7 @@ def inventory_dashboard(request):
 
 @api_view(['GET'])
 @permission_classes([])
+@use_read_database
 def get_inventory_data(request, restaurant_id):
     # Get all ingredients
     ingredients = Ingredient.objects.filter(restaurant__id=restaurant_id)
@@ -306,6 +431,106 @@ def get_inventory_data(request, restaurant_id):
         "menu": CategorySerializer(categories, many=True).data
     })
 
+# --- NEW: LAZY INVENTORY EDITOR APIs ---
+# The editor loads a category index first, then one category's items on
+# click, and pages through ingredients. Every response carries an ETag so
+# a re-open of the same category is a 304 with no body.
+
+def _etag_response(request, payload):
+    body = JSONRenderer().render(payload)
+    etag = '"%s"' % hashlib.md5(body).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(payload, headers=headers)
+
+INVENTORY_ORDERING = ('id',)
+
+def _inventory_page(request, queryset):
+    """
+    (rows, next cursor, paged) of a keyset page by id (?limit=&cursor=), or all
+    rows when the client sends neither. ValueError for a bad cursor.
+    """
+    cursor, limit, paged = page_params(request.query_params, queryset.model, INVENTORY_ORDERING, None)
+    if cursor is not None:
+        queryset = queryset.filter(keyset_filter(INVENTORY_ORDERING, cursor))
+    queryset = queryset.order_by(*INVENTORY_ORDERING)
+    if limit is None:
+        return list(queryset), None, paged
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last['id'] if isinstance(last, dict) else last.id])
+    return rows, next_cursor, paged
+
+@api_view(['GET'])
+@permission_classes([])
+@use_read_database
+def get_inventory_categories(request, restaurant_id):
+    """Category index with item counts, by id (a bare list unless ?limit= / ?cursor= page it)."""
+    categories = (
+        Category.objects.filter(restaurant__id=restaurant_id)
+        .annotate(item_count=Count('menuitem'))
+        .values('id', 'name', 'item_count')
+    )
+    try:
+        rows, next_cursor, paged = _inventory_page(request, categories)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    return _etag_response(request, listing_body(rows, next_cursor, paged))
+
+@api_view(['GET'])
+@permission_classes([])
+@use_read_database
+def get_inventory_category_items(request, restaurant_id, category_id):
+    """One category's items with their variants and recipes, by id (paged like the categories)."""
+    items = (
+        MenuItem.objects.filter(restaurant__id=restaurant_id, category__id=category_id)
+        .prefetch_related('recipes__ingredient', 'variant_groups__options__recipes__ingredient')
+    )
+    try:
+        rows, next_cursor, paged = _inventory_page(request, items)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    return _etag_response(request, listing_body(InventoryMenuItemSerializer(rows, many=True).data, next_cursor, paged))
+
+INGREDIENT_ORDERING = ('name', 'id')  # within a restaurant: ingredient_rest_name_idx
+
+@api_view(['GET'])
+@permission_classes([])
+@use_read_database
+def get_inventory_ingredients(request, restaurant_id):
+    """
+    Ingredient pages ordered by (name, id).
+    ?q=<prefix> filters by name prefix, ?cursor=<next from previous page> continues.
+    """
+    try:
+        after, limit, _ = page_params(request.query_params, Ingredient, INGREDIENT_ORDERING, parse_limit(None))
+    except ValueError as e:
+        # Not silently the first page again: a client following `next` would never stop
+        return Response({"error": str(e)}, status=400)
+    ingredients = Ingredient.objects.filter(restaurant__id=restaurant_id)
+
+    prefix = request.query_params.get('q', '').strip()
+    if prefix:
+        ingredients = ingredients.filter(name__istartswith=prefix)
+
+    if after is not None:
+        ingredients = ingredients.filter(keyset_filter(INGREDIENT_ORDERING, after))
+
+    page = list(ingredients.order_by(*INGREDIENT_ORDERING)[:limit + 1])
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor([page[-1].name, page[-1].id])
+
+    return _etag_response(request, {
+        "results": IngredientSerializer(page, many=True).data,
+        "next": next_cursor
+    })
+
 @api_view(['POST'])
 @csrf_exempt                # 1. Allows Browser POST
 @authentication_classes([]) # 2. Disables User Login check
@@ -359,11 +584,58 @@ def add_ingredient(request):
     )
     return Response({"status": "created"})
 
+@api_view(['POST'])
+@csrf_exempt
+@permission_classes([])
+@parser_classes([stocktake.CSVParser, JSONParser, MultiPartParser])
+def import_stocktake(request, restaurant_id):
+    """
+    Nightly stock count in one upload (see stocktake.py): a text/csv body,
+    a JSON list of rows, or a multipart "file". ?dry_run=1 only reports.
+    """
+    restaurant = get_object_or_404(Restaurant, id=restaurant_id)
+    dry_run = request.query_params.get('dry_run') in ('1', 'true')
+    try:
+        rows = stocktake.upload_rows(request.data, request.FILES.get('file'))
+        result = stocktake.import_rows(restaurant.id, rows, dry_run=dry_run)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    if result["created"] or result["updated"]:
+        tasks.recalculate_menu_costs.defer(str(restaurant.id))
+        tasks.check_low_stock.defer(str(restaurant.id))
+    return Response(result)
+
+# --- NEW: WHOLE-MENU IMPORT / EXPORT (menu_tree.py), for staff ---
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@use_read_database
+def export_menu(request, restaurant_id):
+    restaurant = get_object_or_404(Restaurant, id=restaurant_id)
+    return Response(menu_tree.export_tree(restaurant.id))
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def import_menu(request, restaurant_id):
+    """Merges a menu tree (the export format) into the menu. ?dry_run=1 only validates and counts."""
+    restaurant = get_object_or_404(Restaurant, id=restaurant_id)
+    dry_run = request.query_params.get('dry_run') in ('1', 'true')
+    try:
+        result = menu_tree.import_tree(restaurant.id, request.data, dry_run=dry_run)
+    except menu_tree.MenuTreeError as e:
+        return Response({"error": str(e), "errors": e.errors}, status=400)
+
+    if not dry_run:
+        tasks.recalculate_menu_costs.defer(str(restaurant.id))
+    return Response({"dry_run": dry_run, **result})
+
 def analytics_dashboard(request):
     return render(request, 'analytics.html')
 
 @api_view(['GET'])
 @permission_classes([])
+@use_read_database
 def get_analytics_data(request, restaurant_id):
     today = timezone.now().date()
     
@@ -413,14 +685,17 @@ def make_reservation(request):
     
 @api_view(['GET'])
 @permission_classes([])
+@use_read_database
 def get_analytics_data(request, restaurant_id):
-    today = timezone.now().date()
+    today = timezone.localdate()
+    start, end = analytics.day_bounds(today, today)
     
-    # 1. Financials
+    # 1. Financials (a created_at range, not __date, so the index is used)
     orders_today = Order.objects.filter(
         restaurant__id=restaurant_id, 
-        created_at__date=today, 
-        status__in=['PAID', 'COMPLETED']
+        created_at__gte=start,
+        created_at__lt=end,
+        status__in=analytics.PAID_STATUSES
     )
     total_revenue = orders_today.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
     
@@ -433,30 +708,60 @@ def get_analytics_data(request, restaurant_id):
         avg_prep_time = round(total_minutes / completed_orders.count(), 1)
 
     # 3. Profit Analysis (Top 5 Items)
-    # This loop calculates the profit for every item on the menu
-    menu_performance = []
-    menu_items = MenuItem.objects.filter(restaurant__id=restaurant_id)
-    
-    for item in menu_items:
-        cost = item.get_approx_cost()
-        margin = item.get_profit_margin()
-        menu_performance.append({
-            "name": item.name,
-            "price": item.price,
-            "cost": cost,
-            "profit_margin": f"{margin}%"
-        })
+    # Costs are recalculated in the background when ingredient prices change
+    menu_performance = [
+        {
+            "name": row["name"],
+            "price": row["price"],
+            "cost": row["cost"],
+            "profit_margin": f"{row['margin']}%"
+        }
+        for row in tasks.menu_costs(restaurant_id)
+    ]
     
     # Sort by highest profit margin
     menu_performance = sorted(menu_performance, key=lambda x: float(x['profit_margin'].strip('%')), reverse=True)[:5]
 
+    # 4. Best Sellers (today's order lines, one GROUP BY on the created_at range)
+    sold = analytics.units_sold(restaurant_id, today)['items']
+    top_selling = sorted(sold.items(), key=lambda x: x[1], reverse=True)[:5]
+
     return Response({
         "revenue_today": total_revenue,
         "orders_count": orders_today.count(),
         "avg_kitchen_time": f"{avg_prep_time} mins",
-        "top_profitable_items": menu_performance
+        "top_profitable_items": menu_performance,
+        "top_selling_items": [{"name": name, "quantity": qty} for name, qty in top_selling]
     })
 
+@api_view(['GET'])
+@permission_classes([])
+@use_read_database
+def get_sales_report(request, restaurant_id):
+    """?from=YYYY-MM-DD&to=YYYY-MM-DD (inclusive): totals, heatmaps, waiter and table breakdowns."""
+    try:
+        first, last = analytics.parse_days(request.GET.get('from'), request.GET.get('to'))
+        if (last - first).days >= analytics.MAX_DAYS:
+            raise ValueError(f"At most {analytics.MAX_DAYS} days at a time")
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    return Response(analytics.sales_report(restaurant_id, first, last))
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_read_database
+def get_chain_dashboard(request):
+    """All of the logged-in owner's restaurants; ?from=&to= (inclusive), today by default."""
+    today = timezone.localdate().isoformat()
+    try:
+        first, last = analytics.parse_days(request.GET.get('from', today), request.GET.get('to', today))
+        if (last - first).days >= analytics.MAX_DAYS:
+            raise ValueError(f"At most {analytics.MAX_DAYS} days at a time")
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    restaurants = request.user.restaurants.order_by('name').values_list('id', 'name')
+    return Response(chain.chain_dashboard(restaurants, first, last))
+
 @api_view(['POST'])
 @csrf_exempt
 @permission_classes([])
@@ -478,7 +783,10 @@ def update_ingredient_cost(request):
         if added_stock:
             ingredient.current_stock += Decimal(str(added_stock))
             
-        ingredient.save()
+        ingredient.save(update_fields=['cost_per_unit', 'current_stock'])
+        restaurant_id = str(ingredient.restaurant_id)
+        tasks.recalculate_menu_costs.defer(restaurant_id)
+        tasks.check_low_stock.defer(restaurant_id)
         
         return Response({"status": "updated", "new_stock": ingredient.current_stock, "cost": ingredient.cost_per_unit})
     except Exception as e:
@@ -532,15 +840,17 @@ def make_reservation(request):
             if not target_table:
                 return Response({"error": "No tables available for this time slot."}, status=400)
 
-        # 2. Book It
-        Reservation.objects.create(
-            restaurant=restaurant,
-            table=target_table,
-            customer_name=data.get('name'),
-            customer_phone=data.get('phone'),
-            reservation_time=res_time,
-            guests=guests
-        )
+        # 2. Book It (and count it on the guest's profile)
+        with transaction.atomic():
+            Reservation.objects.create(
+                restaurant=restaurant,
+                table=target_table,
+                customer_name=data.get('name'),
+                customer_phone=data.get('phone'),
+                customer=customers.record_reservation(restaurant.id, data.get('name'), data.get('phone')),
+                reservation_time=res_time,
+                guests=guests
+            )
         
         return Response({
             "status": "confirmed", 
@@ -0,0 +1,196 @@
+import asyncio
+import importlib
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+# =========================================
+#  STARTUP WARMUP + READINESS
+# =========================================
+# Right after a deploy the first menu loads and orders used to pay for
+# everything Django does lazily: loading the URLconf (which imports every
+# view, serializer and renderer), DRF's renderer/parser settings, templates,
+# the first database connection, the menu snapshot and the pricing plan of
+# each restaurant. The tablets saw that as multi-second stalls.
+#
+# asgi.py starts the warmup in a background thread as soon as the worker
+# process is up. It does all of the above ahead of the first request
+# (snapshots and plans only for restaurants with orders in the last
+# WARMUP_ACTIVE_DAYS days), and it also starts the job runner, which
+# recovers durable jobs left over from the last run. /ready/ answers 503
+# until it is done and 200 after that, with the timings, so the load
+# balancer only sends traffic to warm workers. Under uvicorn/hypercorn the
+# ASGI lifespan startup also waits for it. Daphne doesn't send lifespan
+# events, so there only /ready/ gates traffic.
+#
+# A step that fails is logged and reported. If the database can't be
+# reached the worker stays unready, and the next /ready/ probe tries again.
+# Any other failure only means that part stays cold.
+
+HOT_MODULES = (
+    'restaurant.views',
+    'restaurant.async_views',
+    'restaurant.exports',
+    'restaurant.fastpath',
+    'restaurant.serializers',
+    'restaurant.renderers',
+    'restaurant.analytics',
+    'restaurant.chain',
+)
+TEMPLATES = ('kitchen.html', 'cashier.html', 'inventory.html', 'analytics.html')
+
+PROCESS_STARTED = time.monotonic()  # asgi.py imports this module before setting Django up
+
+
+class Warmup:
+
+    def __init__(self):
+        self.state = 'pending'   # -> running -> ready | failed
+        self.steps = {}          # step -> seconds
+        self.errors = {}         # step -> message
+        self.restaurants = 0
+        self.seconds = None      # the warmup itself
+        self.boot_seconds = None  # process start -> ready
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def start(self):
+        """Runs the warmup in a background thread. No-op unless pending or failed."""
+        with self._lock:
+            if self.state not in ('pending', 'failed'):
+                return
+            self.state = 'running'
+            self._done.clear()
+        threading.Thread(target=self._background, name='warmup', daemon=True).start()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _background(self):
+        from django.db import connections
+        try:
+            self.run()
+        finally:
+            connections.close_all()  # this thread's own connections
+
+    def run(self):
+        self.state = 'running'
+        self.steps, self.errors, self.restaurants = {}, {}, 0
+        began = time.monotonic()
+        try:
+            if self._step('database', self._open_connections):
+                self._step('modules', self._import_hot_paths)
+                self._step('jobs', self._start_jobs)
+                self._step('menus', self._preload_menus)
+        finally:
+            self.seconds = round(time.monotonic() - began, 3)
+            self.boot_seconds = round(time.monotonic() - PROCESS_STARTED, 3)
+            self.state = 'failed' if 'database' in self.errors else 'ready'
+            log = logger.error if self.errors else logger.info
+            log("Warmup %s in %.2fs (%.2fs since start): %s %s",
+                self.state, self.seconds, self.boot_seconds, self.steps, self.errors or '')
+            self._done.set()
+
+    def _step(self, name, func):
+        began = time.monotonic()
+        try:
+            func()
+            return True
+        except Exception as e:
+            logger.exception("Warmup step %s failed", name)
+            self.errors[name] = str(e)
+            return False
+        finally:
+            self.steps[name] = round(time.monotonic() - began, 3)
+
+    def _open_connections(self):
+        # Connections are per thread, so requests will open their own. This
+        # pays the one-time costs up front (driver import, backend setup,
+        # server version checks) and fails early if the database is down.
+        from django.db import connections
+        for alias in connections:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+    def _import_hot_paths(self):
+        from django.template.loader import get_template
+        from django.urls import get_resolver
+        from rest_framework.settings import api_settings
+
+        for module in HOT_MODULES:
+            importlib.import_module(module)
+        get_resolver().url_patterns  # noqa: B018 -- imports every view module
+        api_settings.DEFAULT_RENDERER_CLASSES  # noqa: B018 -- msgpack / CBOR
+        api_settings.DEFAULT_PARSER_CLASSES  # noqa: B018
+        for name in TEMPLATES:
+            get_template(name)
+
+    def _start_jobs(self):
+        if not getattr(settings, 'JOBS_EAGER', False):
+            from .jobs import runner
+            runner.start()  # recovers durable jobs left over from the last run
+
+    def _preload_menus(self):
+        from django.db.models import Max
+        from django.utils import timezone
+
+        from . import menu_snapshot, pricing
+        from .models import Order, Restaurant
+
+        since = timezone.now() - timedelta(days=settings.WARMUP_ACTIVE_DAYS)
+        active = list(
+            Order.objects.filter(created_at__gte=since).values('restaurant_id')
+            .annotate(last=Max('created_at')).order_by('-last')
+            .values_list('restaurant_id', flat=True)[:settings.WARMUP_MAX_RESTAURANTS]
+        )
+        for restaurant in Restaurant.objects.filter(id__in=active).only('id', 'menu_version'):
+            menu_snapshot.get_snapshot(restaurant.id)
+            pricing.menu_plan(restaurant)
+            self.restaurants += 1
+
+    def report(self):
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "warmup_seconds": self.seconds,
+            "boot_seconds": self.boot_seconds,
+            "steps": self.steps,
+            "errors": self.errors,
+            "restaurants": self.restaurants,
+        }
+
+
+startup = Warmup()
+
+
+async def readiness(request):
+    """GET /ready/ -- 200 once this worker is warm, 503 before (and retries a failed warmup)."""
+    startup.start()
+    return JsonResponse(startup.report(), status=200 if startup.ready else 503)
+
+
+def with_warmup(application):
+    """ASGI wrapper: the lifespan startup (uvicorn, hypercorn) completes once the warmup is done."""
+    async def app(scope, receive, send):
+        if scope['type'] != 'lifespan':
+            return await application(scope, receive, send)
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                startup.start()
+                await asyncio.to_thread(startup.wait)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    return app